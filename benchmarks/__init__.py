@@ -0,0 +1,5 @@
+"""
+End-to-end benchmarks: ingestion throughput, retrieval latency and concurrent chat throughput on a
+synthetic corpus, with a deterministic fake embedder and a fake streaming LLM server.
+Run with `python -m benchmarks.run` from the repository root.
+"""
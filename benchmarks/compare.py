@@ -0,0 +1,54 @@
+"""
+Compares two benchmark result files written by benchmarks.run:
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import json
+import argparse
+
+
+# Metrics where a larger value is better; for the others (latencies, durations) smaller is better
+HIGHER_IS_BETTER = ("per_sec",)
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """Returns the numeric values of nested result dicts keyed by dotted paths."""
+    values = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline', type=str, help='The earlier result file')
+    parser.add_argument('candidate', type=str, help='The result file to compare with it')
+    args = parser.parse_args()
+
+    with open(args.baseline, 'r', encoding='utf-8') as file:
+        baseline = json.load(file)
+    with open(args.candidate, 'r', encoding='utf-8') as file:
+        candidate = json.load(file)
+
+    print(f"baseline:  {baseline.get('git_commit')} {baseline.get('timestamp')}")
+    print(f"candidate: {candidate.get('git_commit')} {candidate.get('timestamp')}\n")
+
+    old_values = flatten({key: baseline[key] for key in ("ingestion", "retrieval", "chat") if key in baseline})
+    new_values = flatten({key: candidate[key] for key in ("ingestion", "retrieval", "chat") if key in candidate})
+    print(f"{'metric':<40}{'baseline':>14}{'candidate':>14}{'change':>10}")
+    for path in sorted(old_values.keys() & new_values.keys()):
+        old, new = old_values[path], new_values[path]
+        change = ""
+        if old:
+            ratio = (new - old) / abs(old) * 100
+            better = ratio > 0 if any(marker in path for marker in HIGHER_IS_BETTER) else ratio < 0
+            change = f"{ratio:+.1f}%" + ("" if abs(ratio) < 5 else (" +" if better else " -"))
+        print(f"{path:<40}{old:>14}{new:>14}{change:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import os
+import random
+
+
+# Common words make up most of the text; rare, numbered terms give lexical search something to find
+COMMON_WORDS = (
+    "the of and to in a is that for it as was with be by on not he this are or his from at which but have "
+    "an had they you were their one all we can her has there been if more when will would who so no "
+    "system data model index query document result value process memory network server client request "
+    "response latency throughput storage vector search embedding retrieval cache batch stream token "
+    "energy market policy river mountain city history science language music health water climate"
+).split()
+RARE_TERMS = 5000
+
+
+def make_sentence(rng: random.Random, min_words: int = 8, max_words: int = 24) -> str:
+    """Returns a random sentence of common words with an occasional rare term."""
+    words = []
+    for _ in range(rng.randint(min_words, max_words)):
+        if rng.random() < 0.05:
+            words.append(f"term{rng.randrange(RARE_TERMS)}")
+        else:
+            words.append(rng.choice(COMMON_WORDS))
+    return words[0].capitalize() + " " + " ".join(words[1:]) + "."
+
+
+def make_queries(n: int, seed: int = 1) -> list[str]:
+    """Returns n short questions over the same vocabulary as the corpus."""
+    rng = random.Random(seed)
+    return [f"What is said about {make_sentence(rng, 3, 8)[:-1].lower()}?" for _ in range(n)]
+
+
+def write_text_file(path: str, sentences: list[str], sentences_per_paragraph: int = 8) -> None:
+    with open(path, 'w', encoding='utf-8') as file:
+        for start in range(0, len(sentences), sentences_per_paragraph):
+            file.write(" ".join(sentences[start:start + sentences_per_paragraph]) + "\n\n")
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf_file(path: str, sentences: list[str], lines_per_page: int = 50, line_width: int = 90) -> None:
+    """
+    Writes the sentences as a plain single-font PDF that pdfplumber can extract, without a PDF library.
+    """
+    lines, line = [], ""
+    for word in " ".join(sentences).split():
+        if line and len(line) + 1 + len(word) > line_width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    pages = [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)] or [[]]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_lines in pages:
+        text = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_escape(text)}) Tj T*" for text in page_lines) + " ET"
+        stream = text.encode("latin-1", errors="replace")
+        page_number = len(objects) + 1
+        kids.append(f"{page_number} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {page_number + 1} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode("latin-1")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, 'wb') as file:
+        file.write(output)
+
+
+def generate_corpus(root: str, txt_files: int, pdf_files: int, sentences_per_file: int, seed: int = 0) -> dict:
+    """
+    Writes a reproducible corpus of .txt and .pdf files into root, spread over a few subfolders.
+
+    Returns:
+        dict: The number of files, sentences and bytes written.
+    """
+    rng = random.Random(seed)
+    total_bytes = 0
+    for index in range(txt_files + pdf_files):
+        folder = os.path.join(root, f"folder{index % 4}")
+        os.makedirs(folder, exist_ok=True)
+        sentences = [make_sentence(rng) for _ in range(sentences_per_file)]
+        if index < txt_files:
+            path = os.path.join(folder, f"doc{index}.txt")
+            write_text_file(path, sentences)
+        else:
+            path = os.path.join(folder, f"doc{index}.pdf")
+            write_pdf_file(path, sentences)
+        total_bytes += os.path.getsize(path)
+    return {
+        "txt_files": txt_files,
+        "pdf_files": pdf_files,
+        "sentences": (txt_files + pdf_files) * sentences_per_file,
+        "bytes": total_bytes,
+    }
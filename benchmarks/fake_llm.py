@@ -0,0 +1,179 @@
+"""
+A fake streaming LLM server that speaks enough of the Ollama and OpenAI HTTP APIs for the chat path:
+Ollama's /api/tags, /api/pull and /api/generate, and OpenAI's /v1/chat/completions. Answers are
+canned tokens sent with a configurable delay, so benchmarks and load tests measure the framework
+rather than a model.
+
+Run standalone with `python -m benchmarks.fake_llm --port 11434` and point ollama_host (or
+openai_base_url, with /v1) at it.
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FakeLLMServer:
+    """Runs the fake API on a background thread."""
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        model: str = "fake-model",
+        tokens: int = 64,
+        first_token_delay: float = 0.05,
+        token_delay: float = 0.005,
+    ) -> None:
+        """
+        Args:
+            host: The interface to listen on.
+            port: The port to listen on. 0 picks a free port.
+            model: The model name listed by /api/tags.
+            tokens: Number of tokens in every answer.
+            first_token_delay: Seconds before the first token, standing in for prompt processing.
+            token_delay: Seconds between tokens.
+        """
+        self.model = model
+        self.tokens = tokens
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def answer(self, prompt: str):
+        """Yields the tokens of an answer, sleeping like a model would. An empty prompt only loads the model."""
+        with self._lock:
+            self.requests += 1
+        if not prompt:
+            return
+        time.sleep(self.first_token_delay)
+        for index in range(self.tokens):
+            if index:
+                time.sleep(self.token_delay)
+            yield f"token{index} "
+
+
+def _handler_for(server: FakeLLMServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _send_json(self, payload: dict, status: int = 200) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _start_stream(self, content_type: str) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def _send_chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json({"models": [{"name": server.model, "model": server.model}]})
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            request = self._read_json()
+            if self.path == "/api/pull":
+                self._send_json({"status": "success"})
+            elif self.path == "/api/generate":
+                self._generate(request)
+            elif self.path == "/v1/chat/completions":
+                self._chat_completions(request)
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def _generate(self, request: dict) -> None:
+            model = request.get("model", server.model)
+            tokens = server.answer(request.get("prompt", ""))
+            if not request.get("stream", True):
+                self._send_json({"model": model, "created_at": _now(), "response": "".join(tokens), "done": True})
+                return
+            self._start_stream("application/x-ndjson")
+            for token in tokens:
+                self._send_chunk(json.dumps({"model": model, "created_at": _now(), "response": token, "done": False}).encode() + b"\n")
+            self._send_chunk(json.dumps({"model": model, "created_at": _now(), "response": "", "done": True, "done_reason": "stop"}).encode() + b"\n")
+            self._send_chunk(b"")
+
+        def _chat_completions(self, request: dict) -> None:
+            model = request.get("model", server.model)
+            prompt = "".join(str(message.get("content", "")) for message in request.get("messages", []))
+            tokens = server.answer(prompt)
+            created = int(time.time())
+            if not request.get("stream"):
+                self._send_json({
+                    "id": "fake", "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                })
+                return
+            self._start_stream("text/event-stream")
+            for token in tokens:
+                chunk = {
+                    "id": "fake", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                self._send_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            self._send_chunk(b"data: [DONE]\n\n")
+            self._send_chunk(b"")
+
+    return Handler
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake streaming Ollama/OpenAI server for load tests')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=11434, help='Port to listen on')
+    parser.add_argument('--model', type=str, default='fake-model', help='Model name reported by /api/tags')
+    parser.add_argument('--tokens', type=int, default=64, help='Tokens per answer')
+    parser.add_argument('--first-token-delay', type=float, default=0.05, help='Seconds before the first token')
+    parser.add_argument('--token-delay', type=float, default=0.005, help='Seconds between tokens')
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, args.model, args.tokens, args.first_token_delay, args.token_delay)
+    print(f"Fake LLM server listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import re
+import time
+import zlib
+
+import numpy as np
+
+
+class FakeEmbedder:
+    """
+    A deterministic stand-in for SentenceTransformer. Each word is hashed to a dimension and a sign,
+    so texts sharing words get similar vectors and retrieval returns sensible neighbours, without a
+    model download or a GPU. An optional per-text delay simulates the cost of a real model.
+    """
+    def __init__(self, model_name_or_path: str | None = None, dimension: int = 384, delay_per_text: float = 0.0, **kwargs) -> None:
+        self.model_name = model_name_or_path
+        self.dimension = dimension
+        self.delay_per_text = delay_per_text
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = zlib.crc32(word.encode("utf-8"))
+            vector[digest % self.dimension] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Embeds a text (returns a vector) or a list of texts (returns a matrix), like SentenceTransformer.encode."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if self.delay_per_text:
+            time.sleep(self.delay_per_text * len(texts))
+        matrix = np.stack([self._embed(text) for text in texts]) if texts else np.zeros((0, self.dimension), dtype=np.float32)
+        return matrix[0] if single else matrix
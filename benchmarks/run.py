@@ -0,0 +1,301 @@
+"""
+Runs the end-to-end benchmarks and writes the results as JSON:
+
+    ingestion  vector_db_setup.main() on a synthetic corpus: chunks/sec, MB/sec, and a re-run with no changes
+    retrieval  ChromaRetriever.retrieve latency percentiles and retrieve_many throughput
+    chat       concurrent chat_stream requests through Django: requests/sec, time to the response headers and
+               to the first answer chunk, latency
+
+The embedding model is replaced by benchmarks.fakes.FakeEmbedder unless --model names a real
+sentence-transformers model, and the LLM is benchmarks.fake_llm.FakeLLMServer, so results measure
+the framework and are comparable between runs on the same machine. Compare two result files with
+`python -m benchmarks.compare old.json new.json`.
+
+Usage (from the repository root):
+    python -m benchmarks.run --txt-files 200 --pdf-files 20 --concurrency 8
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.fake_llm import FakeLLMServer
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLLECTION = "benchmark"
+FAKE_MODEL = "fake-embedder"
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='End-to-end ingestion, retrieval and chat benchmarks')
+    parser.add_argument('--only', type=str, nargs='+', choices=['ingestion', 'retrieval', 'chat'], default=None,
+                        help='Benchmarks to run. Retrieval and chat use the collection built by ingestion, which is always run')
+    parser.add_argument('--txt-files', type=int, default=200, help='Number of synthetic .txt documents')
+    parser.add_argument('--pdf-files', type=int, default=20, help='Number of synthetic .pdf documents')
+    parser.add_argument('--sentences', type=int, default=400, help='Sentences per document')
+    parser.add_argument('--vector-db', type=str, default='chromaDB', help="Vector DB backend, as vector_db in embedding_config.py")
+    parser.add_argument('--parse-workers', type=int, default=None, help='parse_workers for ingestion. None uses all CPU cores')
+    parser.add_argument('--model', type=str, default=None,
+                        help='A real sentence-transformers model to embed with, e.g. sentence-transformers/all-MiniLM-L6-v2. Defaults to the fake embedder')
+    parser.add_argument('--embed-delay', type=float, default=0.0, help='Seconds the fake embedder spends per text')
+    parser.add_argument('--queries', type=int, default=200, help='Number of retrieval queries')
+    parser.add_argument('--n-results', type=int, default=5, help='Results per query')
+    parser.add_argument('--chat-requests', type=int, default=100, help='Number of chat requests')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent chat requests')
+    parser.add_argument('--tokens', type=int, default=64, help='Tokens per fake LLM answer')
+    parser.add_argument('--first-token-delay', type=float, default=0.05, help='Seconds before the fake LLM sends the first token')
+    parser.add_argument('--token-delay', type=float, default=0.005, help='Seconds between fake LLM tokens')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic corpus')
+    parser.add_argument('--work-dir', type=str, default=None, help='Directory for the corpus and vector DB. Defaults to a temporary directory')
+    parser.add_argument('--output', type=str, default=None, help='Result file. Defaults to benchmarks/results/<UTC time>.json')
+    return parser
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Returns the q-th percentile (0-100) with linear interpolation."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_summary(seconds: list[float]) -> dict:
+    """Summarizes latencies in milliseconds."""
+    return {
+        f"{name}_ms": round(percentile(seconds, q) * 1000, 3) if seconds else None
+        for name, q in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))
+    }
+
+
+def configure(args, db_dir: str, corpus_dir: str, llm_url: str) -> None:
+    """
+    Points the config modules at the benchmark corpus, vector DB and fake LLM. Must run before the
+    framework modules are imported, since they copy the config values at import time.
+    """
+    import config.embedding_config as embedding_config
+    import config.llm_config as llm_config
+
+    embedding_config.raw_db = corpus_dir
+    embedding_config.db_directory = db_dir
+    embedding_config.collection_name = COLLECTION
+    embedding_config.vector_db = args.vector_db
+    embedding_config.model_name = args.model or FAKE_MODEL
+    embedding_config.use_openai_embeddings = False
+    embedding_config.use_embedding_cache = False
+    embedding_config.embedding_cache_dir = os.path.join(db_dir, "embedding_cache")
+    embedding_config.parse_workers = args.parse_workers
+    embedding_config.use_hybrid_search = False
+    embedding_config.use_reranker = False
+
+    llm_config.use_openai = False
+    llm_config.llm_model = "fake-model"
+    llm_config.ollama_host = llm_url
+    llm_config.record_data = False
+    llm_config.use_response_cache = False
+
+    if args.model is None:
+        import sentence_transformers
+        from benchmarks.fakes import FakeEmbedder
+        delay = args.embed_delay
+        sentence_transformers.SentenceTransformer = lambda *a, **kw: FakeEmbedder(*a, delay_per_text=delay, **kw)
+
+
+def bench_ingestion(args, corpus_dir: str, db_dir: str) -> dict:
+    corpus = generate_corpus(corpus_dir, args.txt_files, args.pdf_files, args.sentences, seed=args.seed)
+
+    from embedding import vector_db_setup
+    from vector_store import get_vector_store
+
+    start = time.perf_counter()
+    vector_db_setup.main()
+    elapsed = time.perf_counter() - start
+
+    store = get_vector_store(args.vector_db, db_dir, COLLECTION)
+    chunks = store.count()
+    store.close()
+
+    # A second run finds every file unchanged, which measures the incremental indexing overhead
+    start = time.perf_counter()
+    vector_db_setup.main()
+    unchanged_elapsed = time.perf_counter() - start
+
+    return {
+        **corpus,
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "chunks_per_sec": round(chunks / elapsed, 2) if elapsed else None,
+        "mb_per_sec": round(corpus["bytes"] / 1024 ** 2 / elapsed, 3) if elapsed else None,
+        "unchanged_rerun_seconds": round(unchanged_elapsed, 3),
+    }
+
+
+def bench_retrieval(args, db_dir: str) -> dict:
+    from retrieval.main import ChromaRetriever
+    from retrieval.cache import QueryEmbeddingCache
+
+    import config.embedding_config as embedding_config
+    retriever = ChromaRetriever(
+        embedding_model=embedding_config.model_name,
+        db_path=db_dir,
+        db_collection=COLLECTION,
+        n_results=args.n_results,
+        # Every query is embedded, as for new questions
+        query_cache=QueryEmbeddingCache(max_size=0),
+        vector_db=args.vector_db
+    )
+    queries = make_queries(args.queries, seed=args.seed + 1)
+
+    # Warm up the collection and the model before timing
+    retriever.retrieve(queries[0])
+    latencies = []
+    empty = 0
+    for query in queries:
+        start = time.perf_counter()
+        result = retriever.retrieve(query)
+        latencies.append(time.perf_counter() - start)
+        if not result or not result['ids'][0]:
+            empty += 1
+
+    start = time.perf_counter()
+    retriever.retrieve_many(queries)
+    batch_elapsed = time.perf_counter() - start
+
+    return {
+        "queries": len(queries),
+        "n_results": args.n_results,
+        "empty_results": empty,
+        **latency_summary(latencies),
+        "queries_per_sec": round(len(queries) / sum(latencies), 2) if sum(latencies) else None,
+        "batch_queries_per_sec": round(len(queries) / batch_elapsed, 2) if batch_elapsed else None,
+    }
+
+
+def bench_chat(args, llm_server: FakeLLMServer) -> dict:
+    os.environ.setdefault("DJANGO_KEY", "benchmark-only-key")
+    os.environ["RAG_PRELOAD_MODELS"] = "False"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rag_server.settings")
+    sys.path.insert(0, os.path.join(REPO_ROOT, "django-server"))
+
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.ALLOWED_HOSTS = ["*"]
+
+    from django.test import Client
+    from rag_app import registry
+    registry.load()
+
+    queries = make_queries(args.chat_requests, seed=args.seed + 2)
+    clients = threading.local()
+
+    def chat(query: str) -> tuple[float, float, float, bool]:
+        if not hasattr(clients, "client"):
+            clients.client = Client()
+        start = time.perf_counter()
+        response = clients.client.post('/chat/stream/', {'query': query})
+        response_start = time.perf_counter() - start
+        first_chunk = None
+        body = b""
+        for chunk in response.streaming_content:
+            # Empty chunks only flush the headers
+            if first_chunk is None and chunk:
+                first_chunk = time.perf_counter() - start
+            body += chunk
+        total = time.perf_counter() - start
+        return response_start, first_chunk or total, total, response.status_code == 200 and b"<|DOCS_JSON|>" in body
+
+    # One request first, so the model check and connections are not part of the measurement
+    chat(queries[0])
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(chat, queries))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "errors": sum(1 for *_, ok in results if not ok),
+        "requests_per_sec": round(len(results) / elapsed, 2) if elapsed else None,
+        "response_start": latency_summary([result[0] for result in results]),
+        "first_chunk": latency_summary([result[1] for result in results]),
+        "latency": latency_summary([result[2] for result in results]),
+        "llm": {
+            "tokens": args.tokens,
+            "first_token_delay": args.first_token_delay,
+            "token_delay": args.token_delay,
+        },
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = create_argument_parser()
+    args = parser.parse_args()
+    selected = set(args.only or ['ingestion', 'retrieval', 'chat'])
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="rag-benchmark-")
+    corpus_dir = os.path.join(work_dir, "corpus")
+    db_dir = os.path.join(work_dir, "db")
+    # Every run starts from an empty collection
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    shutil.rmtree(db_dir, ignore_errors=True)
+    os.makedirs(corpus_dir)
+
+    llm_server = FakeLLMServer(
+        tokens=args.tokens, first_token_delay=args.first_token_delay, token_delay=args.token_delay
+    ).start()
+    configure(args, db_dir, corpus_dir, llm_server.url)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": vars(args),
+    }
+    try:
+        results["ingestion"] = bench_ingestion(args, corpus_dir, db_dir)
+        if 'retrieval' in selected:
+            results["retrieval"] = bench_retrieval(args, db_dir)
+        if 'chat' in selected:
+            results["chat"] = bench_chat(args, llm_server)
+    finally:
+        llm_server.stop()
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        REPO_ROOT, "benchmarks", "results", time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=1)
+
+    print("\n--- Benchmark Results ---")
+    print(json.dumps({key: results[key] for key in ("ingestion", "retrieval", "chat") if key in results}, indent=1))
+    print(f"\nWritten to {output}")
+
+
+if __name__ == "__main__":
+    main()
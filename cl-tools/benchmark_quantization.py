@@ -0,0 +1,280 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from openai import OpenAI
+
+# Add the parent directory to sys.path
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from config.embedding_config import (
+    model_name,
+    vector_db,
+    db_directory,
+    collection_name,
+    use_openai_embeddings,
+    openai_embedding_model,
+    openai_embedding_base_url,
+    use_embedding_cache,
+    embedding_cache_dir
+)
+from embedding.vector_db_setup import embed_batch
+from embedding.openai_embedder import OpenAIEmbedder
+from embedding.cache import EmbeddingCache
+from vector_store import get_vector_store
+from vector_store.numpy_store import NumpyVectorStore
+from vector_store.faiss_store import FaissVectorStore
+
+
+# (storage dtype, rescore with full-precision vectors) pairs compared against float32 exact search
+OPTIONS = [
+    ("float32", False),
+    ("float16", False),
+    ("int8", False),
+    ("int8", True),
+    ("binary", False),
+    ("binary", True),
+]
+
+# (index type, quantization) pairs of the FAISS backend, compared against the same float32 exact search
+FAISS_OPTIONS = [
+    ("flat", None),
+    ("flat", "fp16"),
+    ("flat", "int8"),
+    ("hnsw", None),
+    ("hnsw", "fp16"),
+    ("hnsw", "int8"),
+]
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Compares recall, latency and memory of the embedding storage options on chunks of the configured collection'
+    )
+
+    parser.add_argument(
+        '--sample',
+        type=int,
+        default=20000,
+        help='Number of chunks read from the collection and re-indexed with every option'
+    )
+
+    parser.add_argument(
+        '--queries',
+        type=str,
+        default=None,
+        help='File with one query per line. Without it the start of --n-queries sampled chunks is used as queries'
+    )
+
+    parser.add_argument(
+        '--n-queries',
+        type=int,
+        default=200,
+        help='Number of queries taken from the sample when --queries is not given'
+    )
+
+    parser.add_argument(
+        '--number-results',
+        type=int,
+        default=10,
+        help='Number of results per query. Recall is measured at this depth'
+    )
+
+    parser.add_argument(
+        '--rescore-factor',
+        type=int,
+        default=4,
+        help='Number of candidates rescored per result for the rescoring options'
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=256,
+        help='Number of chunks embedded at once'
+    )
+
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='JSON file to write the results to'
+    )
+
+    return parser
+
+
+def read_sample(store, sample: int, page_size: int = 5000) -> dict:
+    """Reads up to sample chunks from the vector store."""
+    sampled = {"ids": [], "documents": [], "metadatas": []}
+    offset = 0
+    while offset < sample:
+        page = store.get(limit=min(page_size, sample - offset), offset=offset)
+        if not page['ids']:
+            break
+        for key in sampled:
+            sampled[key].extend(page[key])
+        offset += len(page['ids'])
+    return sampled
+
+
+def embed_all(texts: list[str], batch_size: int, embedding_model, openai_embedder, embedding_cache) -> np.ndarray:
+    """Embeds the texts in batches. Texts embedded during ingestion are read from the embedding cache."""
+    embeddings = []
+    for start in range(0, len(texts), batch_size):
+        batch = embed_batch(texts[start:start + batch_size], embedding_model, openai_embedder, embedding_cache)
+        if any(embedding is None for embedding in batch):
+            raise RuntimeError("Some texts could not be embedded")
+        embeddings.extend(batch)
+        print(f"Embedded {len(embeddings)}/{len(texts)}", end="\r")
+    print()
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def data_file_size(path: str, name: str) -> int:
+    """Returns the size of the named data file of the current generation, 0 if there is none."""
+    for dirpath, _, filenames in os.walk(path):
+        if name in filenames:
+            return os.path.getsize(os.path.join(dirpath, name))
+    return 0
+
+
+def index_and_search(store, sampled, embeddings, query_embeddings, n_results, batch_size) -> tuple[list[list[str]], list[float]]:
+    """Writes the sample to the store, then searches it one query at a time and closes it."""
+    for start in range(0, len(sampled['ids']), batch_size):
+        end = start + batch_size
+        store.upsert(sampled['ids'][start:end], embeddings[start:end], sampled['documents'][start:end], sampled['metadatas'][start:end])
+    store.persist()
+
+    found, latencies = [], []
+    for query_embedding in query_embeddings:
+        start = time.perf_counter()
+        results = store.query([query_embedding], n_results)
+        latencies.append(time.perf_counter() - start)
+        found.append(results['ids'][0])
+    store.close()
+    return found, latencies
+
+
+def run_option(work_dir, dtype, rescore, rescore_factor, sampled, embeddings, query_embeddings, n_results, batch_size) -> tuple[dict, list[list[str]]]:
+    """Indexes the sample with one storage option and searches it with every query, one query at a time."""
+    store = NumpyVectorStore(work_dir, f"{dtype}_{int(rescore)}", create=True, dtype=dtype, rescore=rescore, rescore_factor=rescore_factor)
+    found, latencies = index_and_search(store, sampled, embeddings, query_embeddings, n_results, batch_size)
+
+    directory = store.directory
+    return {
+        "backend": "numpy",
+        "dtype": dtype,
+        "rescore": rescore,
+        "searched_bytes": data_file_size(directory, "vectors.npy"),
+        "full_vectors_bytes": data_file_size(directory, "full.npy"),
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }, found
+
+
+def run_faiss_option(work_dir, index_type, quantization, sampled, embeddings, query_embeddings, n_results, batch_size) -> tuple[dict, list[list[str]]]:
+    """Indexes the sample in a FAISS index and searches it with every query, one query at a time."""
+    name = f"faiss_{index_type}_{quantization or 'float32'}"
+    store = FaissVectorStore(work_dir, name, create=True, index_type=index_type, quantization=quantization)
+    found, latencies = index_and_search(store, sampled, embeddings, query_embeddings, n_results, batch_size)
+
+    # The whole index, codes and graph, is loaded into memory when the collection is served
+    return {
+        "backend": "faiss",
+        "index_type": index_type,
+        "quantization": quantization,
+        "searched_bytes": os.path.getsize(store.index_path),
+        "full_vectors_bytes": 0,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }, found
+
+
+def recall(found: list[list[str]], exact: list[list[str]]) -> float:
+    """Returns the mean fraction of the exact results that were found."""
+    return float(np.mean([
+        len(set(ids) & set(reference)) / len(reference) if reference else 1.0
+        for ids, reference in zip(found, exact)
+    ]))
+
+
+def option_name(result: dict) -> str:
+    if result["backend"] == "faiss":
+        return f"faiss {result['index_type']} {result['quantization'] or 'float32'}"
+    return f"{result['dtype']}{' + rescore' if result['rescore'] else ''}"
+
+
+def main():
+    parser = create_argument_parser()
+    args = parser.parse_args()
+
+    openai_embedder = None
+    embedding_model = None
+    if use_openai_embeddings:
+        openai_client = OpenAI(base_url=openai_embedding_base_url, api_key=os.environ.get("OPENAI_API_KEY"))
+        openai_embedder = OpenAIEmbedder(openai_client=openai_client, embedding_model=openai_embedding_model)
+    else:
+        embedding_model = SentenceTransformer(model_name, trust_remote_code=True)
+    embedding_cache = EmbeddingCache(embedding_cache_dir) if use_embedding_cache else None
+
+    store = get_vector_store(vector_db, db_directory, collection_name)
+    sampled = read_sample(store, args.sample)
+    store.close()
+    if not sampled['ids']:
+        print(f"Collection {collection_name} is empty")
+        return
+    print(f"Sampled {len(sampled['ids'])} chunks from {collection_name}")
+
+    embeddings = embed_all(sampled['documents'], args.batch_size, embedding_model, openai_embedder, embedding_cache)
+    if args.queries:
+        with open(args.queries, 'r', encoding='utf-8') as file:
+            queries = [line.strip() for line in file if line.strip()]
+    else:
+        # The start of a chunk stands in for a question about it
+        step = max(1, len(sampled['documents']) // args.n_queries)
+        queries = [doc[:200] for doc in sampled['documents'][::step][:args.n_queries]]
+    query_embeddings = embed_all(queries, args.batch_size, embedding_model, openai_embedder, None)
+
+    report = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        exact = None
+        for dtype, rescore in OPTIONS:
+            result, found = run_option(
+                work_dir, dtype, rescore, args.rescore_factor, sampled, embeddings, query_embeddings, args.number_results, args.batch_size
+            )
+            if exact is None:
+                # float32 is exact search and the reference for recall
+                exact = found
+            result["recall"] = recall(found, exact)
+            report.append(result)
+        for index_type, quantization in FAISS_OPTIONS:
+            result, found = run_faiss_option(
+                work_dir, index_type, quantization, sampled, embeddings, query_embeddings, args.number_results, args.batch_size
+            )
+            result["recall"] = recall(found, exact)
+            report.append(result)
+
+    print(f"\n{len(sampled['ids'])} chunks, {len(queries)} queries, recall@{args.number_results} against float32 exact search\n")
+    print(f"{'storage':<22}{'recall':>8}{'p50 ms':>10}{'p95 ms':>10}{'searched MB':>14}{'full MB':>10}")
+    for result in report:
+        print(
+            f"{option_name(result):<22}{result['recall']:>8.3f}{result['latency_p50_ms']:>10.2f}{result['latency_p95_ms']:>10.2f}"
+            f"{result['searched_bytes'] / 1024 ** 2:>14.1f}{result['full_vectors_bytes'] / 1024 ** 2:>10.1f}"
+        )
+    print("\nsearched MB is the memory a served collection needs (for FAISS the index file, graph included); "
+          "full MB stays on disk and is only read for candidates.")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({"chunks": len(sampled['ids']), "queries": len(queries), "n_results": args.number_results, "options": report}, file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
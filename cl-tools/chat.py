@@ -1,5 +1,6 @@
 import os
 import sys
+import ollama
 from dotenv import load_dotenv
 from openai import OpenAI
 
@@ -8,42 +9,76 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(parent_dir)
 
 from retrieval.main import ChromaRetriever, OpenAIChromaRetriever
-from config.embedding_config import model_name, db_directory, collection_name, use_openai_embeddings, openai_embedding_model, openai_embedding_base_url
+from retrieval.rerank import Reranker
+from retrieval.context import ContextBuilder
+from config.embedding_config import model_name, db_directory, collection_name, use_openai_embeddings, openai_embedding_model, openai_embedding_base_url, vector_db, use_hybrid_search, hybrid_candidates, rrf_k, use_reranker, reranker_model, rerank_candidates, rerank_batch_size, rerank_time_budget, merge_adjacent
 
-from llm.main import Responder, OpenAIResponder
-from config.llm_config import llm_model, prompt, openai_model, use_openai, openai_base_url
+from llm.main import Responder, OpenAIResponder, warm_up_in_background
+from config.llm_config import llm_model, prompt, openai_model, use_openai, openai_base_url, ollama_host, ollama_keep_alive, warm_up_llm, context_token_budget
 
 
 load_dotenv(os.path.join(parent_dir, '.env'))
 
 
-openai_client = OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY"),
-    base_url=openai_base_url  
-)
-
 def main():
-    while True:
-        if use_openai_embeddings:
-            load_dotenv(os.path.join(parent_dir, '.env'))
-            openai_client = OpenAI(
-                api_key=os.environ.get("OPENAI_API_KEY"),
-                base_url=openai_embedding_base_url
+    # The retriever, reranker and responder are created once and reused for every question,
+    # so models stay loaded and HTTP connections are kept open between turns
+    if use_openai:
+        llm_client = OpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            base_url=openai_base_url  
+        )
+        responder = OpenAIResponder(model=openai_model, prompt_template=prompt, cleint=llm_client)
+    else:
+        responder = Responder(model=llm_model, prompt_template=prompt, keep_alive=ollama_keep_alive,
+                              client=ollama.Client(host=ollama_host))
+        if warm_up_llm:
+            # Load the model while the user types the first question
+            warm_up_in_background(responder)
+
+    reranker = None
+    if use_reranker:
+        reranker = Reranker(reranker_model, batch_size=rerank_batch_size, time_budget=rerank_time_budget)
+    context_builder = None
+    if context_token_budget is not None:
+        context_builder = ContextBuilder(max_tokens=context_token_budget, model=openai_model if use_openai else llm_model)
+
+    if use_openai_embeddings:
+        openai_client = OpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            base_url=openai_embedding_base_url
+        )
+
+        retriever = OpenAIChromaRetriever(
+            openai_client=openai_client,
+            embedding_model=openai_embedding_model,
+            db_path=db_directory,
+            db_collection=collection_name,
+            n_results=5,
+            vector_db=vector_db,
+            hybrid_search=use_hybrid_search,
+            hybrid_candidates=hybrid_candidates,
+            rrf_k=rrf_k,
+            reranker=reranker,
+            rerank_candidates=rerank_candidates,
+            context_builder=context_builder,
+            merge_adjacent=merge_adjacent
             )
+    else:
+        retriever = ChromaRetriever(embedding_model=model_name, 
+                            db_path=db_directory, 
+                            db_collection=collection_name, 
+                            n_results=5,
+                            vector_db=vector_db,
+                            hybrid_search=use_hybrid_search,
+                            hybrid_candidates=hybrid_candidates,
+                            rrf_k=rrf_k,
+                            reranker=reranker,
+                            rerank_candidates=rerank_candidates,
+                            context_builder=context_builder,
+                            merge_adjacent=merge_adjacent)
 
-            retriever = OpenAIChromaRetriever(
-                openai_client=openai_client,
-                embedding_model=openai_embedding_model,
-                db_path=db_directory,
-                db_collection=collection_name,
-                n_results=5
-                )
-        else:
-            retriever = ChromaRetriever(embedding_model=model_name, 
-                                db_path=db_directory, 
-                                db_collection=collection_name, 
-                                n_results=5)
-        
+    while True:
         user_query = str(input("Ask a question. Type quit to exit:  "))
         if user_query.lower() == "quit":
             break
@@ -53,18 +88,8 @@ def main():
             search_results = retriever.retrieve(user_query)
             formated_result = retriever.format_results_for_prompt(search_results)
 
-            if use_openai:
-                responder = OpenAIResponder(data=formated_result, model=openai_model, 
-                                            prompt_template=prompt, query= user_query,cleint=openai_client)
-                responder.stream_response()
-            else:
-                responder = Responder(data=formated_result, model=llm_model, prompt_template=prompt, query=user_query)
-                responder.stream_response()
+            responder.stream_response(query=user_query, data=formated_result)
 
 
 if __name__ == "__main__":
     main()
-
-
-
-
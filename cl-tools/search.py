@@ -1,5 +1,6 @@
 import os
 import sys
+import json
 import argparse
 from dotenv import load_dotenv
 from openai import OpenAI
@@ -9,7 +10,8 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(parent_dir)
 
 from retrieval.main import ChromaRetriever, OpenAIChromaRetriever
-from config.embedding_config import model_name, db_directory, collection_name, use_openai_embeddings, openai_embedding_model, openai_embedding_base_url
+from retrieval.rerank import Reranker
+from config.embedding_config import model_name, db_directory, collection_name, use_openai_embeddings, openai_embedding_model, openai_embedding_base_url, vector_db, use_hybrid_search, hybrid_candidates, rrf_k, use_reranker, reranker_model, rerank_candidates, rerank_batch_size, rerank_time_budget, merge_adjacent
 
 
 def create_argument_parser() -> argparse.ArgumentParser:
@@ -22,12 +24,104 @@ def create_argument_parser() -> argparse.ArgumentParser:
         help='Number of results to display for a given query'
     )
 
+    parser.add_argument(
+        '--input',
+        type=str,
+        default=None,
+        help="File with one query per line (plain text or JSON with 'query' and optional 'id'), or '-' for stdin. "
+             "Without it the search runs interactively"
+    )
+
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='JSONL file to write the results of --input to. Defaults to stdout'
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=256,
+        help='Number of queries embedded and searched together in --input mode'
+    )
+
     return parser
 
+
+def read_queries(lines):
+    """
+    Yields (id, query) pairs from an iterable of lines. Lines are plain queries or JSON objects
+    with a 'query' key and an optional 'id'. Blank lines are skipped; queries without an ID are
+    numbered by their line.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+                yield record.get('id', line_number), record['query']
+                continue
+            except (json.JSONDecodeError, KeyError):
+                pass
+        yield line_number, line
+
+
+def format_results(results):
+    """Turns one retriever result into a list of JSON-serializable hits."""
+    return [
+        {
+            "id": doc_id,
+            "file_name": metadata.get('file_name'),
+            "chunk_id": metadata.get('chunk_id'),
+            "distance": distance,
+            "content": doc,
+        }
+        for doc_id, doc, metadata, distance in zip(
+            results['ids'][0], results['documents'][0], results['metadatas'][0], results['distances'][0]
+        )
+    ]
+
+
+def run_batch(retriever, input_file, output_file, batch_size):
+    """
+    Streams queries from input_file and writes one JSON line per query to output_file.
+    Only one batch of queries and results is held in memory at a time.
+    """
+    def flush(batch):
+        results = retriever.retrieve_many([query for _, query in batch])
+        for (query_id, query), result in zip(batch, results):
+            record = {"id": query_id, "query": query}
+            if result is None:
+                record["error"] = "retrieval failed"
+            else:
+                record["results"] = format_results(result)
+            output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output_file.flush()
+
+    batch = []
+    total = 0
+    for item in read_queries(input_file):
+        batch.append(item)
+        if len(batch) == batch_size:
+            flush(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        flush(batch)
+        total += len(batch)
+    print(f"Searched {total} queries", file=sys.stderr)
+
 def main():
     parser = create_argument_parser()
     args = parser.parse_args()
 
+    reranker = None
+    if use_reranker:
+        reranker = Reranker(reranker_model, batch_size=rerank_batch_size, time_budget=rerank_time_budget)
+
     if use_openai_embeddings:
             load_dotenv(os.path.join(parent_dir, '.env'))
             openai_client = OpenAI(
@@ -40,13 +134,39 @@ def main():
                 embedding_model=openai_embedding_model,
                 db_path=db_directory,
                 db_collection=collection_name,
-                n_results=args.number_results
+                n_results=args.number_results,
+                vector_db=vector_db,
+                hybrid_search=use_hybrid_search,
+                hybrid_candidates=hybrid_candidates,
+                rrf_k=rrf_k,
+                reranker=reranker,
+                rerank_candidates=rerank_candidates,
+                merge_adjacent=merge_adjacent
                 )
     else:    
         retriever = ChromaRetriever(embedding_model=model_name, 
                                 db_path=db_directory, 
                                 db_collection=collection_name, 
-                                n_results=args.number_results)
+                                n_results=args.number_results,
+                                vector_db=vector_db,
+                                hybrid_search=use_hybrid_search,
+                                hybrid_candidates=hybrid_candidates,
+                                rrf_k=rrf_k,
+                                reranker=reranker,
+                                rerank_candidates=rerank_candidates,
+                                merge_adjacent=merge_adjacent)
+
+    if args.input:
+        input_file = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+        output_file = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            run_batch(retriever, input_file, output_file, args.batch_size)
+        finally:
+            if input_file is not sys.stdin:
+                input_file.close()
+            if output_file is not sys.stdout:
+                output_file.close()
+        return
 
     while True:
         query = str(input("Type a query to search the DB. Type 'quit' to exit:  "))
@@ -7,8 +7,26 @@ model_name = "Lajavaness/bilingual-embedding-large"  #choose any embedding model
 use_openai_embeddings = False # set to True if you want to use openai embeddings api
 openai_embedding_model = "embedding-model-name" # openai embedding model to use if use_openai_embeddings is set to True
 openai_embedding_base_url = 'https://api.openai.com/v1' # openai base url. In case you are using a different base url for openai compatible api
+openai_embedding_max_batch_items = 128 # maximum number of chunks sent in one embeddings request
+openai_embedding_max_batch_tokens = 8000 # maximum (estimated) number of tokens sent in one embeddings request
+openai_embedding_max_concurrency = 4 # maximum number of embeddings requests in flight at the same time
 
-vector_db = "chromaDB" # Allowed Values ['chromaDB', 'FAISS']. Only ChromaDB works now
+vector_db = "chromaDB" # Allowed Values ['chromaDB', 'FAISS', 'numpy']. FAISS needs the faiss-cpu package. numpy is exact search over a memory-mapped matrix, good for up to a few hundred thousand chunks
+
+# settings if using FAISS. The index type, metric and build parameters are fixed when the collection is created
+faiss_index_type = "hnsw" # Allowed Values ['flat', 'ivf', 'hnsw']. flat is exact, ivf and hnsw are approximate and much faster on large collections
+faiss_metric = "ip" # Allowed Values ['ip', 'l2']. ip normalizes the vectors and ranks by cosine similarity
+faiss_nlist = 1024 # number of ivf clusters. Rule of thumb: about 4 * sqrt(number of chunks)
+faiss_nprobe = 16 # number of ivf clusters searched per query. Higher is more accurate and slower
+faiss_hnsw_m = 32 # number of neighbours per hnsw node
+faiss_ef_construction = 200 # hnsw build-time search depth
+faiss_ef_search = 64 # hnsw query-time search depth. Higher is more accurate and slower
+faiss_quantization = None # Allowed Values [None, 'fp16', 'int8']. Stores the vectors in the index as 16 or 8 bit codes, half or a quarter of the memory, with a small loss in recall
+
+# settings if using numpy
+numpy_dtype = "float32" # Allowed Values ['float32', 'float16', 'int8', 'binary']. Storage of the searched matrix: float16 is half, int8 a quarter and binary 1/32 of the float32 size. Fixed when the collection is created
+numpy_rescore = True # also keep the full-precision vectors on disk and rescore the best candidates found with the compact codes. Only candidate rows are read, so memory use stays that of the codes. Fixed when the collection is created
+numpy_rescore_factor = 4 # number of candidates rescored per requested result. Higher recovers more recall for int8 and binary codes
 
 collection_name = "my_collection" #name of the collection in the vector DB
 
@@ -22,3 +40,49 @@ db_directory = os.path.join(os.path.expanduser('~'), '.db')  #default. Change it
 chunk_size = 20   #number of sentences each chunk will contain in the vector db
 
 overlap_size = 5 # must be less than the chunk_size. It indicates how many sentences overlaps when splitting chunks
+
+embedding_batch_size = 64 # number of chunks embedded in one call and written to the vector DB at once. Set to 1 to embed chunk by chunk
+
+parse_workers = None # number of processes used to read and chunk documents. None uses all CPU cores, 0 parses on the main process
+
+parse_queue_size = 1024 # maximum number of parsed chunks waiting to be embedded. Keeps memory flat when parsing is faster than embedding
+
+parse_stream_min_mb = 64 # files of at least this size (MB) are read and chunked as a stream on the main process instead of in a worker, so one huge file can't exhaust memory. None sends every file to the workers
+
+ingest_shards = 1 # number of worker processes that each read, chunk and embed a share of the files with their own SentenceTransformer, feeding one writer. 1 embeds in the main process. Local models only; the OpenAI embedder already sends concurrent requests
+
+ingest_torch_threads = None # torch threads used by each shard worker. None divides the CPU cores between the workers
+
+ingest_checkpoint_interval = 300 # seconds between saving the new vectors and the manifest during a sharded run, so a run that is interrupted or loses a worker resumes from there. None only saves at the end
+
+incremental_indexing = True # only re-embed new or changed files, delete chunks of removed files. Set to False to re-embed every file on each run
+
+use_embedding_cache = True # reuse embeddings of chunk texts that were embedded before, e.g. after changing chunk_size or rebuilding a collection
+
+embedding_cache_dir = os.path.join(db_directory, 'embedding_cache') # where the embedding cache is stored
+
+embedding_cache_max_gb = 10 # the least recently used embeddings are evicted when the cache grows beyond this size. None for no limit
+
+query_cache_size = 1024 # number of query embeddings kept in memory by the retrievers. 0 disables the cache
+
+query_cache_ttl = 3600 # seconds a cached query embedding stays valid. None keeps it until it is evicted
+
+use_hybrid_search = False # fuse the vector search with BM25 keyword search. Finds exact identifiers and rare terms that embeddings miss, so n_results can stay small
+
+build_lexical_index = use_hybrid_search # build a BM25 keyword index next to the vector collection in vector_db_setup.py. Needed by use_hybrid_search; built from the stored chunks on the next run if it is turned on later
+
+hybrid_candidates = 20 # number of results taken from each of the vector and keyword searches before they are fused
+
+rrf_k = 60 # reciprocal rank fusion constant. Larger values give lower ranked results more weight relative to the top ones
+
+use_reranker = False # reorder the retrieved chunks with a cross-encoder before they are sent to the LLM. More accurate, costs CPU time per query
+
+reranker_model = "cross-encoder/ms-marco-MiniLM-L-6-v2" # sentence-transformers CrossEncoder used by the reranker
+
+rerank_candidates = 50 # number of chunks retrieved and scored by the reranker. The best n_results of them are kept
+
+rerank_batch_size = 16 # number of query/chunk pairs scored per cross-encoder call
+
+rerank_time_budget = 0.5 # maximum seconds spent reranking one query. When exceeded, the retrieval order is used. None for no limit
+
+merge_adjacent = False # join consecutive chunks of the same file returned by a search into one passage without the repeated overlap sentences, and fill the freed slots with further results. A merged result's ID is its chunk IDs joined with '+'
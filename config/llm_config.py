@@ -1,6 +1,9 @@
 
 # config for using ollama
 llm_model = 'deepseek-r1:1.5b' # select any model available on the ollama site https://ollama.com/search
+ollama_host = None # url of the ollama server used by the django server. None uses the OLLAMA_HOST environment variable or http://localhost:11434
+ollama_keep_alive = '30m' # how long ollama keeps the model in memory after a request. Avoids reloading the model between chat turns. -1 keeps it loaded
+warm_up_llm = True # pull (if needed) and load the ollama model in the background when the server or chat tool starts, so the first answer does not wait for it
 
 #config for openai api
 use_openai = False # set to True if using openai api and then select 'openai_model' variable. You need to add the openai api token in the .env file in the root dirextory
@@ -9,8 +12,16 @@ openai_base_url = 'https://api.openai.com/v1' # openai base url. In case you are
 
 openai_model = 'gpt-4o' # if using openai api then select which model to use
 
+# answer cache for repeated questions in the chat
+use_response_cache = False # set to True to replay cached answers for near-identical questions that retrieved the same documents
 
+response_cache_threshold = 0.95 # minimum cosine similarity between two questions for the cached answer to be reused
 
+response_cache_size = 1000 # maximum number of cached answers
+
+
+# size of the retrieved data in the prompt
+context_token_budget = None # maximum number of tokens of retrieved documents in the prompt, e.g. 3000. Text repeated by overlapping chunks is removed and the lowest ranked chunks are trimmed or dropped to fit. None puts all retrieved documents in the prompt unchanged
 # prompt template for the LLM
 prompt = """
 DOCUMENTS: \n
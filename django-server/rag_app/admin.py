@@ -4,6 +4,7 @@ from .models import ChatLog
 @admin.register(ChatLog)
 class ChatLogAdmin(admin.ModelAdmin):
     list_display = ('timestamp', 'user_query_summary', 'response_summary')
+    readonly_fields = ('timings',)
 
     def user_query_summary(self, obj):
         return obj.user_query[:50]
@@ -1,6 +1,73 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
+
+
+# Commands of the WSGI/ASGI servers the app is known to be served by, as sys.argv[0] or `python -m` module names
+SERVER_COMMANDS = ('gunicorn', 'uvicorn', 'daphne', 'hypercorn', 'waitress-serve', 'waitress', 'uwsgi')
+
+# Modules only importable inside an embedding server process, which has no useful sys.argv
+SERVER_MODULES = ('uwsgi', 'mod_wsgi')
 
 
 class RagAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rag_app'
+
+    def ready(self):
+        if getattr(settings, 'RAG_METRICS', False):
+            import metrics
+            from .collectors import collect_component_stats
+            metrics.enable()
+            metrics.REGISTRY.add_collector(collect_component_stats)
+
+        if not _should_preload(getattr(settings, 'RAG_PRELOAD_MODELS', 'auto')):
+            return
+
+        from . import registry
+        # Load the embedding model, vector DB and API clients once, before the first request arrives
+        registry.load()
+
+
+def _should_preload(setting) -> bool:
+    """
+    Interprets RAG_PRELOAD_MODELS: True or False as given (also as strings from the environment),
+    anything else ('auto') preloads only in a process detected as serving requests.
+    """
+    value = str(setting).strip().lower()
+    if value in ('true', '1', 'yes', 'on'):
+        # Still skip management commands and the runserver file watcher
+        return _management_command() is None or _is_serving()
+    if value in ('false', '0', 'no', 'off'):
+        return False
+    return _is_serving()
+
+
+def _management_command() -> str | None:
+    """Returns the management command when started by manage.py, else None."""
+    if os.path.basename(sys.argv[0]) != 'manage.py':
+        return None
+    return sys.argv[1] if len(sys.argv) > 1 else ''
+
+
+def _is_serving() -> bool:
+    """
+    Returns True for the runserver process that handles requests and for the known WSGI/ASGI servers.
+    Management commands like migrate, the runserver parent process that only watches files for the
+    autoreloader, and unknown entry points like scripts or test runners are not detected as serving.
+    """
+    command = _management_command()
+    if command is not None:
+        if command != 'runserver':
+            return False
+        return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+
+    program = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else ''
+    if program == '__main__.py':
+        # python -m gunicorn and the like
+        program = os.path.basename(os.path.dirname(sys.argv[0]))
+    if program.endswith('.exe'):
+        program = program[:-len('.exe')]
+    return program in SERVER_COMMANDS or any(module in sys.modules for module in SERVER_MODULES)
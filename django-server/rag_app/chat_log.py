@@ -0,0 +1,171 @@
+"""
+Background persistence of ChatLog rows.
+
+Views hand finished chat turns to a per-process ChatLogWriter instead of inserting them themselves.
+A writer thread collects them and inserts them with one bulk_create per batch, so concurrent chats
+don't serialize on the SQLite write lock and a stream is closed as soon as its last chunk is sent.
+"""
+import os
+import time
+import queue
+import atexit
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+from .models import ChatLog
+
+
+OVERFLOW_POLICIES = ("drop", "block")
+
+# Tells the writer thread to flush and exit
+_STOP = object()
+
+_lock = threading.Lock()
+_writer = None
+
+
+class ChatLogWriter:
+    """
+    Inserts chat turns from a bounded queue in batches on a background thread.
+
+    A batch is written when it has batch_size rows or when its oldest row has waited flush_interval
+    seconds. When the queue is full, 'drop' discards the turn right away and 'block' waits up to
+    block_timeout seconds for room first; either way the caller never waits on the database.
+    Rows get their timestamp when they are inserted, at most about flush_interval after the turn ended.
+    """
+    def __init__(
+        self,
+        queue_size: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        overflow: str = "drop",
+        block_timeout: float = 0.05,
+        store_timings: bool = False,
+    ) -> None:
+        """
+        Args:
+            queue_size: Maximum number of turns waiting to be written.
+            batch_size: Maximum number of rows per bulk_create.
+            flush_interval: Maximum seconds a turn waits for its batch to fill.
+            overflow: 'drop' or 'block', what submit does when the queue is full.
+            block_timeout: Seconds submit waits for room with the 'block' policy before dropping the turn.
+            store_timings: Save the stage timings passed to submit with each row.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.store_timings = store_timings
+        self.pid = os.getpid()
+        # Turns discarded because the queue was full, and rows lost to database errors
+        self.dropped = 0
+        self.failed = 0
+
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_query: str, response: str, timings: dict | None = None, block: bool = True) -> bool:
+        """
+        Queues a chat turn for writing.
+
+        Args:
+            user_query: The user's question.
+            response: The full answer.
+            timings: The stage timings of the request, stored if RAG_CHAT_LOG_TIMINGS is on.
+            block: Allow the 'block' policy to wait for room. Async views pass False so the event loop never waits.
+
+        Returns:
+            bool: False if the turn was dropped because the queue was full.
+        """
+        item = ChatLog(user_query=user_query, response=response, timings=timings if self.store_timings else None)
+        try:
+            if block and self.overflow == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                print(f"Chat log queue is full; {self.dropped} chat turn(s) dropped so far")
+            return False
+
+    def pending(self) -> int:
+        """Returns the number of turns waiting to be written."""
+        return self._queue.qsize()
+
+    def close(self, timeout: float | None = 10.0) -> None:
+        """Writes the queued turns and stops the writer thread."""
+        if not self._thread.is_alive():
+            return
+        while True:
+            # The stop marker must not be dropped, so wait for room while the thread drains the queue
+            try:
+                self._queue.put(_STOP, timeout=0.1)
+                break
+            except queue.Full:
+                if not self._thread.is_alive():
+                    return
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        batch = []
+        deadline = None
+        stopping = False
+        try:
+            while not stopping:
+                try:
+                    item = self._queue.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    stopping = True
+                elif item is not None:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                    self._write(batch)
+                    batch = []
+                    deadline = None
+        finally:
+            # The thread's own database connection
+            connection.close()
+
+    def _write(self, batch: list[ChatLog]) -> None:
+        try:
+            ChatLog.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Could not save {len(batch)} chat log row(s): {e}")
+            # Drop a broken connection, so the next batch opens a new one
+            connection.close()
+
+
+def get_writer() -> ChatLogWriter:
+    """Returns this process's writer, starting it on first use (and again in a forked worker process)."""
+    global _writer
+    if _writer is None or _writer.pid != os.getpid():
+        with _lock:
+            if _writer is None or _writer.pid != os.getpid():
+                _writer = ChatLogWriter(
+                    queue_size=getattr(settings, 'RAG_CHAT_LOG_QUEUE_SIZE', 10000),
+                    batch_size=getattr(settings, 'RAG_CHAT_LOG_BATCH_SIZE', 100),
+                    flush_interval=getattr(settings, 'RAG_CHAT_LOG_FLUSH_INTERVAL', 1.0),
+                    overflow=getattr(settings, 'RAG_CHAT_LOG_OVERFLOW', 'drop'),
+                    block_timeout=getattr(settings, 'RAG_CHAT_LOG_BLOCK_TIMEOUT', 0.05),
+                    store_timings=getattr(settings, 'RAG_CHAT_LOG_TIMINGS', False),
+                )
+                # Flush what is queued when the server shuts down
+                atexit.register(_writer.close)
+    return _writer
+
+
+def log_chat(user_query: str, response: str, timings: dict | None = None, block: bool = True) -> bool:
+    """Queues a chat turn for the background writer. See ChatLogWriter.submit."""
+    return get_writer().submit(user_query, response, timings=timings, block=block)
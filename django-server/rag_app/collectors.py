@@ -0,0 +1,35 @@
+"""
+Metrics collectors for the /metrics endpoint. They read the counts the shared components keep anyway
+(cache hits, reranker fallbacks, chat log drops) when the endpoint is scraped, not on the request path.
+"""
+from . import chat_log
+
+
+def collect_component_stats() -> list[tuple]:
+    # Imported here so enabling metrics doesn't load the ML libraries in management commands
+    from . import registry
+
+    collected = []
+    retriever = registry.peek("retriever")
+    response_cache = registry.peek("response_cache")
+
+    caches = []
+    if retriever is not None:
+        caches.append(("query_embedding", retriever.query_cache))
+    if response_cache is not None:
+        caches.append(("response", response_cache))
+    if caches:
+        collected.append(("rag_cache_hits_total", "counter", "Cache hits, by cache.", [({"cache": name}, cache.hits) for name, cache in caches]))
+        collected.append(("rag_cache_misses_total", "counter", "Cache misses, by cache.", [({"cache": name}, cache.misses) for name, cache in caches]))
+
+    reranker = getattr(retriever, "reranker", None)
+    if reranker is not None:
+        collected.append(("rag_rerank_fallbacks_total", "counter", "Queries whose reranking ran out of its time budget.", [({}, reranker.fallbacks)]))
+        collected.append(("rag_rerank_overruns_total", "counter", "Queries whose reranking finished after its time budget.", [({}, reranker.overruns)]))
+
+    writer = chat_log._writer
+    if writer is not None:
+        collected.append(("rag_chat_log_pending", "gauge", "Chat turns waiting to be written.", [({}, writer.pending())]))
+        collected.append(("rag_chat_log_dropped_total", "counter", "Chat turns dropped because the queue was full.", [({}, writer.dropped)]))
+        collected.append(("rag_chat_log_failed_total", "counter", "Chat log rows lost to database errors.", [({}, writer.failed)]))
+    return collected
@@ -4,6 +4,8 @@ class ChatLog(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     user_query = models.TextField()
     response = models.TextField()
+    # Stage timings in milliseconds, stored when RAG_METRICS and RAG_CHAT_LOG_TIMINGS are on
+    timings = models.JSONField(null=True, blank=True)
 
     def __str__(self):
         return f"[{self.timestamp}] {self.user_query[:50]}..."
@@ -0,0 +1,227 @@
+"""
+Process-wide registry of the expensive objects used by the views.
+
+The embedding model, the vector DB client/collection and the OpenAI clients are created once per
+process (at startup from RagAppConfig.ready, or lazily on first use) and shared by all requests.
+SentenceTransformer.encode, the Chroma client and the OpenAI client are safe to call from several
+threads, so requests only pay for query embedding and the ANN search.
+"""
+import os
+import asyncio
+import weakref
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import ollama
+from django.conf import settings
+from dotenv import load_dotenv
+from openai import OpenAI, AsyncOpenAI
+
+from retrieval.main import ChromaRetriever, OpenAIChromaRetriever
+from retrieval.rerank import Reranker
+from retrieval.context import ContextBuilder
+from retrieval.cache import QueryEmbeddingCache
+from llm.main import Responder, OpenAIResponder, warm_up_in_background
+from llm.response_cache import SemanticResponseCache
+from embedding.manifest import collection_version
+from config.embedding_config import model_name, db_directory, collection_name, use_openai_embeddings, openai_embedding_model, openai_embedding_base_url, query_cache_size, query_cache_ttl, vector_db, use_hybrid_search, hybrid_candidates, rrf_k, use_reranker, reranker_model, rerank_candidates, rerank_batch_size, rerank_time_budget, merge_adjacent
+from config.llm_config import llm_model, prompt, openai_model, use_openai, openai_base_url, ollama_host, ollama_keep_alive, warm_up_llm, context_token_budget, use_response_cache, response_cache_threshold, response_cache_size
+
+
+# Default number of documents retrieved for a chat turn. Callers can override it per retrieve call.
+DEFAULT_N_RESULTS = 5
+
+_lock = threading.Lock()
+_components = None
+
+# Async LLM clients, one per event loop
+_async_llm_clients = weakref.WeakKeyDictionary()
+
+# Threads that get the responder ready while a chat turn retrieves. The work is short (a cached
+# model check), so a few threads serve many concurrent requests
+_prepare_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-prepare")
+
+
+def _build() -> dict:
+    """Creates all shared components. Runs without holding on to the previous ones."""
+    load_dotenv(os.path.join(settings.BASE_DIR.parent, '.env'))
+    components = {}
+    query_cache = QueryEmbeddingCache(max_size=query_cache_size, ttl=query_cache_ttl)
+    reranker = None
+    if use_reranker:
+        reranker = Reranker(reranker_model, batch_size=rerank_batch_size, time_budget=rerank_time_budget)
+    context_builder = None
+    if context_token_budget is not None:
+        context_builder = ContextBuilder(max_tokens=context_token_budget, model=openai_model if use_openai else llm_model)
+
+    if use_openai_embeddings:
+        embedding_client = OpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            base_url=openai_embedding_base_url
+        )
+        components["retriever"] = OpenAIChromaRetriever(
+            openai_client=embedding_client,
+            embedding_model=openai_embedding_model,
+            db_path=db_directory,
+            db_collection=collection_name,
+            n_results=DEFAULT_N_RESULTS,
+            query_cache=query_cache,
+            vector_db=vector_db,
+            hybrid_search=use_hybrid_search,
+            hybrid_candidates=hybrid_candidates,
+            rrf_k=rrf_k,
+            reranker=reranker,
+            rerank_candidates=rerank_candidates,
+            context_builder=context_builder,
+            merge_adjacent=merge_adjacent
+        )
+    else:
+        components["retriever"] = ChromaRetriever(
+            embedding_model=model_name,
+            db_path=db_directory,
+            db_collection=collection_name,
+            n_results=DEFAULT_N_RESULTS,
+            query_cache=query_cache,
+            vector_db=vector_db,
+            hybrid_search=use_hybrid_search,
+            hybrid_candidates=hybrid_candidates,
+            rrf_k=rrf_k,
+            reranker=reranker,
+            rerank_candidates=rerank_candidates,
+            context_builder=context_builder,
+            merge_adjacent=merge_adjacent
+        )
+
+    components["response_cache"] = None
+    if use_response_cache:
+        components["response_cache"] = SemanticResponseCache(
+            threshold=response_cache_threshold,
+            max_size=response_cache_size
+        )
+
+    # One responder serves every chat turn, so the LLM client's connection pool is reused
+    components["llm_client"] = None
+    if use_openai:
+        components["llm_client"] = OpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            base_url=openai_base_url
+        )
+        components["responder"] = OpenAIResponder(
+            model=openai_model,
+            prompt_template=prompt,
+            cleint=components["llm_client"]
+        )
+    else:
+        components["responder"] = Responder(
+            model=llm_model,
+            prompt_template=prompt,
+            keep_alive=ollama_keep_alive,
+            client=ollama.Client(host=ollama_host)
+        )
+        if warm_up_llm:
+            # Pull and load the Ollama model while the rest starts up, off the request path
+            warm_up_in_background(components["responder"])
+    return components
+
+
+def _get(name: str):
+    """Returns a shared component, building all of them on first use."""
+    global _components
+    components = _components
+    if components is None:
+        with _lock:
+            # Another thread may have finished building while this one waited for the lock
+            if _components is None:
+                _components = _build()
+            components = _components
+    return components[name]
+
+
+def peek(name: str):
+    """Returns a shared component if the components are built, without building them."""
+    components = _components
+    return components.get(name) if components is not None else None
+
+
+def load() -> None:
+    """Loads all shared components if they are not loaded yet. Called at startup."""
+    _get("retriever")
+
+
+def reload() -> None:
+    """
+    Rebuilds all shared components, e.g. after the vector DB was re-indexed or the config changed.
+
+    The new components are built first and then swapped in, so requests that are already running
+    keep using the old ones and new requests never see a half-built state.
+    """
+    global _components
+    components = _build()
+    with _lock:
+        _components = components
+
+
+def get_retriever() -> ChromaRetriever | OpenAIChromaRetriever:
+    """Returns the shared retriever (ChromaRetriever or OpenAIChromaRetriever, depending on the config)."""
+    return _get("retriever")
+
+
+def get_responder() -> Responder | OpenAIResponder:
+    """Returns the shared responder. Each call passes the query and the retrieved data."""
+    return _get("responder")
+
+
+def prepare_responder() -> Future:
+    """
+    Starts getting the shared responder ready for generation (the Ollama model check, pulling the model
+    if needed) in a background thread, so it runs while the request retrieves. The stage timings go to
+    the caller's metrics trace.
+
+    Returns:
+        Future: Resolves to the responder, or raises the error of the model check.
+    """
+    def prepare():
+        responder = get_responder()
+        responder.prepare()
+        return responder
+
+    return _prepare_executor.submit(contextvars.copy_context().run, prepare)
+
+
+def get_llm_client() -> OpenAI | None:
+    """Returns the shared OpenAI client for generation, or None when Ollama is used."""
+    return _get("llm_client")
+
+
+def get_async_llm_client() -> AsyncOpenAI | ollama.AsyncClient:
+    """
+    Returns the async client for generation used by the async chat endpoint: AsyncOpenAI, or an Ollama
+    AsyncClient when Ollama is used.
+
+    Async HTTP connections belong to the event loop they were opened on, so one client is kept per loop.
+    Under an ASGI server there is a single loop and all requests share the client and its connection pool.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_llm_clients.get(loop)
+    if client is None:
+        if use_openai:
+            load_dotenv(os.path.join(settings.BASE_DIR.parent, '.env'))
+            client = AsyncOpenAI(
+                api_key=os.environ.get("OPENAI_API_KEY"),
+                base_url=openai_base_url
+            )
+        else:
+            client = ollama.AsyncClient(host=ollama_host)
+        _async_llm_clients[loop] = client
+    return client
+
+
+def get_response_cache() -> SemanticResponseCache | None:
+    """Returns the shared answer cache, or None if use_response_cache is off."""
+    return _get("response_cache")
+
+
+def get_collection_version() -> int | None:
+    """Returns the current version of the collection. It changes whenever vector_db_setup re-indexes it."""
+    return collection_version(db_directory, collection_name)
@@ -1,3 +1,159 @@
-from django.test import TestCase
+import os
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import chat_log
+from .chat_log import ChatLogWriter
+from .models import ChatLog
+
+
+class RecordingWriter(ChatLogWriter):
+    """A ChatLogWriter that keeps its batches instead of inserting them, and can be held before a write."""
+    def __init__(self, *args, **kwargs) -> None:
+        self.batches = []
+        self.writing = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        super().__init__(*args, **kwargs)
+
+    def _write(self, batch):
+        self.writing.set()
+        self.release.wait(5)
+        with mock.patch.object(ChatLog.objects, 'bulk_create', side_effect=lambda rows, **kwargs: self.batches.append(list(rows))):
+            super()._write(batch)
+
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+    def hold(self):
+        """Makes the writer stop at its next write, so the queue fills up."""
+        self.release.clear()
+        self.writing.clear()
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class ChatLogWriterTest(SimpleTestCase):
+    def setUp(self):
+        self.writers = []
+
+    def tearDown(self):
+        for writer in self.writers:
+            writer.release.set()
+            writer.close()
+
+    def make_writer(self, **kwargs) -> RecordingWriter:
+        writer = RecordingWriter(**kwargs)
+        self.writers.append(writer)
+        return writer
+
+    def test_writes_full_batches_and_rest_on_close(self):
+        writer = self.make_writer(batch_size=3, flush_interval=60)
+        for i in range(7):
+            self.assertTrue(writer.submit(f"q{i}", f"a{i}"))
+        writer.close()
+
+        self.assertEqual([len(batch) for batch in writer.batches], [3, 3, 1])
+        self.assertEqual([row.user_query for row in writer.rows()], [f"q{i}" for i in range(7)])
+        self.assertEqual(writer.pending(), 0)
+
+    def test_partial_batch_is_written_after_flush_interval(self):
+        writer = self.make_writer(batch_size=100, flush_interval=0.05)
+        writer.submit("q", "a")
+        self.assertTrue(wait_for(lambda: len(writer.rows()) == 1))
+        self.assertTrue(writer._thread.is_alive())
+
+    def test_drop_policy_discards_when_full(self):
+        writer = self.make_writer(queue_size=1, batch_size=1, overflow="drop")
+        writer.hold()
+        writer.submit("first", "a")
+        self.assertTrue(writer.writing.wait(5))
+        self.assertTrue(writer.submit("second", "a"))
+
+        started = time.monotonic()
+        self.assertFalse(writer.submit("third", "a"))
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(writer.dropped, 1)
+
+        writer.release.set()
+        writer.close()
+        self.assertEqual([row.user_query for row in writer.rows()], ["first", "second"])
+
+    def test_block_policy_waits_for_room(self):
+        writer = self.make_writer(queue_size=1, batch_size=1, overflow="block", block_timeout=2.0)
+        writer.hold()
+        writer.submit("first", "a")
+        self.assertTrue(writer.writing.wait(5))
+        writer.submit("second", "a")
+
+        # Async views don't wait even with the 'block' policy
+        self.assertFalse(writer.submit("skipped", "a", block=False))
+
+        threading.Timer(0.05, writer.release.set).start()
+        self.assertTrue(writer.submit("third", "a"))
+        writer.close()
+        self.assertEqual([row.user_query for row in writer.rows()], ["first", "second", "third"])
+        self.assertEqual(writer.dropped, 1)
+
+    def test_block_policy_drops_after_timeout(self):
+        writer = self.make_writer(queue_size=1, batch_size=1, overflow="block", block_timeout=0.05)
+        writer.hold()
+        writer.submit("first", "a")
+        self.assertTrue(writer.writing.wait(5))
+        writer.submit("second", "a")
+        self.assertFalse(writer.submit("third", "a"))
+        self.assertEqual(writer.dropped, 1)
+
+    def test_timings_are_stored_only_when_enabled(self):
+        writer = self.make_writer(store_timings=False)
+        writer.submit("q", "a", timings={"llm": 1.0})
+        writer.close()
+        self.assertIsNone(writer.rows()[0].timings)
+
+        writer = self.make_writer(store_timings=True)
+        writer.submit("q", "a", timings={"llm": 1.0})
+        writer.close()
+        self.assertEqual(writer.rows()[0].timings, {"llm": 1.0})
+
+    def test_database_error_is_counted_and_writer_keeps_running(self):
+        writer = ChatLogWriter(batch_size=1, flush_interval=60)
+        written = []
+        calls = []
+
+        def bulk_create(rows, **kwargs):
+            calls.append(len(rows))
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            written.extend(rows)
+
+        with mock.patch.object(ChatLog.objects, 'bulk_create', side_effect=bulk_create):
+            writer.submit("lost", "a")
+            writer.submit("kept", "a")
+            writer.close()
+
+        self.assertEqual(writer.failed, 1)
+        self.assertEqual([row.user_query for row in written], ["kept"])
+
+    def test_invalid_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            ChatLogWriter(overflow="wait")
+
+    def test_writer_is_restarted_in_forked_process(self):
+        with mock.patch.object(chat_log, '_writer', None), mock.patch.object(chat_log.atexit, 'register'):
+            writer = chat_log.get_writer()
+            self.assertIs(chat_log.get_writer(), writer)
+            writer.pid = os.getpid() + 1
+            replacement = chat_log.get_writer()
+            self.assertIsNot(replacement, writer)
+            writer.close()
+            replacement.close()
@@ -6,4 +6,6 @@ urlpatterns = [
     path('search/', views.search, name='search'),
     path('chat/', views.chat_page, name='chat'),
     path('chat/stream/', views.chat_stream, name='chat_stream'),
+    path('chat/stream/async/', views.chat_stream_async, name='chat_stream_async'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
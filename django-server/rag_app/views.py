@@ -1,21 +1,18 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
-from django.http import StreamingHttpResponse, JsonResponse
-from django.conf import settings
-
-from retrieval.main import ChromaRetriever, OpenAIChromaRetriever
-from config.embedding_config import model_name, db_directory, collection_name, use_openai_embeddings, openai_embedding_model, openai_embedding_base_url
+from django.http import StreamingHttpResponse, JsonResponse, HttpResponse
 
-from llm.main import Responder, OpenAIResponder
-from config.llm_config import llm_model, prompt, use_openai, openai_model, record_data, openai_base_url
-from .models import ChatLog
-from datetime import datetime
+import metrics
+from config.llm_config import llm_model, use_openai, openai_model, record_data
+from . import registry
+from .chat_log import log_chat
 
-from dotenv import load_dotenv
-from openai import OpenAI
-import os 
 import json
+import asyncio
 
 
 
@@ -29,36 +26,14 @@ def search(request):
     formatted_results = []
 
     if request.method == "POST":
+        trace = metrics.start_trace()
         query = request.POST["query"]
         n_results = int(request.POST["n_results"])
         submitted = True
-        if use_openai_embeddings:
-            load_dotenv(os.path.join(settings.BASE_DIR.parent, '.env'))
-            openai_client = OpenAI(
-                api_key=os.environ.get("OPENAI_API_KEY"),
-                base_url=openai_embedding_base_url
-            )
-            try:
-                retriever = OpenAIChromaRetriever(
-                    openai_client=openai_client,
-                    embedding_model=openai_embedding_model,
-                    db_path=db_directory,
-                    db_collection=collection_name,
-                    n_results=n_results
-                )
-            except Exception as e:
-                print(f"Error during retrieval: {e}")
-        else:
-            try:
-                retriever = ChromaRetriever(
-                    embedding_model=model_name, 
-                    db_path=db_directory, 
-                    db_collection=collection_name, 
-                    n_results=n_results
-                )
-            except Exception as e:
-                print(f"Error during retrieval: {e}")
-        raw_results = retriever.retrieve(query)
+        retriever = registry.get_retriever()
+        raw_results = retriever.retrieve(query, n_results=n_results) or {}
+        metrics.end_trace(trace)
+        metrics.record_request("search", "ok" if raw_results else "no_results")
 
         # Process raw results into a template-friendly format
         documents = raw_results.get("documents", [[]])[0]
@@ -89,7 +64,21 @@ def search(request):
 def chat_page(request):
     # Renders the chat page with the form and no answers yet
     footer_class = 'footer-absolute'
-    return render(request, 'rag_app/chat.html', {'footer_class': footer_class, 'record_data': record_data})
+    chat_stream_url = reverse('chat_stream_async' if settings.RAG_ASYNC_CHAT else 'chat_stream')
+    return render(request, 'rag_app/chat.html', {'footer_class': footer_class, 'record_data': record_data, 'chat_stream_url': chat_stream_url})
+
+
+def docs_for_frontend(search_results) -> list[dict]:
+    """Returns the retrieved documents in the format the chat page shows below the answer."""
+    doc_list = []
+    if search_results and 'documents' in search_results and 'metadatas' in search_results:
+        for doc, metadata in zip(search_results['documents'][0], search_results['metadatas'][0]):
+            doc_list.append({
+                "file_name": metadata.get('file_name', 'N/A'),
+                "chunk_id": metadata.get('chunk_id', 'N/A'),
+                "content": doc
+            })
+    return doc_list
 
 
 @csrf_exempt
@@ -99,82 +88,66 @@ def chat_stream(request):
     if not user_query:
         return JsonResponse({"error": "No query provided"}, status=400)
 
-    # -- 1) Retrieve
-    if use_openai_embeddings:
-        load_dotenv(os.path.join(settings.BASE_DIR.parent, '.env'))
-        openai_client = OpenAI(
-            api_key=os.environ.get("OPENAI_API_KEY"),
-            base_url=openai_embedding_base_url
-        )
-        retriever = OpenAIChromaRetriever(
-            openai_client=openai_client,
-            embedding_model=openai_embedding_model,
-            db_path=db_directory,
-            db_collection=collection_name,
-            n_results=5
-        )
-    else:
-        retriever = ChromaRetriever(
-            embedding_model=model_name, 
-            db_path=db_directory, 
-            db_collection=collection_name, 
-            n_results=5
-        )
-    search_results = retriever.retrieve(user_query)
+    trace = metrics.start_trace()
 
-    formatted_result = retriever.format_results_for_prompt(search_results)
+    # -- 1) Get the LLM ready (model check, pulling it if needed) while the documents are retrieved
+    preparing = registry.prepare_responder()
 
+    # -- 2) Retrieve and generate inside the stream, so the response headers go out right away
+    def stream_generator():
+        # An empty first chunk makes the server send the headers before retrieval starts
+        yield ""
 
-    doc_list_for_frontend = []
-    if search_results and 'documents' in search_results and 'metadatas' in search_results:
-        for doc, metadata in zip(search_results['documents'][0], search_results['metadatas'][0]):
-            doc_list_for_frontend.append({
-                "file_name": metadata.get('file_name', 'N/A'),
-                "chunk_id": metadata.get('chunk_id', 'N/A'),
-                "content": doc
-            })
+        retriever = registry.get_retriever()
+        search_results = retriever.retrieve(user_query)
 
-    # -- 2) Initialize an LLM Responder
-    if use_openai:
-        load_dotenv(os.path.join(settings.BASE_DIR.parent, '.env'))
-        openai_client = OpenAI(
-            api_key=os.environ.get("OPENAI_API_KEY"),
-            base_url=openai_base_url
-        )
-        responder = OpenAIResponder(
-            data=formatted_result,
-            model=openai_model,
-            prompt_template=prompt,
-            query=user_query,
-            cleint=openai_client
-        )
-    else:
-        responder = Responder(
-            data=formatted_result,
-            model=llm_model,
-            prompt_template=prompt,
-            query=user_query
-        )
+        formatted_result = retriever.format_results_for_prompt(search_results)
+
+
+        doc_list_for_frontend = docs_for_frontend(search_results)
+
+        # -- 3) Look for a cached answer to a near-identical question over the same documents
+        llm_name = openai_model if use_openai else llm_model
+        response_cache = registry.get_response_cache()
+        cached = None
+        if response_cache is not None and search_results:
+            query_embedding = retriever.embed_query(user_query)
+            chunk_ids = search_results['ids'][0]
+            collection_version = registry.get_collection_version()
+            with metrics.span("response_cache_lookup"):
+                cached = response_cache.lookup(query_embedding, chunk_ids, llm_name, collection_version)
+
+        # -- 4) Stream from the shared LLM Responder, unless the cached answer is replayed
+        if cached is not None:
+            response_chunks = iter([cached["response"]])
+        else:
+            responder = preparing.result()
+            response_chunks = responder.stream_response_chunks(query=user_query, data=formatted_result)
 
-    # -- 3) Prepare a streaming generator
-    def stream_generator():
         full_response = ""
+        timer = metrics.stream_timer(trace)
         # First yield the LLM's output
-        for chunk in responder.stream_response_chunks():
+        for chunk in response_chunks:
+            timer.token()
             full_response += chunk
             yield chunk
+        timer.finish()
+
+        # Only answers that were generated completely are cached
+        if response_cache is not None and cached is None and search_results:
+            response_cache.store(query_embedding, chunk_ids, llm_name, collection_version, full_response, doc_list_for_frontend)
 
         # Yield retrieved documents info to the client
         docs_json_str = json.dumps(doc_list_for_frontend)
         final_chunk = f"<|DOCS_JSON|>{docs_json_str}"
         yield final_chunk
 
-        # Save conversation if flag is True
+        timings = metrics.end_trace(trace)
+        metrics.record_request("chat_stream", "cached" if cached is not None else "generated")
+
+        # Save conversation if flag is True. The background writer inserts it, so the stream isn't held up
         if record_data:
-            ChatLog.objects.create(
-                user_query=user_query,
-                response=full_response,
-            )
+            log_chat(user_query, full_response, timings=timings)
 
 
         # After the model output finishes, yield one last "special" chunk
@@ -183,9 +156,105 @@ def chat_stream(request):
         docs_json_str = json.dumps(doc_list_for_frontend)
         yield f"<|DOCS_JSON|>{docs_json_str}"
 
-    # -- 4) Return the streaming response
+    # -- 5) Return the streaming response
     return StreamingHttpResponse(
         stream_generator(), 
         content_type='text/plain'
     )
 
+
+def _discard(task: asyncio.Task) -> None:
+    """Cancels a task that is no longer needed, without a 'Task exception was never retrieved' warning if it failed."""
+    task.cancel()
+    task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+
+@csrf_exempt
+@require_POST
+async def chat_stream_async(request):
+    """
+    Async version of chat_stream for ASGI servers. Retrieval runs in a worker thread while the model
+    check runs on the event loop, and the answer is streamed from the async Ollama/OpenAI client, so a
+    chat waiting on the LLM does not hold a thread.
+    """
+    user_query = request.POST.get('query', '').strip()
+    if not user_query:
+        return JsonResponse({"error": "No query provided"}, status=400)
+
+    trace = metrics.start_trace()
+
+    # -- 1) Retrieve and generate inside the stream, so the response headers go out right away
+    async def stream_generator():
+        # Retrieval is blocking and runs off the event loop; the model check overlaps with it
+        responder = await sync_to_async(registry.get_responder, thread_sensitive=False)()
+        client = registry.get_async_llm_client()
+        preparing = asyncio.ensure_future(responder.aprepare(client))
+        try:
+            retriever = registry.get_retriever()
+            search_results = await sync_to_async(retriever.retrieve, thread_sensitive=False)(user_query)
+        except BaseException:
+            _discard(preparing)
+            raise
+
+        formatted_result = retriever.format_results_for_prompt(search_results)
+        doc_list_for_frontend = docs_for_frontend(search_results)
+
+        # -- 2) Look for a cached answer to a near-identical question over the same documents
+        llm_name = openai_model if use_openai else llm_model
+        response_cache = registry.get_response_cache()
+        cached = None
+        if response_cache is not None and search_results:
+            query_embedding = await sync_to_async(retriever.embed_query, thread_sensitive=False)(user_query)
+            chunk_ids = search_results['ids'][0]
+            collection_version = registry.get_collection_version()
+            with metrics.span("response_cache_lookup"):
+                cached = response_cache.lookup(query_embedding, chunk_ids, llm_name, collection_version)
+
+        # -- 3) Stream from the async LLM client, unless the cached answer is replayed
+        if cached is not None:
+            _discard(preparing)
+            async def replay():
+                yield cached["response"]
+            response_chunks = replay()
+        else:
+            await preparing
+            response_chunks = responder.astream_response_chunks(
+                query=user_query,
+                data=formatted_result,
+                client=client
+            )
+
+        # -- 4) Stream the answer, then the retrieved documents, in the same format as chat_stream
+        full_response = ""
+        timer = metrics.stream_timer(trace)
+        async for chunk in response_chunks:
+            timer.token()
+            full_response += chunk
+            yield chunk
+        timer.finish()
+
+        if response_cache is not None and cached is None and search_results:
+            response_cache.store(query_embedding, chunk_ids, llm_name, collection_version, full_response, doc_list_for_frontend)
+
+        docs_json_str = json.dumps(doc_list_for_frontend)
+        yield f"<|DOCS_JSON|>{docs_json_str}"
+
+        timings = metrics.end_trace(trace)
+        metrics.record_request("chat_stream_async", "cached" if cached is not None else "generated")
+
+        if record_data:
+            log_chat(user_query, full_response, timings=timings, block=False)
+
+        yield f"<|DOCS_JSON|>{docs_json_str}"
+
+    return StreamingHttpResponse(
+        stream_generator(),
+        content_type='text/plain'
+    )
+
+
+def metrics_view(request):
+    """Serves the request path metrics in the Prometheus text format, if RAG_METRICS is on."""
+    if not metrics.is_enabled():
+        return HttpResponse("Metrics are disabled. Set RAG_METRICS=True to enable them.", status=404, content_type='text/plain')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -8,9 +8,13 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
+import sys
 
 from django.core.asgi import get_asgi_application
 
+# Make the framework packages (retrieval, llm, config, ...) importable, as manage.py does
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rag_server.settings')
 
 application = get_asgi_application()
@@ -135,3 +135,29 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'rag_app', 'static'),
 ]
+
+
+# Load the embedding model, vector DB and LLM clients once at startup instead of on the first request.
+# 'auto' preloads under runserver and known WSGI/ASGI servers (gunicorn, uvicorn, daphne, hypercorn,
+# waitress, uWSGI, mod_wsgi) only; True also preloads under any other entry point, False never
+RAG_PRELOAD_MODELS = env('RAG_PRELOAD_MODELS', default='auto')
+
+# Use the async chat endpoint in the chat page. Meant for ASGI servers (rag_server.asgi), where
+# a streaming chat does not hold a worker thread while the LLM generates
+RAG_ASYNC_CHAT = env.bool('RAG_ASYNC_CHAT', default=False)
+
+# Chat turns are saved by a background thread in batches (see rag_app/chat_log.py). A batch is written
+# when it has RAG_CHAT_LOG_BATCH_SIZE rows or after RAG_CHAT_LOG_FLUSH_INTERVAL seconds. When more than
+# RAG_CHAT_LOG_QUEUE_SIZE turns are waiting, 'drop' discards new turns and 'block' first waits up to
+# RAG_CHAT_LOG_BLOCK_TIMEOUT seconds for room
+RAG_CHAT_LOG_QUEUE_SIZE = env.int('RAG_CHAT_LOG_QUEUE_SIZE', default=10000)
+RAG_CHAT_LOG_BATCH_SIZE = env.int('RAG_CHAT_LOG_BATCH_SIZE', default=100)
+RAG_CHAT_LOG_FLUSH_INTERVAL = env.float('RAG_CHAT_LOG_FLUSH_INTERVAL', default=1.0)
+RAG_CHAT_LOG_OVERFLOW = env.str('RAG_CHAT_LOG_OVERFLOW', default='drop')
+RAG_CHAT_LOG_BLOCK_TIMEOUT = env.float('RAG_CHAT_LOG_BLOCK_TIMEOUT', default=0.05)
+
+# Per-stage latency metrics (query embedding, vector search, model check, time to first token, ...)
+# served in the Prometheus text format at /metrics. Off by default; when off, timing costs next to nothing.
+# RAG_CHAT_LOG_TIMINGS also stores each chat turn's stage timings in ChatLog.timings
+RAG_METRICS = env.bool('RAG_METRICS', default=False)
+RAG_CHAT_LOG_TIMINGS = env.bool('RAG_CHAT_LOG_TIMINGS', default=False)
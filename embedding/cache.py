@@ -0,0 +1,142 @@
+import os
+import re
+import math
+import time
+import sqlite3
+import hashlib
+from array import array
+
+
+class EmbeddingCache:
+    """
+    An on-disk cache of chunk embeddings keyed by (embedding model name, hash of the normalized chunk text).
+
+    Vectors are stored as packed float32 blobs in a SQLite file, which keeps them compact and lets the
+    cache be shared between runs and collections. When the stored vectors grow beyond max_bytes the
+    least recently used entries are evicted.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int | None = None) -> None:
+        """
+        Args:
+            cache_dir: The directory holding the cache file. It is created if it does not exist.
+            max_bytes: The maximum total size of the stored vectors. None disables eviction.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "embeddings.sqlite3")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " key BLOB NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, key))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+
+        # Running estimate of the stored size, so the table is not summed on every write
+        self._size = self.size_bytes() if self.max_bytes is not None else 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapses whitespace, so chunks that only differ in line breaks or spacing share an entry."""
+        return re.sub(r"\s+", " ", text).strip()
+
+    @classmethod
+    def key(cls, text: str) -> bytes:
+        """Returns the cache key of a text."""
+        return hashlib.sha256(cls.normalize(text).encode("utf-8")).digest()
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        """
+        Looks up the embeddings of several texts.
+
+        Args:
+            model: The name of the embedding model.
+            texts: The texts to look up.
+
+        Returns:
+            list[list[float] | None]: One embedding per text, None where the text is not cached.
+        """
+        keys = [self.key(text) for text in texts]
+        found = {}
+        # SQLite limits the number of parameters of a statement, so look keys up in slices
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({','.join('?' * len(part))})",
+                [model, *part]
+            ).fetchall()
+            found.update(rows)
+
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                [(now, model, key) for key in found]
+            )
+            self.conn.commit()
+
+        embeddings = []
+        for key in keys:
+            blob = found.get(key)
+            if blob is None:
+                self.misses += 1
+                embeddings.append(None)
+            else:
+                self.hits += 1
+                vector = array("f")
+                vector.frombytes(blob)
+                embeddings.append(vector.tolist())
+        return embeddings
+
+    def put_many(self, model: str, texts: list[str], embeddings: list[list[float]]) -> None:
+        """Stores the embeddings of several texts and evicts old entries if the cache grew too large."""
+        now = time.time()
+        rows = [
+            (model, self.key(text), array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+            if embedding is not None
+        ]
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, key, vector, last_used) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        self.conn.commit()
+        self._size += sum(len(row[2]) for row in rows)
+        if self.max_bytes is not None and self._size > self.max_bytes:
+            self.evict()
+
+    def size_bytes(self) -> int:
+        """Returns the total size of the stored vectors."""
+        return self.conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache is below 90% of max_bytes."""
+        if self.max_bytes is None:
+            return
+        size = self.size_bytes()
+        self._size = size
+        if size <= self.max_bytes:
+            return
+
+        count, total = self.conn.execute("SELECT COUNT(*), SUM(LENGTH(vector)) FROM embeddings").fetchone()
+        average = total / count
+        to_remove = math.ceil((size - 0.9 * self.max_bytes) / average)
+        self.conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (to_remove,)
+        )
+        self.conn.commit()
+        self._size = self.size_bytes()
+
+    def close(self) -> None:
+        """Closes the cache file."""
+        self.conn.close()
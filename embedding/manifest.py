@@ -0,0 +1,122 @@
+import os
+import json
+import hashlib
+
+
+class Manifest:
+    """
+    Keeps track of the documents stored in a collection, so re-indexing only has to process what changed.
+
+    The manifest is a JSON file mapping each document's path (relative to the raw data directory)
+    to its modification time, size, content hash and the number of chunks stored for it.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path: The location of the manifest file. It is created on the first save.
+        """
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file).get("files", {})
+
+    def save(self) -> None:
+        """Writes the manifest atomically, so an interrupted run never leaves a truncated file behind."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({"files": self.entries}, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def plan(self, file_paths: list[str], root_dir: str) -> tuple[list[str], list[str], list[str]]:
+        """
+        Compares the files on disk with the manifest.
+
+        A file whose modification time and size match the manifest is treated as unchanged without reading it.
+        Otherwise its content hash decides, so touching a file does not trigger re-embedding.
+
+        Args:
+            file_paths: The documents currently found under root_dir.
+            root_dir: The raw data directory the manifest paths are relative to.
+
+        Returns:
+            tuple[list[str], list[str], list[str]]: The file paths that are new or changed, the file paths
+            that are unchanged and the relative paths of documents that were removed from disk.
+        """
+        changed, unchanged = [], []
+        seen = set()
+
+        for file_path in file_paths:
+            rel_path = relative_path(file_path, root_dir)
+            seen.add(rel_path)
+            entry = self.entries.get(rel_path)
+            stat = os.stat(file_path)
+
+            if entry is None:
+                changed.append(file_path)
+            elif entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                unchanged.append(file_path)
+            elif entry["sha256"] == hash_file(file_path):
+                # Touched but not modified: remember the new mtime so the hash is not computed again
+                entry["mtime"] = stat.st_mtime
+                entry["size"] = stat.st_size
+                unchanged.append(file_path)
+            else:
+                changed.append(file_path)
+
+        removed = [rel_path for rel_path in self.entries if rel_path not in seen]
+        return changed, unchanged, removed
+
+    def record(self, file_path: str, root_dir: str, chunks: int) -> None:
+        """Stores the current state of a document after its chunks were written to the collection."""
+        stat = os.stat(file_path)
+        self.entries[relative_path(file_path, root_dir)] = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": hash_file(file_path),
+            "chunks": chunks,
+        }
+
+    def chunk_count(self, rel_path: str) -> int:
+        """Returns the number of chunks stored for a document, or 0 if it is not in the manifest."""
+        return self.entries.get(rel_path, {}).get("chunks", 0)
+
+    def remove(self, rel_path: str) -> None:
+        """Forgets a document."""
+        self.entries.pop(rel_path, None)
+
+
+def manifest_path(db_directory: str, collection_name: str) -> str:
+    """Returns the location of a collection's manifest."""
+    return os.path.join(db_directory, f"{collection_name}_manifest.json")
+
+
+def collection_version(db_directory: str, collection_name: str) -> int | None:
+    """
+    Returns a value that changes whenever the collection is re-indexed (the manifest's modification time),
+    or None if the collection has no manifest. Used to invalidate caches built on top of the collection.
+    """
+    try:
+        return os.stat(manifest_path(db_directory, collection_name)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def relative_path(file_path: str, root_dir: str) -> str:
+    """Returns the path of a document relative to the raw data directory. Used as the document identity."""
+    return os.path.relpath(file_path, root_dir)
+
+
+def chunk_ids(rel_path: str, start: int, stop: int) -> list[str]:
+    """Returns the collection IDs of a document's chunks with indices in [start, stop)."""
+    return [f"{rel_path}_chunk_{i}" for i in range(start, stop)]
+
+
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    """Computes the SHA-256 of a file without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,179 @@
+import time
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import openai
+
+
+# HTTP status codes that are worth retrying. Everything else is a client error and retrying will not help.
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class EmbeddingError(RuntimeError):
+    """
+    Raised when some texts could not be embedded even after retrying and re-queueing.
+
+    Attributes:
+        failed_indices: Positions (in the input list) of the texts that could not be embedded.
+        embeddings: The embeddings that were computed. Failed positions are None.
+    """
+    def __init__(self, message: str, failed_indices: list[int], embeddings: list) -> None:
+        super().__init__(message)
+        self.failed_indices = failed_indices
+        self.embeddings = embeddings
+
+
+class OpenAIEmbedder:
+    """
+    A client for the OpenAI (or OpenAI compatible) embeddings API that packs many texts into each request,
+    keeps a bounded number of requests in flight and retries rate limited or failed requests with backoff.
+    """
+    def __init__(
+        self,
+        openai_client: openai.OpenAI,
+        embedding_model: str,
+        max_batch_items: int = 128,
+        max_batch_tokens: int = 8000,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        max_requeues: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+    ) -> None:
+        """
+        Args:
+            openai_client: The initialized OpenAI client object.
+            embedding_model: The name of the embedding model to use (e.g., 'text-embedding-3-small').
+            max_batch_items: The maximum number of texts sent in a single request.
+            max_batch_tokens: The maximum (estimated) number of tokens sent in a single request.
+            max_concurrency: The maximum number of requests in flight at the same time.
+            max_retries: How many times a request is retried on 429/5xx and connection errors.
+            max_requeues: How many times a failed batch is split and put back on the queue before giving up.
+            backoff_base: The first retry delay in seconds. It doubles with every attempt.
+            backoff_max: The upper bound of a single retry delay in seconds.
+        """
+        # Retries are handled here, so the client's own retry loop is switched off
+        self.client = openai_client.with_options(max_retries=0)
+        self.model_name = embedding_model
+        self.max_batch_items = max(1, max_batch_items)
+        self.max_batch_tokens = max(1, max_batch_tokens)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.max_requeues = max_requeues
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @staticmethod
+    def clean_text(text: str) -> str:
+        """Replaces newlines, which is good practice for embeddings."""
+        return text.replace("\n", " ")
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """A cheap, conservative token estimate (about 3 characters per token) used for packing requests."""
+        return len(text) // 3 + 1
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embeds a list of texts.
+
+        Args:
+            texts: The texts to embed.
+
+        Returns:
+            One embedding per text, in the same order as the input.
+
+        Raises:
+            EmbeddingError: If some texts could not be embedded. The error carries the partial result.
+        """
+        if not texts:
+            return []
+
+        cleaned = [self.clean_text(text) for text in texts]
+        embeddings = [None] * len(cleaned)
+        failed = []
+
+        # Each queue entry is (indices into the input list, number of times the batch was re-queued)
+        pending = deque((batch, 0) for batch in self._pack(cleaned))
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            in_flight = {}
+            while pending or in_flight:
+                while pending and len(in_flight) < self.max_concurrency:
+                    batch, requeues = pending.popleft()
+                    future = executor.submit(self._request_with_retries, [cleaned[i] for i in batch])
+                    in_flight[future] = (batch, requeues)
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch, requeues = in_flight.pop(future)
+                    try:
+                        for i, embedding in zip(batch, future.result()):
+                            embeddings[i] = embedding
+                    except Exception as e:
+                        if requeues >= self.max_requeues:
+                            print(f"\nGiving up on {len(batch)} text(s) after {requeues} re-queues: {e}")
+                            failed.extend(batch)
+                        elif len(batch) > 1:
+                            # Split the batch, so one bad text does not keep failing its neighbours
+                            middle = len(batch) // 2
+                            pending.append((batch[:middle], requeues + 1))
+                            pending.append((batch[middle:], requeues + 1))
+                        else:
+                            pending.append((batch, requeues + 1))
+
+        if failed:
+            raise EmbeddingError(
+                f"Failed to embed {len(failed)} of {len(texts)} text(s).",
+                failed_indices=sorted(failed),
+                embeddings=embeddings,
+            )
+        return embeddings
+
+    def _pack(self, texts: list[str]) -> list[list[int]]:
+        """Groups text indices into batches that respect the item and token limits."""
+        batches = []
+        current, current_tokens = [], 0
+        for i, text in enumerate(texts):
+            tokens = self.estimate_tokens(text)
+            if current and (len(current) >= self.max_batch_items or current_tokens + tokens > self.max_batch_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _request_with_retries(self, texts: list[str]) -> list[list[float]]:
+        """Sends a single embeddings request, retrying 429/5xx and connection errors with exponential backoff."""
+        attempt = 0
+        while True:
+            try:
+                response = self.client.embeddings.create(model=self.model_name, input=texts)
+                # The API does not guarantee the order of the returned items
+                data = sorted(response.data, key=lambda item: item.index)
+                if len(data) != len(texts):
+                    raise RuntimeError(f"Expected {len(texts)} embeddings, got {len(data)}")
+                return [item.embedding for item in data]
+            except (openai.APIConnectionError, openai.APIStatusError) as e:
+                status = getattr(e, "status_code", None)
+                retryable = status is None or status in RETRYABLE_STATUS_CODES
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(attempt, e))
+                attempt += 1
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Uses the server's Retry-After header when present, otherwise exponential backoff with jitter."""
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            try:
+                if retry_after is not None:
+                    return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
@@ -0,0 +1,221 @@
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterator
+
+from embedding.utils import (
+    iter_text_file,
+    iter_pdf_pages,
+    iter_sentences,
+    iter_chunks
+)
+
+
+# Marks the end of the record stream in the queue
+_DONE = object()
+
+
+def parse_document(file_path: str, language: str, chunk_size: int, overlap_size: int) -> list[tuple[str, int, str]]:
+    """
+    Reads a document, splits it into sentences and groups the sentences into chunks.
+    Runs inside a worker process of the parsing pool.
+
+    Args:
+        file_path (str): The path to the .txt or .pdf file.
+        language (str): The language of the text for the sentence tokenizer.
+        chunk_size (int): The number of sentences in each chunk.
+        overlap_size (int): The number of sentences to overlap between consecutive chunks.
+
+    Returns:
+        list[tuple[str, int, str]]: (file_path, chunk_index, text) records for every chunk of the document.
+    """
+    return list(iter_document(file_path, language, chunk_size, overlap_size))
+
+
+def iter_document(file_path: str, language: str, chunk_size: int, overlap_size: int) -> Iterator[tuple[str, int, str]]:
+    """
+    Streams the chunks of a document. The file is read page by page (PDF) or block by block (text) and only
+    the current block, the sentence carried over from the previous one and one chunk window are held, so
+    memory use doesn't depend on the size of the file.
+
+    Args:
+        file_path (str): The path to the .txt or .pdf file.
+        language (str): The language of the text for the sentence tokenizer.
+        chunk_size (int): The number of sentences in each chunk.
+        overlap_size (int): The number of sentences to overlap between consecutive chunks.
+
+    Yields:
+        tuple[str, int, str]: (file_path, chunk_index, text) records, in order.
+    """
+    if file_path.endswith('.txt'):
+        sentences = iter_sentences(iter_text_file(file_path), language)
+    elif file_path.endswith('.pdf'):
+        sentences = iter_sentences(iter_pdf_pages(file_path), language, separator="\n")
+    else:
+        print(f"Unsupported file type: {file_path}")
+        return
+
+    for i, chunk_text in enumerate(iter_chunks(sentences, chunk_size, overlap_size)):
+        yield (file_path, i, chunk_text)
+
+
+def iter_parsed_chunks(
+    file_paths: list[str],
+    language: str,
+    chunk_size: int,
+    overlap_size: int,
+    workers: int | None = None,
+    queue_size: int = 1024,
+    stream_min_size: int | None = 64 << 20,
+    progress=None,
+    failed_files: list[str] | None = None,
+) -> Iterator[tuple[str, int, str]]:
+    """
+    Parses documents in a process pool and streams their chunks through a bounded queue.
+
+    A background thread keeps the pool busy with a limited number of files in flight and puts the
+    resulting records on the queue. Because the queue is bounded, parsing pauses when the consumer
+    (the embedding stage) falls behind, so memory use stays flat while parsing overlaps with encoding.
+
+    Args:
+        file_paths (list[str]): The documents to parse.
+        language (str): The language of the text for the sentence tokenizer.
+        chunk_size (int): The number of sentences in each chunk.
+        overlap_size (int): The number of sentences to overlap between consecutive chunks.
+        workers (int | None): The number of worker processes. None uses all CPU cores, 0 parses on the calling thread.
+        queue_size (int): The maximum number of records buffered between parsing and the consumer.
+        stream_min_size (int | None): Files of at least this many bytes are streamed chunk by chunk on the
+            producer thread instead of being returned whole by a worker, so a single huge file can't exhaust memory.
+            None sends every file to the pool.
+        progress: An optional tqdm-like object. Its update(1) is called when a file has been parsed.
+        failed_files (list[str] | None): If given, the paths of files that could not be parsed are appended to it.
+
+    Yields:
+        tuple[str, int, str]: (file_path, chunk_index, text) records. The chunks of a file are yielded together and in order.
+    """
+    if failed_files is None:
+        failed_files = []
+
+    if workers == 0:
+        for file_path in file_paths:
+            if not (yield from _stream_or_report(file_path, language, chunk_size, overlap_size)):
+                failed_files.append(file_path)
+            if progress is not None:
+                progress.update(1)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    records = queue.Queue(maxsize=max(1, queue_size))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                paths = iter(file_paths)
+                in_flight = {}
+                while not stop.is_set():
+                    # Only a couple of files per worker are in flight, the rest wait in the path iterator
+                    for file_path in paths:
+                        if _is_large(file_path, stream_min_size):
+                            # Pool results are pickled whole, so a huge file is streamed here in bounded memory
+                            if not _put_all(records, _stream_or_report(file_path, language, chunk_size, overlap_size), stop):
+                                failed_files.append(file_path)
+                            if progress is not None:
+                                progress.update(1)
+                            if stop.is_set():
+                                break
+                            continue
+                        future = executor.submit(_parse_or_report, file_path, language, chunk_size, overlap_size)
+                        in_flight[future] = file_path
+                        if len(in_flight) >= workers * 2:
+                            break
+                    if not in_flight:
+                        break
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        file_path = in_flight.pop(future)
+                        chunks = future.result()
+                        if chunks is None:
+                            failed_files.append(file_path)
+                            chunks = []
+                        for record in chunks:
+                            if not _put(records, record, stop):
+                                break
+                        if progress is not None:
+                            progress.update(1)
+
+                for future in in_flight:
+                    future.cancel()
+        except BaseException as e:
+            _put(records, e, stop)
+        finally:
+            _put(records, _DONE, stop)
+
+    producer = threading.Thread(target=produce, name="document-parser", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = records.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+def _parse_or_report(file_path: str, language: str, chunk_size: int, overlap_size: int) -> list[tuple[str, int, str]] | None:
+    """Parses a document. A broken file is reported and returns None instead of stopping the whole run."""
+    try:
+        return parse_document(file_path, language, chunk_size, overlap_size)
+    except Exception as e:
+        print(f"\nError parsing {file_path}: {e}")
+        return None
+
+
+def _stream_or_report(file_path: str, language: str, chunk_size: int, overlap_size: int):
+    """
+    Yields the chunks of a document as they are parsed and returns False if parsing failed.
+    Chunks yielded before the error are kept; the file is retried on the next run.
+    """
+    try:
+        yield from iter_document(file_path, language, chunk_size, overlap_size)
+        return True
+    except Exception as e:
+        print(f"\nError parsing {file_path}: {e}")
+        return False
+
+
+def _put_all(records: queue.Queue, chunks, stop: threading.Event) -> bool:
+    """Puts the chunks of a streamed document on the queue. Returns the generator's result, or True if the consumer went away."""
+    try:
+        while True:
+            if not _put(records, next(chunks), stop):
+                chunks.close()
+                return True
+    except StopIteration as result:
+        return result.value
+
+
+def _is_large(file_path: str, min_size: int | None) -> bool:
+    if min_size is None:
+        return False
+    try:
+        return os.path.getsize(file_path) >= min_size
+    except OSError:
+        return False
+
+
+def _put(records: queue.Queue, item, stop: threading.Event) -> bool:
+    """Puts an item on the queue, giving up if the consumer went away. Returns False if it gave up."""
+    while not stop.is_set():
+        try:
+            records.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
@@ -1,4 +1,6 @@
 import os
+from typing import Iterable, Iterator
+
 import pdfplumber
 import nltk
 
@@ -39,10 +41,7 @@ def read_text_file(file_path: str) -> str:
     Returns:
         str: The content of the file as a single string.
     """
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    return content
+    return "".join(iter_text_file(file_path))
 
 
 def read_pdf_file(file_path: str) -> str:
@@ -55,17 +54,47 @@ def read_pdf_file(file_path: str) -> str:
     Returns:
         str: The content of the PDF as a single string.
     """
-    text_content = []
-    
+    # Join all pages' text into a single string
+    return "\n".join(iter_pdf_pages(file_path))
+
+
+def iter_text_file(file_path: str, block_size: int = 1 << 20) -> Iterator[str]:
+    """
+    Reads a text file block by block, so the whole file never has to be in memory.
+
+    Args:
+        file_path (str): The path to the .txt file to read.
+        block_size (int): The number of characters read at once.
+
+    Yields:
+        str: Consecutive blocks of the file. A block may end in the middle of a sentence or word.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            yield block
+
+
+def iter_pdf_pages(file_path: str) -> Iterator[str]:
+    """
+    Reads a PDF file page by page. The parsed layout of a page is released once its text is extracted,
+    so memory use doesn't grow with the number of pages.
+
+    Args:
+        file_path (str): The path to the PDF file to read.
+
+    Yields:
+        str: The text of each page that has text.
+    """
     with pdfplumber.open(file_path) as pdf:
         for page in pdf.pages:
             # Extract text from each page
             page_text = page.extract_text()
+            page.flush_cache()
             if page_text:  # Ensure the page has text
-                text_content.append(page_text)
-    
-    # Join all pages' text into a single string
-    return "\n".join(text_content)
+                yield page_text
 
 
 def split_text_into_sentences(text: str, language: str) -> list[str]:
@@ -110,8 +139,69 @@ def chunk_sentences(sentences: list[str], chunk_size: int, overlap_size: int) ->
     return chunks
 
 
+def iter_sentences(blocks: Iterable[str], language: str, separator: str = "", max_carry: int = 1 << 20) -> Iterator[str]:
+    """
+    Splits a stream of text blocks into sentences with NLTK's sentence tokenizer.
 
-    
-        
+    The last sentence found in a block may continue in the next one, so it is carried over and tokenized
+    again together with the next block. Only the carry-over and one block are held at a time.
 
-    
\ No newline at end of file
+    Args:
+        blocks (Iterable[str]): Consecutive pieces of the text, e.g. from iter_text_file or iter_pdf_pages.
+        language (str): The language of the text for the sentence tokenizer.
+        separator (str): Inserted between blocks, e.g. "\n" between PDF pages.
+        max_carry (int): If text without a sentence boundary grows beyond this many characters, it is
+            emitted as a sentence instead of being carried further.
+
+    Yields:
+        str: The sentences of the text, the same as split_text_into_sentences on the joined blocks in all but
+        rare cases where the tokenizer would have looked past a block boundary.
+    """
+    carry = ""
+    for block in blocks:
+        text = f"{carry}{separator}{block}" if carry else block
+        sentences = nltk.sent_tokenize(text, language=language)
+        if not sentences:
+            carry = ""
+            continue
+        yield from sentences[:-1]
+        # Carry the raw text of the last sentence, since the tokenizer strips whitespace the next block may need
+        start = text.rfind(sentences[-1])
+        carry = text[start:] if start >= 0 else sentences[-1]
+        if len(carry) > max_carry:
+            yield carry.strip()
+            carry = ""
+    if carry.strip():
+        yield carry.strip()
+
+
+def iter_chunks(sentences: Iterable[str], chunk_size: int, overlap_size: int) -> Iterator[str]:
+    """
+    Groups a stream of sentences into overlapping chunks, keeping at most chunk_size sentences in memory.
+    Yields the same chunks as chunk_sentences on the full list.
+
+    Args:
+        sentences (Iterable[str]): The sentences to be chunked.
+        chunk_size (int): The number of sentences in each chunk.
+        overlap_size (int): The number of sentences to overlap between consecutive chunks.
+
+    Yields:
+        str: The text chunks with the specified overlap.
+
+    Raises:
+        ValueError: If overlap_size is greater than or equal to chunk_size.
+    """
+    if overlap_size >= chunk_size:
+        raise ValueError("overlap_size must be smaller than chunk_size.")
+
+    step = chunk_size - overlap_size
+    window = []
+    for sentence in sentences:
+        window.append(sentence)
+        if len(window) == chunk_size:
+            yield " ".join(window)
+            # The next chunk starts step sentences later and keeps the overlap
+            del window[:step]
+    # The end of the text: every chunk that would have started in the remaining sentences
+    for i in range(0, len(window), step):
+        yield " ".join(window[i:i + chunk_size])
@@ -1,6 +1,8 @@
 import sys
 import os
-import chromadb
+import time
+import queue
+import multiprocessing
 from tqdm import tqdm
 from sentence_transformers import SentenceTransformer
 from openai import OpenAI 
@@ -21,32 +23,395 @@ from config.embedding_config import (
     collection_name,
     use_openai_embeddings,      
     openai_embedding_model,     
-    openai_embedding_base_url   
+    openai_embedding_base_url,
+    openai_embedding_max_batch_items,
+    openai_embedding_max_batch_tokens,
+    openai_embedding_max_concurrency,
+    embedding_batch_size,
+    parse_workers,
+    parse_queue_size,
+    parse_stream_min_mb,
+    incremental_indexing,
+    use_embedding_cache,
+    embedding_cache_dir,
+    embedding_cache_max_gb,
+    build_lexical_index,
+    ingest_shards,
+    ingest_torch_threads,
+    ingest_checkpoint_interval
 )
 
-from embedding.utils import (
-    get_file_paths,
-    read_text_file,
-    read_pdf_file,
-    split_text_into_sentences,
-    chunk_sentences
-)
+from embedding.utils import get_file_paths
+from embedding.parsing import iter_parsed_chunks
+from embedding.manifest import Manifest, manifest_path, relative_path, chunk_ids
+from embedding.openai_embedder import OpenAIEmbedder, EmbeddingError
+from embedding.cache import EmbeddingCache
+from vector_store import VectorStore, get_vector_store
+from vector_store.bm25 import BM25Index
 
 # Load environment variables (for OPENAI_API_KEY)
 load_dotenv(os.path.join(parent_dir, '.env'))
 
-# Initialize ChromaDB client
-client = chromadb.PersistentClient(path=db_directory)
+def embed_batch(texts: list[str], embedding_model=None, openai_embedder: OpenAIEmbedder = None, embedding_cache: EmbeddingCache = None) -> list[list[float] | None]:
+    """
+    Embeds a batch of chunk texts with either the local SentenceTransformer or the OpenAI compatible API.
+
+    Args:
+        texts (list[str]): The chunk texts to embed.
+        embedding_model: The initialized SentenceTransformer model. Used when use_openai_embeddings is False.
+        openai_embedder (OpenAIEmbedder): The OpenAI embedding client. Used when use_openai_embeddings is True.
+        embedding_cache (EmbeddingCache): If given, cached embeddings are reused and only new texts are embedded.
+
+    Returns:
+        list[list[float] | None]: One embedding per text, in the same order. None marks a chunk that could not be embedded.
+    """
+    if embedding_cache is not None:
+        cache_model = openai_embedding_model if use_openai_embeddings else model_name
+        embeddings = embedding_cache.get_many(cache_model, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            new_embeddings = embed_batch(missing_texts, embedding_model, openai_embedder)
+            embedding_cache.put_many(cache_model, missing_texts, new_embeddings)
+            for i, embedding in zip(missing, new_embeddings):
+                embeddings[i] = embedding
+        return embeddings
+
+    if use_openai_embeddings:
+        try:
+            return openai_embedder.embed(texts)
+        except EmbeddingError as e:
+            # Keep what was embedded; the failed chunks are reported by the caller
+            print(f"\n{e}")
+            return e.embeddings
+
+    # One encode call for the whole batch. Convert numpy array to list for the vector DB
+    return embedding_model.encode(texts, batch_size=len(texts)).tolist()
+
+
+def write_batch(store: VectorStore, batch: list[dict], embedding_model=None, openai_embedder: OpenAIEmbedder = None, embedding_cache: EmbeddingCache = None, lexical_index: BM25Index = None) -> list[dict]:
+    """
+    Embeds the accumulated chunks and writes them to the vector store. Existing chunks with the same ID are replaced.
+
+    Args:
+        store (VectorStore): The collection to write to. Writes are split to its max_batch_size.
+        batch (list[dict]): Chunks with the keys 'id', 'text' and 'metadata'.
+        embedding_model: The initialized SentenceTransformer model, if any.
+        openai_embedder (OpenAIEmbedder): The OpenAI embedding client, if any.
+        embedding_cache (EmbeddingCache): The embedding cache, if enabled.
+        lexical_index (BM25Index): The keyword index, if enabled. Stored chunks are indexed in it as well.
+
+    Returns:
+        list[dict]: The chunks that could not be embedded and were not stored.
+    """
+    embeddings = embed_batch([item["text"] for item in batch], embedding_model, openai_embedder, embedding_cache)
+    return store_batch(store, batch, embeddings, lexical_index)
+
+
+def store_batch(store: VectorStore, batch: list[dict], embeddings: list[list[float] | None], lexical_index: BM25Index = None) -> list[dict]:
+    """
+    Writes embedded chunks to the vector store, and to the keyword index if given.
+
+    Args:
+        store (VectorStore): The collection to write to. Writes are split to its max_batch_size.
+        batch (list[dict]): Chunks with the keys 'id', 'text' and 'metadata'.
+        embeddings (list[list[float] | None]): One embedding per chunk. None marks a chunk that could not be embedded.
+        lexical_index (BM25Index): The keyword index, if enabled.
+
+    Returns:
+        list[dict]: The chunks without an embedding, which were not stored.
+    """
+    records = [(item, emb) for item, emb in zip(batch, embeddings) if emb is not None]
+    failed = [item for item, emb in zip(batch, embeddings) if emb is None]
+
+    for start in range(0, len(records), store.max_batch_size):
+        part = records[start:start + store.max_batch_size]
+        store.upsert(
+            documents=[item["text"] for item, _ in part],
+            embeddings=[emb for _, emb in part],
+            metadatas=[item["metadata"] for item, _ in part],
+            ids=[item["id"] for item, _ in part]
+        )
+    if lexical_index is not None:
+        lexical_index.add(
+            ids=[item["id"] for item, _ in records],
+            documents=[item["text"] for item, _ in records],
+            metadatas=[item["metadata"] for item, _ in records]
+        )
+    return failed
+
+
+def chunk_item(file_path: str, index: int, text: str, root_dir: str) -> dict:
+    """Returns a parsed chunk in the form write_batch takes, with its collection ID and metadata."""
+    # The path relative to raw_db identifies the document, so equal file names in different folders don't collide
+    rel_path = relative_path(file_path, root_dir)
+    return {
+        "id": chunk_ids(rel_path, index, index + 1)[0],
+        "text": text,
+        "metadata": {"file_name": os.path.basename(file_path), "file_path": rel_path, "chunk_id": index},
+    }
+
+
+def finish_file(store: VectorStore, manifest: Manifest, lexical_index: BM25Index, file_path: str, count: int) -> None:
+    """Drops the chunks a shorter version of a file no longer has and records the file in the manifest."""
+    rel_path = relative_path(file_path, raw_db)
+    stale_ids = chunk_ids(rel_path, count, manifest.chunk_count(rel_path))
+    if stale_ids:
+        store.delete(ids=stale_ids)
+        if lexical_index is not None:
+            lexical_index.delete(ids=stale_ids)
+    manifest.record(file_path, raw_db, chunks=count)
+
+
+def backfill_lexical_index(store: VectorStore, lexical_index: BM25Index, page_size: int = 5000) -> None:
+    """Indexes the chunks already in the vector store, for collections created before the keyword index was enabled."""
+    offset = 0
+    with tqdm(total=store.count(), desc="Building keyword index") as progress:
+        while True:
+            page = store.get(limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            lexical_index.add(page["ids"], page["documents"], page["metadatas"])
+            offset += len(page["ids"])
+            progress.update(len(page["ids"]))
+
+
+def partition_files(file_paths: list[str], shards: int) -> list[list[str]]:
+    """
+    Splits the files into shards of about the same total size, so the workers finish at about the same time.
+
+    Args:
+        file_paths (list[str]): The documents to process.
+        shards (int): The number of shards.
+
+    Returns:
+        list[list[str]]: The file paths of each shard, largest files first.
+    """
+    parts = [[] for _ in range(shards)]
+    sizes = [0] * shards
+    for file_path in sorted(file_paths, key=_file_size, reverse=True):
+        smallest = sizes.index(min(sizes))
+        parts[smallest].append(file_path)
+        sizes[smallest] += _file_size(file_path)
+    return parts
+
+
+def _file_size(file_path: str) -> int:
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+
+def shard_worker(shard: int, file_paths: list[str], results, root_dir: str, model: str, torch_threads: int, batch_size: int, cache_dir: str | None, cache_max_bytes: int | None) -> None:
+    """
+    Runs in a worker process of a sharded run: reads, chunks and embeds the files of one shard and
+    puts the results on the queue for the writer.
+
+    Messages put on the queue:
+        ("chunks", batch, embeddings): Embedded chunks to store.
+        ("file", file_path, chunk_count): All chunks of the file were sent before this message.
+        ("failed", file_path): The file could not be parsed.
+        ("done", shard, cache_hits, cache_misses) or ("error", shard, message): The worker finished.
+
+    Args:
+        shard (int): The number of the shard, for messages.
+        file_paths (list[str]): The documents of the shard.
+        results: The multiprocessing queue read by the writer.
+        root_dir (str): The raw data directory the document IDs are relative to.
+        model (str): The name of the SentenceTransformer model.
+        torch_threads (int): The number of threads torch uses in this process.
+        batch_size (int): The number of chunks embedded in one call.
+        cache_dir (str | None): The embedding cache directory, or None to embed without the cache.
+        cache_max_bytes (int | None): The embedding cache size limit.
+    """
+    # Each worker already gets its share of the cores
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    embedding_cache = None
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+        embedding_model = SentenceTransformer(model, trust_remote_code=True)
+        if cache_dir is not None:
+            embedding_cache = EmbeddingCache(cache_dir, max_bytes=cache_max_bytes)
+
+        failed_files = []
+        chunk_counts = {}
+        batch, finished = [], []
+        current = None
+        # Each worker is one of several processes, so it parses on its own thread instead of starting a pool
+        records = iter_parsed_chunks(
+            file_paths,
+            language=data_language,
+            chunk_size=chunk_size,
+            overlap_size=overlap_size,
+            workers=0,
+            failed_files=failed_files
+        )
+        for file_path, i, chunk_text in records:
+            if file_path != current:
+                # A file is parsed completely before the next one starts
+                if current is not None and current not in failed_files:
+                    finished.append(current)
+                current = file_path
+            chunk_counts[file_path] = i + 1
+            batch.append(chunk_item(file_path, i, chunk_text, root_dir))
+            if len(batch) >= batch_size:
+                _send_shard_batch(results, batch, finished, chunk_counts, embedding_model, embedding_cache)
+                batch, finished = [], []
+        if current is not None and current not in failed_files:
+            finished.append(current)
+        # Files without any chunks (e.g. empty ones) are complete as well
+        finished.extend(file_path for file_path in file_paths if file_path not in chunk_counts and file_path not in failed_files)
+        _send_shard_batch(results, batch, finished, chunk_counts, embedding_model, embedding_cache)
+
+        for file_path in failed_files:
+            results.put(("failed", file_path))
+        if embedding_cache is not None:
+            results.put(("done", shard, embedding_cache.hits, embedding_cache.misses))
+        else:
+            results.put(("done", shard, 0, 0))
+    except Exception as e:
+        results.put(("error", shard, f"{type(e).__name__}: {e}"))
+    finally:
+        if embedding_cache is not None:
+            embedding_cache.close()
+
+
+def _send_shard_batch(results, batch: list[dict], finished: list[str], chunk_counts: dict[str, int], embedding_model, embedding_cache: EmbeddingCache) -> None:
+    """Embeds a shard worker's batch and puts it on the queue, followed by the files it completes."""
+    if batch:
+        embeddings = embed_batch([item["text"] for item in batch], embedding_model, embedding_cache=embedding_cache)
+        results.put(("chunks", batch, embeddings))
+    for file_path in finished:
+        results.put(("file", file_path, chunk_counts.get(file_path, 0)))
+
+
+def ingest_sharded(file_paths: list[str], store: VectorStore, manifest: Manifest, lexical_index: BM25Index, shards: int, torch_threads: int, batch_size: int, progress=None) -> tuple[int, list[dict], list[str]]:
+    """
+    Embeds the files in shard worker processes, each with its own SentenceTransformer, and writes the
+    results to the collection from this process, which is the only writer.
+
+    A file is recorded in the manifest as soon as all its chunks are stored, and every
+    ingest_checkpoint_interval seconds the collection and the manifest are saved. If a worker or the
+    whole run dies, the next run skips the recorded files and only processes the rest.
+
+    Args:
+        file_paths (list[str]): The new or changed documents.
+        store (VectorStore): The collection to write to.
+        manifest (Manifest): The manifest of the collection.
+        lexical_index (BM25Index): The keyword index, if enabled.
+        shards (int): The number of worker processes.
+        torch_threads (int): The number of torch threads of each worker.
+        batch_size (int): The number of chunks each worker embeds in one call.
+        progress: An optional tqdm-like object. Its update(1) is called for every finished file.
+
+    Returns:
+        tuple[int, list[dict], list[str]]: The number of stored chunks, the chunks that could not be
+        embedded and the files that could not be parsed or whose worker stopped.
+    """
+    total_chunks = 0
+    failed_chunks = []
+    failed_files = []
+    incomplete = set()
+    reported = set()
+    cache_hits = cache_misses = 0
+
+    # Spawned rather than forked, so every worker starts with a clean torch (and CUDA) state
+    context = multiprocessing.get_context("spawn")
+    # Bounded, so workers pause when the writer falls behind
+    results = context.Queue(maxsize=shards * 4)
+    cache_max_bytes = int(embedding_cache_max_gb * 1024 ** 3) if embedding_cache_max_gb else None
+    workers = {}
+    for shard, shard_paths in enumerate(partition_files(file_paths, shards)):
+        if not shard_paths:
+            continue
+        process = context.Process(
+            target=shard_worker,
+            args=(shard, shard_paths, results, raw_db, model_name, torch_threads, batch_size,
+                  embedding_cache_dir if use_embedding_cache else None, cache_max_bytes),
+            name=f"ingest-shard-{shard}",
+            daemon=True
+        )
+        process.start()
+        workers[shard] = (process, shard_paths)
+
+    running = set(workers)
+    last_checkpoint = time.monotonic()
+    try:
+        while running:
+            try:
+                message = results.get(timeout=1)
+            except queue.Empty:
+                # A worker that was killed (e.g. out of memory) never sends "done"
+                for shard in list(running):
+                    process, _ = workers[shard]
+                    if not process.is_alive():
+                        print(f"\nShard {shard} stopped with exit code {process.exitcode}.")
+                        running.discard(shard)
+                continue
+
+            kind = message[0]
+            if kind == "chunks":
+                _, batch, embeddings = message
+                failed = store_batch(store, batch, embeddings, lexical_index)
+                total_chunks += len(batch) - len(failed)
+                failed_chunks.extend(failed)
+                incomplete |= {item["metadata"]["file_path"] for item in failed}
+            elif kind == "file":
+                _, file_path, count = message
+                reported.add(file_path)
+                if relative_path(file_path, raw_db) not in incomplete:
+                    finish_file(store, manifest, lexical_index, file_path, count)
+                if progress is not None:
+                    progress.update(1)
+            elif kind == "failed":
+                reported.add(message[1])
+                failed_files.append(message[1])
+                if progress is not None:
+                    progress.update(1)
+            elif kind == "done":
+                _, shard, hits, misses = message
+                cache_hits += hits
+                cache_misses += misses
+                running.discard(shard)
+            elif kind == "error":
+                _, shard, error = message
+                print(f"\nShard {shard} failed: {error}")
+                running.discard(shard)
+
+            if ingest_checkpoint_interval is not None and time.monotonic() - last_checkpoint >= ingest_checkpoint_interval:
+                # Write the index before the manifest, so the manifest never lists chunks that are not stored.
+                # A checkpoint saves the new vectors only where the backend can, not the whole collection
+                store.checkpoint()
+                manifest.save()
+                last_checkpoint = time.monotonic()
+    finally:
+        for process, _ in workers.values():
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+    # Files of a stopped worker are left out of the manifest and processed by the next run
+    for process, shard_paths in workers.values():
+        failed_files.extend(file_path for file_path in shard_paths if file_path not in reported)
+    if use_embedding_cache:
+        print(f"\nEmbedding cache: {cache_hits} hits, {cache_misses} misses")
+    return total_chunks, failed_chunks, failed_files
+
 
 def main():
-    print("\n--- Embedding and Storing Documents in ChromaDB ---")
+    print(f"\n--- Embedding and Storing Documents in {vector_db} ---")
     
     # ---------------------------------------------------------
     # 1. SETUP: Initialize the correct model based on config
     # ---------------------------------------------------------
-    openai_client = None
+    openai_embedder = None
     embedding_model = None
-    max_seq_length = None
+    batch_size = max(1, embedding_batch_size)
+    # Sharding runs several local models; the OpenAI embedder already sends concurrent requests
+    shards = 1 if use_openai_embeddings else max(1, ingest_shards)
+    torch_threads = ingest_torch_threads or max(1, (os.cpu_count() or 1) // shards)
 
     if use_openai_embeddings:
         print(f"Using OpenAI Compatible API.")
@@ -58,89 +423,162 @@ def main():
             base_url=openai_embedding_base_url,
             api_key=os.environ.get("OPENAI_API_KEY") # Ensure this exists in your .env
         )
+        openai_embedder = OpenAIEmbedder(
+            openai_client=openai_client,
+            embedding_model=openai_embedding_model,
+            max_batch_items=openai_embedding_max_batch_items,
+            max_batch_tokens=openai_embedding_max_batch_tokens,
+            max_concurrency=openai_embedding_max_concurrency
+        )
+        # Accumulate enough chunks to keep every concurrent request busy
+        batch_size = max(batch_size, openai_embedding_max_batch_items * openai_embedding_max_concurrency)
     else:
         print(f"Using Local SentenceTransformer.")
         print(f"Model: {model_name}")
         
-        # Initialize Local Model
-        embedding_model = SentenceTransformer(model_name, trust_remote_code=True)
-        max_seq_length = embedding_model.max_seq_length
+        if shards > 1:
+            print(f"Shards: {shards} worker processes with {torch_threads} torch thread(s) each")
+        else:
+            # Initialize Local Model
+            embedding_model = SentenceTransformer(model_name, trust_remote_code=True)
+
+    embedding_cache = None
+    # Shard workers open the cache themselves
+    if use_embedding_cache and shards == 1:
+        embedding_cache = EmbeddingCache(
+            embedding_cache_dir,
+            max_bytes=int(embedding_cache_max_gb * 1024 ** 3) if embedding_cache_max_gb else None
+        )
+        print(f"Embedding Cache: {embedding_cache_dir}")
 
     print(f"Chunk Size (sentences per chunk): {chunk_size}")
+    print(f"Embedding Batch Size (chunks per call): {batch_size}")
     print(f"Raw Data Directory: {raw_db}")
     print(f"Vector Database Directory: {db_directory}\n")
     print(f"Vector Database is: {vector_db}\n")
 
     # Step 1: Load documents (txt and pdf)
     file_paths = get_file_paths(raw_db, ["txt", "pdf"])
-    print(f"Found {len(file_paths)} files to process.\n")
+    print(f"Found {len(file_paths)} files.")
 
-    # Create or retrieve the collection in ChromaDB
-    collection = client.get_or_create_collection(collection_name)
-    
-    total_chunks = 0
+    # Create or retrieve the collection in the vector DB. Opened here rather than at import time,
+    # so parsing worker processes don't open it
+    store = get_vector_store(vector_db, db_directory, collection_name, create=True)
 
-    for file_path in tqdm(file_paths, desc="Processing documents"):
-        # Step 2: Read content based on file type
-        if file_path.endswith('.txt'):
-            text = read_text_file(file_path)
-        elif file_path.endswith('.pdf'):
-            text = read_pdf_file(file_path)
-        else:
-            print(f"Unsupported file type: {file_path}")
-            continue
+    # The manifest remembers what is already stored, so unchanged files are skipped
+    manifest = Manifest(manifest_path(db_directory, collection_name))
+    if not manifest.entries and store.count() > 0:
+        print("Warning: the collection has no manifest. Chunks stored by an older version are not tracked "
+              "and may be duplicated. Rebuild the collection to avoid this.")
 
-        # Step 3: Split text into sentences
-        sentences = split_text_into_sentences(text, data_language)
+    # The BM25 keyword index for hybrid search is kept in sync with the collection
+    lexical_index = None
+    if build_lexical_index:
+        lexical_index = BM25Index(db_directory, collection_name, create=True)
+        if lexical_index.count() == 0 and store.count() > 0:
+            backfill_lexical_index(store, lexical_index)
 
-        # Step 4: Chunk sentences into groups
-        chunks = chunk_sentences(sentences, chunk_size, overlap_size)
+    if incremental_indexing:
+        to_process, unchanged, removed = manifest.plan(file_paths, raw_db)
+    else:
+        on_disk = {relative_path(file_path, raw_db) for file_path in file_paths}
+        to_process, unchanged = file_paths, []
+        removed = [rel_path for rel_path in manifest.entries if rel_path not in on_disk]
+    print(f"{len(to_process)} new or changed, {len(unchanged)} unchanged, {len(removed)} removed.\n")
+
+    # Delete the chunks of documents that are gone from disk
+    for rel_path in removed:
+        store.delete(where={"file_path": rel_path})
+        if lexical_index is not None:
+            lexical_index.delete(where={"file_path": rel_path})
+        manifest.remove(rel_path)
+
+    total_chunks = 0
+    failed_chunks = []
+    failed_files = []
+    chunk_counts = {file_path: 0 for file_path in to_process}
+    batch = []
+    start_time = time.perf_counter()
+
+    if shards > 1:
+        # ---------------------------------------------------------
+        # 2-6. SHARDED: Worker processes read, chunk and embed a share of the files each with their own
+        # model, and this process writes the results. Files are recorded as soon as they are complete
+        # ---------------------------------------------------------
+        with tqdm(total=len(to_process), desc="Processing documents") as progress:
+            total_chunks, failed_chunks, failed_files = ingest_sharded(
+                to_process, store, manifest, lexical_index, shards, torch_threads, batch_size, progress
+            )
+        chunk_counts = {}
+    else:
+        # ---------------------------------------------------------
+        # 2-4. PARSE: Read, split into sentences and chunk the documents in a process pool.
+        # Chunks are streamed to the embedding stage as soon as a file is parsed
+        # ---------------------------------------------------------
+        with tqdm(total=len(to_process), desc="Processing documents") as progress:
+            records = iter_parsed_chunks(
+                to_process,
+                language=data_language,
+                chunk_size=chunk_size,
+                overlap_size=overlap_size,
+                workers=parse_workers,
+                queue_size=parse_queue_size,
+                stream_min_size=int(parse_stream_min_mb * (1 << 20)) if parse_stream_min_mb is not None else None,
+                progress=progress,
+                failed_files=failed_files
+            )
 
-        # Use file name as the document ID and create metadata with chunk index
-        file_name = os.path.basename(file_path)
-        
-        for i, chunk_text in enumerate(chunks):
-            
             # ---------------------------------------------------------
-            # 5. EMBED: Generate embedding based on selected method
+            # 5. EMBED: Accumulate chunks across files and embed them in batches
             # ---------------------------------------------------------
-            embedding = []
-            
-            if use_openai_embeddings:
-                # OpenAI API Call
-                # It is good practice to replace newlines for embeddings
-                clean_text = chunk_text.replace("\n", " ") 
-                
-                try:
-                    response = openai_client.embeddings.create(
-                        model=openai_embedding_model,
-                        input=[clean_text]
-                    )
-                    # Extract the embedding from the response
-                    embedding = response.data[0].embedding
-                except Exception as e:
-                    print(f"\nError embedding chunk {i} of {file_name}: {e}")
-                    continue
-            else:
-                # Local SentenceTransformer Call
-                embedding = embedding_model.encode(
-                    chunk_text
-                ).tolist() # Convert numpy array to list for ChromaDB
-
-            # Create a unique ID for each chunk
-            chunk_id = f"{file_name}_chunk_{i}"
-            
-            collection.add(
-                documents=[chunk_text],
-                embeddings=[embedding],
-                metadatas=[{"file_name": file_name, "chunk_id": i}],
-                ids=[chunk_id]
-            )
-            total_chunks += 1
+            for file_path, i, chunk_text in records:
+                chunk_counts[file_path] = i + 1
+                batch.append(chunk_item(file_path, i, chunk_text, raw_db))
+                if len(batch) >= batch_size:
+                    failed = write_batch(store, batch, embedding_model, openai_embedder, embedding_cache, lexical_index)
+                    total_chunks += len(batch) - len(failed)
+                    failed_chunks.extend(failed)
+                    batch = []
+
+        if batch:
+            failed = write_batch(store, batch, embedding_model, openai_embedder, embedding_cache, lexical_index)
+            total_chunks += len(batch) - len(failed)
+            failed_chunks.extend(failed)
+
+    # ---------------------------------------------------------
+    # 6. CLEAN UP: Drop chunks a shorter version of a file no longer has and update the manifest.
+    # Files with failures stay out of the manifest, so the next run retries them
+    # ---------------------------------------------------------
+    incomplete = {relative_path(file_path, raw_db) for file_path in failed_files}
+    incomplete |= {item["metadata"]["file_path"] for item in failed_chunks}
+    for file_path, count in chunk_counts.items():
+        if relative_path(file_path, raw_db) in incomplete:
+            continue
+        finish_file(store, manifest, lexical_index, file_path, count)
+    # Write the index before the manifest, so the manifest never lists chunks that are not stored
+    store.persist()
+    manifest.save()
+    store.close()
+    if lexical_index is not None:
+        lexical_index.close()
+
+    elapsed = time.perf_counter() - start_time
 
     print("\n--- Embedding and Storage Complete ---")
-    print(f"Stored {len(file_paths)} documents in ChromaDB.\n")
+    print(f"Processed {len(to_process)} documents, skipped {len(unchanged)} unchanged, removed {len(removed)}.\n")
     print(f"Stored {total_chunks} Chunks in the DB")
+    print(f"Elapsed: {elapsed:.1f}s ({total_chunks / elapsed if elapsed > 0 else 0:.1f} chunks/sec)")
+    if failed_files:
+        print(f"\n{len(failed_files)} file(s) could not be processed and will be retried on the next run:")
+        for file_path in failed_files:
+            print(f"  {file_path}")
+    if failed_chunks:
+        print(f"\n{len(failed_chunks)} chunk(s) could not be embedded and were not stored:")
+        for item in failed_chunks:
+            print(f"  {item['id']}")
+    if embedding_cache is not None:
+        print(f"\nEmbedding cache: {embedding_cache.hits} hits, {embedding_cache.misses} misses")
+        embedding_cache.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,40 +1,118 @@
+import asyncio
+import time
+import threading
+import weakref
+
 import ollama
 import openai
 
+from metrics import span
+
+
+# Seconds a successful model availability check is trusted before ollama.list() is called again
+MODEL_CHECK_TTL = 600
+
+# (Ollama host, model name) -> time (monotonic) until which the model is known to be available on that host
+_checked_models: dict[tuple[str, str], float] = {}
+_model_check_lock = threading.Lock()
+# Event loop -> {(host, model): asyncio.Lock}. An asyncio.Lock can only be used from one event loop
+_async_model_check_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def client_host(client) -> str:
+    """Returns the base URL of an Ollama client, or an empty string if it can't be read."""
+    return str(getattr(getattr(client, '_client', None), 'base_url', '') or '')
+
+
+def model_is_checked(host: str, model: str) -> bool:
+    """Returns True if the model was found or pulled on the host within the last MODEL_CHECK_TTL seconds."""
+    return _checked_models.get((host, model), 0.0) > time.monotonic()
+
+
+def _async_model_check_lock(host: str, model: str) -> asyncio.Lock:
+    """Returns the asyncio.Lock serializing the async checks of a model on a host in the running event loop."""
+    locks = _async_model_check_locks.setdefault(asyncio.get_running_loop(), {})
+    return locks.setdefault((host, model), asyncio.Lock())
+
+
+def warm_up_in_background(responder: "Responder") -> threading.Thread:
+    """
+    Runs responder.warm_up in a daemon thread, so startup is not blocked by a model download or load.
+    Failures are printed; the first chat turn then checks the model itself.
+    """
+    def run():
+        try:
+            responder.warm_up()
+            print(f"Model '{responder.model}' is loaded.")
+        except Exception as e:
+            print(f"Warming up model '{responder.model}' failed: {e}")
+
+    thread = threading.Thread(target=run, name="llm-warm-up", daemon=True)
+    thread.start()
+    return thread
+
 
 class Responder:
     """
     A class to generate responses using the Ollama LLM within a RAG framework.
+
+    A responder can be created once and reused for every question: the model, prompt template and
+    Ollama client (with its HTTP connection pool) are bound at construction, and each call passes the
+    query and the retrieved data. Passing data and query to the constructor still works for one-off use.
     """
 
-    def __init__(self, data: str, model: str, prompt_template: str, query: str) -> None:
+    def __init__(self, data: str | None = None, model: str | None = None, prompt_template: str | None = None, query: str | None = None, keep_alive: str | int | None = None, *, client: ollama.Client | None = None, async_client: ollama.AsyncClient | None = None) -> None:
         """
-        Initialize the Responder instance.
+        Initialize the Responder instance. The positional order of data, model, prompt_template and query
+        is kept from the one-off API; a long-lived responder is created with keywords.
 
         Args:
-            data: The output from the retriever to be added to the prompt
+            data: Default output from the retriever to be added to the prompt, used when a call doesn't pass data.
             model: The name of the LLM model to use.
             prompt_template: The template string for the prompt.
-            query: The user's query.
+            query: Default user query, used when a call doesn't pass a query.
+            keep_alive: How long Ollama keeps the model loaded after a request. None uses the server default (5 minutes).
+            client: The Ollama client. A client for the default host is created if None.
+            async_client: The Ollama async client used by astream_response_chunks, if the call doesn't pass one.
         """
+        if model is None or prompt_template is None:
+            raise ValueError("A model and a prompt template are needed")
         self.data = data 
         self.model = model 
         self.prompt_template = prompt_template
         self.query = query
+        self.keep_alive = keep_alive
+        self.client = client or ollama.Client()
+        self.async_client = async_client
 
-        self.prompt = prompt_template.format(data=self.data, query=self.query)
+        self.prompt = self.build_prompt() if data is not None and query is not None else None
 
+    def build_prompt(self, query: str | None = None, data: str | None = None) -> str:
+        """
+        Formats the prompt template with the query and data, falling back to the ones given to the constructor.
+        """
+        query = query if query is not None else self.query
+        data = data if data is not None else self.data
+        if query is None or data is None:
+            raise ValueError("A query and data are needed to build the prompt")
+        return self.prompt_template.format(data=data, query=query)
     
-    def generate_response(self) -> str:
+    def generate_response(self, query: str | None = None, data: str | None = None) -> str:
         """
         Generate a response based on the query and data.
 
+        Args:
+            query: The user's query.
+            data: The output from the retriever to be added to the prompt.
+
         Returns:
             The response generated by the LLM.
         """
-        self._check_model()
+        prompt = self.build_prompt(query, data)
+        with span("llm_check_model"):
+            self._check_model()
         try:
-            model_output = ollama.generate(model=self.model, prompt=self.prompt)
+            model_output = self.client.generate(model=self.model, prompt=prompt, keep_alive=self.keep_alive)
             return model_output['response']
         except KeyError as e:
             raise ValueError(f"Response does not contain expected key: {e}")
@@ -42,13 +120,15 @@ class Responder:
             raise RuntimeError(f"An error occurred during response generation: {e}")
         
 
-    def stream_response(self):
+    def stream_response(self, query: str | None = None, data: str | None = None):
         """
         Stream a response based on the query and data for a chatbot environment.
         """
-        self._check_model()
+        prompt = self.build_prompt(query, data)
+        with span("llm_check_model"):
+            self._check_model()
         try:
-            response_generator = ollama.generate(model=self.model, prompt=self.prompt, stream=True)
+            response_generator = self.client.generate(model=self.model, prompt=prompt, stream=True, keep_alive=self.keep_alive)
             
             for chunk in response_generator:
                 print(chunk['response'], end='', flush=True)
@@ -61,13 +141,15 @@ class Responder:
             raise RuntimeError(f"An error occurred during response generation: {e}")
         
     
-    def stream_response_chunks(self):
+    def stream_response_chunks(self, query: str | None = None, data: str | None = None):
         """
         Returns a generator that yields chunks of the response text.
         """
-        self._check_model()
+        prompt = self.build_prompt(query, data)
+        with span("llm_check_model"):
+            self._check_model()
         try:
-            response_generator = ollama.generate(model=self.model, prompt=self.prompt, stream=True)
+            response_generator = self.client.generate(model=self.model, prompt=prompt, stream=True, keep_alive=self.keep_alive)
             for chunk in response_generator:
                 yield chunk['response']
         except KeyError as e:
@@ -75,80 +157,206 @@ class Responder:
         except Exception as e:
             raise RuntimeError(f"An error occurred during response generation: {e}")
 
+    async def astream_response_chunks(self, query: str | None = None, data: str | None = None, client: ollama.AsyncClient | None = None):
+        """
+        Returns an async generator that yields chunks of the response text without blocking the event loop.
+
+        Args:
+            query: The user's query.
+            data: The output from the retriever to be added to the prompt.
+            client: The Ollama async client. Defaults to the one given to the constructor, or a new client for the default host.
+        """
+        prompt = self.build_prompt(query, data)
+        client = client or self.async_client or ollama.AsyncClient()
+        with span("llm_check_model"):
+            await self._acheck_model(client)
+        try:
+            async for chunk in await client.generate(model=self.model, prompt=prompt, stream=True, keep_alive=self.keep_alive):
+                yield chunk['response']
+        except KeyError as e:
+            raise ValueError(f"Response does not contain expected key: {e}")
+        except Exception as e:
+            raise RuntimeError(f"An error occurred during response generation: {e}")
+
+    def prepare(self) -> None:
+        """
+        Checks that the model is available, pulling it if needed, so a following call starts generating
+        right away. The chat views run it while retrieval runs; once the check is cached it returns at once.
+        """
+        with span("llm_check_model"):
+            self._check_model()
+
+    async def aprepare(self, client: ollama.AsyncClient | None = None) -> None:
+        """
+        Async version of prepare.
+
+        Args:
+            client: The Ollama async client. Defaults to the one given to the constructor, or a new client for the default host.
+        """
+        client = client or self.async_client or ollama.AsyncClient()
+        with span("llm_check_model"):
+            await self._acheck_model(client)
+
+    def warm_up(self) -> None:
+        """
+        Gets the model ready for the first chat turn: pulls it if it is missing and loads it into memory
+        with an empty generate request, which Ollama answers without generating anything.
+        """
+        self._check_model()
+        self.client.generate(model=self.model, prompt="", keep_alive=self.keep_alive)
         
     def _check_model(self):
         """
         Helper function to check if the specified model is available.
-        If not, attempt to download it.
+        If not, attempt to download it. A successful check is shared by all responders in the process
+        and trusted for MODEL_CHECK_TTL seconds, so chat turns don't wait for an ollama.list() round-trip.
         """
-        try:
-            resp = ollama.list()
-            # resp is a ListResponse (SubscriptableBaseModel)
-            models = resp.get('models', [])  # works both as dict-like and attribute
-            model_names = [
-                m.get('name') or m.get('model')
-                for m in models
-                if (m.get('name') or m.get('model')) is not None
-            ]
-        except Exception as e:
-            raise RuntimeError(f"Failed to retrieve the list of models: {e}")
+        host = client_host(self.client)
+        if model_is_checked(host, self.model):
+            return
+        with _model_check_lock:
+            # Another thread may have checked or pulled the model while this one waited
+            if model_is_checked(host, self.model):
+                return
+            try:
+                model_names = self._model_names(self.client.list())
+            except Exception as e:
+                raise RuntimeError(f"Failed to retrieve the list of models: {e}")
+
+            if self.model not in model_names:
+                print(f"Model '{self.model}' is not downloaded. Attempting to download...")
+                try:
+                    self.client.pull(self.model)
+                    print(f"Successfully downloaded model '{self.model}'.")
+                except ollama.ResponseError:
+                    raise ValueError(
+                        f"Model '{self.model}' does not exist in the Ollama repository. "
+                        f"Please check the model name."
+                    )
+                except Exception as e:
+                    raise RuntimeError(
+                        f"An error occurred while downloading the model '{self.model}': {e}"
+                    )
+            _checked_models[(host, self.model)] = time.monotonic() + MODEL_CHECK_TTL
 
-        if self.model not in model_names:
-            print(f"Model '{self.model}' is not downloaded. Attempting to download...")
+    async def _acheck_model(self, client: ollama.AsyncClient):
+        """
+        Async version of _check_model, using the given Ollama async client. Concurrent checks of the
+        same model and host wait for the first one instead of each listing or pulling the model.
+        """
+        host = client_host(client)
+        if model_is_checked(host, self.model):
+            return
+        async with _async_model_check_lock(host, self.model):
+            # Another task may have checked or pulled the model while this one waited
+            if model_is_checked(host, self.model):
+                return
             try:
-                ollama.pull(self.model)
-                print(f"Successfully downloaded model '{self.model}'.")
-            except ollama.ResponseError:
-                raise ValueError(
-                    f"Model '{self.model}' does not exist in the Ollama repository. "
-                    f"Please check the model name."
-                )
+                model_names = self._model_names(await client.list())
             except Exception as e:
-                raise RuntimeError(
-                    f"An error occurred while downloading the model '{self.model}': {e}"
-                )
+                raise RuntimeError(f"Failed to retrieve the list of models: {e}")
+
+            if self.model not in model_names:
+                print(f"Model '{self.model}' is not downloaded. Attempting to download...")
+                try:
+                    await client.pull(self.model)
+                    print(f"Successfully downloaded model '{self.model}'.")
+                except ollama.ResponseError:
+                    raise ValueError(
+                        f"Model '{self.model}' does not exist in the Ollama repository. "
+                        f"Please check the model name."
+                    )
+                except Exception as e:
+                    raise RuntimeError(
+                        f"An error occurred while downloading the model '{self.model}': {e}"
+                    )
+            _checked_models[(host, self.model)] = time.monotonic() + MODEL_CHECK_TTL
+
+    @staticmethod
+    def _model_names(resp) -> list[str]:
+        """Returns the model names in an ollama list() response."""
+        # resp is a ListResponse (SubscriptableBaseModel)
+        models = resp.get('models', [])  # works both as dict-like and attribute
+        return [
+            m.get('name') or m.get('model')
+            for m in models
+            if (m.get('name') or m.get('model')) is not None
+        ]
 
 
 
 class OpenAIResponder:
     """
     A class to generate responses using the OpenAI API within a RAG framework.
+
+    Like Responder, it can be created once and reused: the model, prompt template and clients are bound
+    at construction and each call passes the query and the retrieved data.
     """
 
-    def __init__(self, data: str, model: str, prompt_template: str, query: str, cleint: openai.OpenAI) -> None:
+    def __init__(self, data: str | None = None, model: str | None = None, prompt_template: str | None = None, query: str | None = None, cleint: openai.OpenAI | None = None, *, async_client: openai.AsyncOpenAI | None = None) -> None:
         """
-        Initialize the OpenAIResponder instance.
+        Initialize the OpenAIResponder instance. The positional order of data, model, prompt_template, query
+        and cleint is kept from the one-off API; a long-lived responder is created with keywords.
 
         Args:
-            data: The output from the retriever to be added to the prompt.
+            data: Default output from the retriever to be added to the prompt, used when a call doesn't pass data.
             model: The name of the OpenAI model to use (e.g., 'gpt-3.5-turbo').
             prompt_template: The template string for the prompt.
-            query: The user's query.
+            query: Default user query, used when a call doesn't pass a query.
+            cleint: The OpenAI client.
+            async_client: The OpenAI async client used by astream_response_chunks, if the call doesn't pass one.
         """
+        if model is None or prompt_template is None or cleint is None:
+            raise ValueError("A model, a prompt template and a client are needed")
         self.data = data
         self.model = model
         self.prompt_template = prompt_template
         self.query = query
         self.cleint = cleint
+        self.async_client = async_client
         
-        # Construct the final prompt
-        self.prompt = prompt_template.format(data=self.data, query=self.query)
+        # Construct the final prompt, if the responder is used for a single question
+        self.prompt = self.build_prompt() if data is not None and query is not None else None
+
+    def build_prompt(self, query: str | None = None, data: str | None = None) -> str:
+        """
+        Formats the prompt template with the query and data, falling back to the ones given to the constructor.
+        """
+        query = query if query is not None else self.query
+        data = data if data is not None else self.data
+        if query is None or data is None:
+            raise ValueError("A query and data are needed to build the prompt")
+        return self.prompt_template.format(data=data, query=query)
+
+    def prepare(self) -> None:
+        """Same interface as Responder.prepare. The OpenAI API needs no model check, so there is nothing to do."""
+
+    async def aprepare(self, client: openai.AsyncOpenAI | None = None) -> None:
+        """Same interface as Responder.aprepare. There is nothing to do for the OpenAI API."""
 
-    def generate_response(self) -> str:
+    def _messages(self, query: str | None, data: str | None) -> list[dict]:
+        return [
+            {"role": "system", "content": "You are a RAG system."},
+            {"role": "user", "content": self.build_prompt(query, data)},
+        ]
+
+    def generate_response(self, query: str | None = None, data: str | None = None) -> str:
         """
         Generate a response based on the query and data.
 
+        Args:
+            query: The user's query.
+            data: The output from the retriever to be added to the prompt.
+
         Returns:
             The response generated by the OpenAI model.
         """
+        messages = self._messages(query, data)
         try:
             # For ChatCompletion API
             response = self.cleint.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a RAG system."},
-                    {"role": "user", "content": self.prompt},
-                ],
+                messages=messages,
                 max_tokens=1024,
                 temperature=0.7,
                 stream=False,
@@ -157,18 +365,16 @@ class OpenAIResponder:
         except Exception as e:
             raise RuntimeError(f"An error occurred during response generation: {e}")
 
-    def stream_response(self):
+    def stream_response(self, query: str | None = None, data: str | None = None):
         """
         Stream a response based on the query and data for a chatbot environment.
         Prints chunks to stdout as they arrive.
         """
+        messages = self._messages(query, data)
         try:
             response_stream = self.cleint.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a RAG system."},
-                    {"role": "user", "content": self.prompt},
-                ],
+                messages=messages,
                 max_tokens=1024,
                 temperature=0.7,
                 stream=True,
@@ -182,17 +388,15 @@ class OpenAIResponder:
         except Exception as e:
             raise RuntimeError(f"An error occurred during response streaming: {e}")
 
-    def stream_response_chunks(self):
+    def stream_response_chunks(self, query: str | None = None, data: str | None = None):
         """
         Returns a generator that yields chunks of the response text.
         """
+        messages = self._messages(query, data)
         try:
             response_stream = self.cleint.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a RAG system."},
-                    {"role": "user", "content": self.prompt},
-                ],
+                messages=messages,
                 max_tokens=1024,
                 temperature=0.7,
                 stream=True,
@@ -200,5 +404,33 @@ class OpenAIResponder:
             for chunk in response_stream:
                 chunk_text = chunk.choices[0].delta.content or ""
                 yield chunk_text
+        except Exception as e:
+            raise RuntimeError(f"An error occurred during chunk-based response streaming: {e}")
+
+    async def astream_response_chunks(self, query: str | None = None, data: str | None = None, client: openai.AsyncOpenAI | None = None):
+        """
+        Returns an async generator that yields chunks of the response text without blocking the event loop.
+
+        Args:
+            query: The user's query.
+            data: The output from the retriever to be added to the prompt.
+            client: The OpenAI async client. Defaults to the one given to the constructor.
+        """
+        messages = self._messages(query, data)
+        client = client or self.async_client
+        if client is None:
+            raise ValueError("An openai.AsyncOpenAI client is needed for async streaming")
+        try:
+            response_stream = await client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=1024,
+                temperature=0.7,
+                stream=True,
+            )
+            async for chunk in response_stream:
+                if not chunk.choices:
+                    continue
+                yield chunk.choices[0].delta.content or ""
         except Exception as e:
             raise RuntimeError(f"An error occurred during chunk-based response streaming: {e}")
\ No newline at end of file
@@ -0,0 +1,104 @@
+import math
+import threading
+from collections import OrderedDict
+
+
+class SemanticResponseCache:
+    """
+    An in-memory cache of generated answers for questions that were asked before.
+
+    An answer is reused when a new query retrieved exactly the same chunks for the same model and its
+    embedding is similar enough (cosine similarity at or above threshold) to a cached query. All entries
+    are dropped when the collection version changes, so answers never outlive the data they were based on.
+    """
+    def __init__(self, threshold: float = 0.95, max_size: int = 1000, max_entries_per_key: int = 16) -> None:
+        """
+        Args:
+            threshold: The minimum cosine similarity between the query embeddings for a hit.
+            max_size: The maximum number of cached answers. The least recently used are evicted first.
+            max_entries_per_key: The maximum number of answers cached for one model and set of chunks, which
+                bounds the embeddings a lookup compares against. The least recently used are evicted first.
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self.max_entries_per_key = max(1, max_entries_per_key)
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        # (model, chunk ids) -> list of entries from least to most recently used, keys ordered by last use
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding) -> list[float]:
+        vector = [float(value) for value in embedding]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _check_version(self, version) -> None:
+        """Drops every entry if the collection changed since they were stored. Caller holds the lock."""
+        if version != self._version:
+            self._entries.clear()
+            self._size = 0
+            self._version = version
+
+    def lookup(self, query_embedding, chunk_ids: list[str], model: str, version) -> dict | None:
+        """
+        Finds a cached answer for a query.
+
+        Args:
+            query_embedding: The embedding of the query.
+            chunk_ids: The IDs of the retrieved chunks, in rank order.
+            model: The name of the LLM that would generate the answer.
+            version: The current version of the collection. A different version invalidates the cache.
+
+        Returns:
+            dict | None: The cached entry with the keys 'response' and 'docs', or None on a miss.
+        """
+        key = (model, tuple(chunk_ids))
+        query = self._normalize(query_embedding)
+        with self._lock:
+            self._check_version(version)
+            best, best_score = None, self.threshold
+            for entry in self._entries.get(key, []):
+                score = sum(a * b for a, b in zip(query, entry["embedding"]))
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is None:
+                self.misses += 1
+                return None
+            entries = self._entries[key]
+            entries.append(entries.pop(entries.index(best)))
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return best
+
+    def store(self, query_embedding, chunk_ids: list[str], model: str, version, response: str, docs: list[dict]) -> None:
+        """Caches the answer generated for a query and the documents it was based on."""
+        if self.max_size <= 0:
+            return
+        key = (model, tuple(chunk_ids))
+        entry = {"embedding": self._normalize(query_embedding), "response": response, "docs": docs}
+        with self._lock:
+            self._check_version(version)
+            entries = self._entries.setdefault(key, [])
+            entries.append(entry)
+            self._entries.move_to_end(key)
+            self._size += 1
+            if len(entries) > self.max_entries_per_key:
+                entries.pop(0)
+                self._size -= 1
+            while self._size > self.max_size:
+                # Evict single entries from the least recently used key, never the whole key at once
+                oldest_key, oldest = next(iter(self._entries.items()))
+                oldest.pop(0)
+                self._size -= 1
+                if not oldest:
+                    del self._entries[oldest_key]
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
@@ -0,0 +1,20 @@
+"""
+Lightweight latency and throughput metrics for the RAG request path.
+
+Stages are timed with span() blocks, recorded in process-wide histograms and counters and rendered
+in the Prometheus text format. Recording is off until enable() is called, and then spans and
+timers are shared no-op objects, so instrumented code costs next to nothing in the command-line tools.
+"""
+from metrics.core import (
+    REGISTRY,
+    Trace,
+    enable,
+    is_enabled,
+    start_trace,
+    end_trace,
+    record_request,
+    observe,
+    span,
+    stream_timer,
+    render
+)
@@ -0,0 +1,298 @@
+import time
+import threading
+import contextvars
+
+
+# Latency buckets in seconds, from cache hits to long generations
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Generation throughput buckets in tokens per second
+RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 150, 200)
+
+_enabled = False
+
+# The Trace of the request being handled, if it collects its stage timings
+_current_trace = contextvars.ContextVar("rag_trace", default=None)
+
+
+def enable(enabled: bool = True) -> None:
+    """Turns recording on or off for the process. While it is off, spans and timers do nothing."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Counts observations in cumulative buckets per label combination, with their sum and count."""
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (the last is +Inf), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = f'le="{_format_value(float(bound))}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of the process and renders them in the Prometheus text format.
+
+    Collectors are callables run at render time that return (name, type, help, [(labels, value)]) tuples.
+    They expose counts other objects keep anyway, like cache hits, without touching the request path.
+    """
+    def __init__(self) -> None:
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                collected = collector()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, metric_type, help_text, samples in collected:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_seconds", "Time spent in each stage of the RAG request path.", ("stage",)
+)
+REQUESTS = REGISTRY.counter(
+    "rag_requests_total", "Requests handled, by endpoint and outcome.", ("endpoint", "outcome")
+)
+GENERATED_TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total", "Tokens streamed from the LLM, counted as stream chunks."
+)
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "rag_llm_tokens_per_second", "Generation throughput after the first token.", buckets=RATE_BUCKETS
+)
+
+
+class Trace:
+    """The stage timings of one request, e.g. to store with its chat log."""
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        """Returns the stage timings in milliseconds, and the counts like the number of generated tokens."""
+        return {**{f"{stage}_ms": round(seconds * 1000, 3) for stage, seconds in self.stages.items()}, **self.counts}
+
+
+def start_trace() -> Trace | None:
+    """Starts collecting the stage timings of the current request (thread or task). None while disabled."""
+    if not _enabled:
+        return None
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace(trace: Trace | None) -> dict | None:
+    """Records the total time of a traced request as the 'request' stage and returns its timings."""
+    if trace is None:
+        return None
+    observe("request", time.perf_counter() - trace.start, trace)
+    return trace.as_dict()
+
+
+def record_request(endpoint: str, outcome: str) -> None:
+    """Counts a handled request."""
+    if _enabled:
+        REQUESTS.inc(endpoint=endpoint, outcome=outcome)
+
+
+def observe(stage: str, seconds: float, trace: Trace | None = None) -> None:
+    """Records the duration of a stage measured by the caller."""
+    if not _enabled:
+        return
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = trace or _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+class _Span:
+    __slots__ = ("stage", "trace", "start")
+
+    def __init__(self, stage: str, trace: Trace | None) -> None:
+        self.stage = stage
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        observe(self.stage, time.perf_counter() - self.start, self.trace)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage: str, trace: Trace | None = None):
+    """
+    Times a block as a stage: `with span("vector_query"): ...`. The duration goes to the
+    rag_stage_seconds histogram and to the given or current Trace. A shared no-op while disabled.
+    """
+    return _Span(stage, trace) if _enabled else _NOOP_SPAN
+
+
+class StreamTimer:
+    """
+    Measures a streamed answer: time to the first token, total generation time and tokens per second.
+    Call token() for every streamed chunk and finish() once the stream ended.
+    """
+    def __init__(self, trace: Trace | None = None) -> None:
+        self.trace = trace
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.tokens = 0
+
+    def token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+            observe("llm_first_token", self.first_token - self.start, self.trace)
+        self.tokens += 1
+
+    def finish(self) -> None:
+        end = time.perf_counter()
+        observe("llm_generation", end - self.start, self.trace)
+        if self.first_token is None:
+            return
+        GENERATED_TOKENS.inc(self.tokens)
+        if self.trace is not None:
+            self.trace.counts["llm_tokens"] = self.tokens
+        if self.tokens > 1 and end > self.first_token:
+            TOKENS_PER_SECOND.observe((self.tokens - 1) / (end - self.first_token))
+
+
+class _NoopStreamTimer:
+    __slots__ = ()
+
+    def token(self) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+_NOOP_STREAM_TIMER = _NoopStreamTimer()
+
+
+def stream_timer(trace: Trace | None = None):
+    """Returns a StreamTimer, or a shared no-op while disabled."""
+    return StreamTimer(trace) if _enabled else _NOOP_STREAM_TIMER
+
+
+def render() -> str:
+    """Renders all metrics of the process in the Prometheus text format."""
+    return REGISTRY.render()
@@ -0,0 +1,65 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+
+class QueryEmbeddingCache:
+    """
+    A bounded, thread-safe LRU cache of query embeddings keyed by (embedding model, normalized query text).
+    Entries expire after ttl seconds, so a changed model behind the same name is eventually picked up.
+    """
+    def __init__(self, max_size: int = 1024, ttl: float | None = 3600) -> None:
+        """
+        Args:
+            max_size: The maximum number of cached query embeddings. 0 disables the cache.
+            ttl: The number of seconds an entry stays valid. None keeps entries until they are evicted.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Collapses whitespace, so the same question typed with different spacing shares an entry."""
+        return re.sub(r"\s+", " ", query).strip()
+
+    def get(self, model: str, query: str):
+        """Returns the cached embedding of a query, or None if it is not cached or has expired."""
+        key = (model, self.normalize(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                embedding, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model: str, query: str, embedding) -> None:
+        """Stores the embedding of a query, evicting the least recently used entry if the cache is full."""
+        if self.max_size <= 0:
+            return
+        key = (model, self.normalize(query))
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (embedding, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns the hit and miss counters and the current number of entries."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
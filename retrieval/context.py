@@ -0,0 +1,153 @@
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# Shortest text accepted as the overlap of two adjacent chunks, so a shared word is not mistaken for one
+MIN_OVERLAP_CHARS = 20
+
+
+def format_document(idx: int, doc: str, metadata: dict) -> str:
+    """Formats one retrieved chunk the way it appears in the prompt."""
+    return (
+        f"Document {idx}:\n"
+        f"Document ID: {metadata.get('chunk_id', 'N/A')}\n"
+        f"File Name: {metadata.get('file_name', 'N/A')}\n"
+        f"Content:\n{doc}\n"
+        + "-" * 80 + "\n"
+    )
+
+
+def overlap_length(left: str, right: str) -> int:
+    """
+    Returns the length of the longest end of left that is also the start of right, ending on a word boundary.
+    Adjacent chunks share overlap_size sentences this way: the last sentences of chunk i open chunk i + 1.
+    """
+    for length in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if length < len(right) and not right[length].isspace():
+            continue
+        if length < len(left) and not left[-length - 1].isspace():
+            continue
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
+class TokenCounter:
+    """
+    Counts tokens for the target model. Uses tiktoken when it is installed (exact for OpenAI models,
+    a close approximation for others) and otherwise a conservative estimate of one token per three characters.
+    """
+    def __init__(self, model: str | None = None) -> None:
+        """
+        Args:
+            model: The LLM name. Models tiktoken doesn't know are counted with the cl100k_base encoding.
+        """
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return len(text) // 3 + 1
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Returns the start of text that fits in max_tokens, cut at a sentence or word boundary."""
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is not None:
+            cut = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+        else:
+            cut = text[:max(0, (max_tokens - 1) * 3)]
+        # End on a full sentence if that keeps most of the text, otherwise drop the last, possibly partial word
+        sentence_end = max(cut.rfind(mark) for mark in (". ", "! ", "? "))
+        if sentence_end > len(cut) // 2:
+            return cut[:sentence_end + 1]
+        return cut.rsplit(" ", 1)[0] if " " in cut else cut
+
+
+class ContextBuilder:
+    """
+    Packs retrieved chunks into the prompt within a token budget, so prompt size and prefill time
+    don't depend on chunk_size or the number of results.
+
+    Chunks are added in rank order. Text a chunk shares with an adjacent chunk of the same file that is
+    already in the context (the overlap_size sentences) is removed, the chunk that crosses the budget is
+    trimmed, and lower ranked chunks that don't fit are dropped.
+    """
+    def __init__(self, max_tokens: int | None = 3000, model: str | None = None, min_chunk_tokens: int = 50) -> None:
+        """
+        Args:
+            max_tokens: Token budget for the retrieved data in the prompt. None for no limit.
+            model: The LLM name, used to count tokens.
+            min_chunk_tokens: A chunk is only trimmed to fit if at least this many of its tokens remain.
+        """
+        self.max_tokens = max_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+        self.counter = TokenCounter(model)
+
+    def build(self, results: dict) -> str:
+        """
+        Formats the retrieval results for the Responder's prompt.
+
+        Args:
+            results: A result in the layout returned by the retrievers, ordered from the best match.
+
+        Returns:
+            A formatted string containing the retrieved data.
+        """
+        if not results or not results.get('documents') or not results['documents'][0]:
+            return "No relevant data found."
+
+        # (file, chunk index) -> text of the chunks already packed
+        packed = {}
+        parts = []
+        used = 0
+        for doc, metadata in zip(results['documents'][0], results['metadatas'][0]):
+            doc = self._strip_neighbours(doc, metadata, packed)
+            if not doc:
+                continue
+
+            part = format_document(len(parts) + 1, doc, metadata)
+            tokens = self.counter.count(part)
+            if self.max_tokens is not None and used + tokens > self.max_tokens:
+                header_tokens = tokens - self.counter.count(doc)
+                room = self.max_tokens - used - header_tokens
+                if room < self.min_chunk_tokens:
+                    continue
+                doc = self.counter.truncate(doc, room)
+                part = format_document(len(parts) + 1, doc, metadata)
+                tokens = self.counter.count(part)
+
+            packed[self._key(metadata)] = doc
+            parts.append(part)
+            used += tokens
+
+        if not parts:
+            return "No relevant data found."
+        return "".join(parts)
+
+    @staticmethod
+    def _key(metadata: dict):
+        return metadata.get('file_path', metadata.get('file_name')), metadata.get('chunk_id')
+
+    def _strip_neighbours(self, doc: str, metadata: dict, packed: dict) -> str:
+        """Removes the text the chunk shares with the previous and next chunk of its file, if those are packed."""
+        file_key, chunk_id = self._key(metadata)
+        if not isinstance(chunk_id, int):
+            return doc
+        previous = packed.get((file_key, chunk_id - 1))
+        if previous:
+            doc = doc[overlap_length(previous, doc):].lstrip()
+        following = packed.get((file_key, chunk_id + 1))
+        if following and doc:
+            overlap = overlap_length(doc, following)
+            doc = doc[:len(doc) - overlap].rstrip()
+        return doc
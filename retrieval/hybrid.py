@@ -0,0 +1,65 @@
+from vector_store import VectorStore
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[tuple[str, float]]:
+    """
+    Combines several rankings of document IDs with reciprocal rank fusion.
+
+    Each ranking adds 1 / (k + rank) to the score of the documents it contains, so documents ranked
+    high by either retriever, or ranked reasonably by both, come first. Only ranks are used, so the
+    scores of the individual retrievers (distances, BM25 scores) don't need to be comparable.
+
+    Args:
+        rankings: Lists of document IDs, each ordered from best to worst.
+        k: Damping constant. Larger values flatten the difference between the top ranks.
+
+    Returns:
+        list[tuple[str, float]]: (id, fused score) pairs, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def fuse_results(dense_results: dict, lexical_hits: list[tuple[str, float]], store: VectorStore, n_results: int, k: int = 60) -> dict:
+    """
+    Fuses the dense results of one query with its lexical hits into a single result in the retrieve layout.
+
+    Documents found only by the lexical index are read from the vector store. Their 'distances' entry is
+    None, since they were not ranked by the embedding search. The fused scores are added as 'scores'.
+
+    Args:
+        dense_results: The vector store result for a single query.
+        lexical_hits: (id, score) pairs from BM25Index.search, best first.
+        store: The vector store the documents are read from.
+        n_results: Number of documents to return.
+        k: The reciprocal rank fusion constant.
+
+    Returns:
+        dict: {'ids', 'documents', 'metadatas', 'distances', 'scores'}, each with a single inner list.
+    """
+    dense = {
+        doc_id: (document, metadata, distance)
+        for doc_id, document, metadata, distance in zip(
+            dense_results['ids'][0], dense_results['documents'][0], dense_results['metadatas'][0], dense_results['distances'][0]
+        )
+    }
+    fused = reciprocal_rank_fusion([dense_results['ids'][0], [doc_id for doc_id, _ in lexical_hits]], k=k)[:n_results]
+
+    missing = [doc_id for doc_id, _ in fused if doc_id not in dense]
+    if missing:
+        found = store.get(ids=missing)
+        for doc_id, document, metadata in zip(found['ids'], found['documents'], found['metadatas']):
+            dense[doc_id] = (document, metadata, None)
+
+    # Lexical hits that are no longer in the vector store are dropped
+    fused = [(doc_id, score) for doc_id, score in fused if doc_id in dense]
+    return {
+        "ids": [[doc_id for doc_id, _ in fused]],
+        "documents": [[dense[doc_id][0] for doc_id, _ in fused]],
+        "metadatas": [[dense[doc_id][1] for doc_id, _ in fused]],
+        "distances": [[dense[doc_id][2] for doc_id, _ in fused]],
+        "scores": [[score for _, score in fused]],
+    }
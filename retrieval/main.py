@@ -1,33 +1,143 @@
-import chromadb
+from abc import ABC, abstractmethod
+
 from sentence_transformers import SentenceTransformer
 from openai import OpenAI
 
-class ChromaRetriever:
+from embedding.openai_embedder import OpenAIEmbedder
+from retrieval.cache import QueryEmbeddingCache
+from retrieval.hybrid import fuse_results
+from retrieval.rerank import Reranker
+from retrieval.context import ContextBuilder, format_document
+from retrieval.merge import merge_adjacent_chunks
+from vector_store import get_vector_store
+from vector_store.bm25 import BM25Index
+from metrics import span
+
+
+# Candidates retrieved per result when adjacent chunks are merged
+MERGE_OVERFETCH = 2
+
+
+def split_results(results: dict, n_queries: int) -> list[dict]:
     """
-    A class for retrieving documents from a ChromaDB collection based on semantic similarity using embeddings.
+    Splits the result of a multi-vector query into one result per query, each in the layout returned by retrieve.
     """
-    def __init__(self, embedding_model: str, db_path: str, db_collection: str, n_results: int) -> None:
-        self.embedding_model = embedding_model
+    keys = [key for key in ("ids", "documents", "metadatas", "distances") if results.get(key) is not None]
+    return [{key: [results[key][i]] for key in keys} for i in range(n_queries)]
+
+
+class BaseRetriever(ABC):
+    """
+    The search pipeline shared by the retrievers: vector search, optional BM25 fusion, reranking and
+    merging of adjacent chunks, and prompt formatting. Subclasses embed the queries.
+    """
+    def __init__(self, db_path: str, db_collection: str, n_results: int, query_cache: QueryEmbeddingCache | None = None, vector_db: str = "chromaDB", hybrid_search: bool = False, hybrid_candidates: int = 20, rrf_k: int = 60, reranker: Reranker | None = None, rerank_candidates: int = 50, context_builder: ContextBuilder | None = None, merge_adjacent: bool = False) -> None:
+        """
+        Args:
+            db_path: Path to the vector DB.
+            db_collection: Name of the collection.
+            n_results: Number of results to return.
+            query_cache: Cache for query embeddings.
+            vector_db: The vector DB backend, 'chromaDB', 'FAISS' or 'numpy'.
+            hybrid_search: Fuse the vector search with the BM25 index built by vector_db_setup.
+            hybrid_candidates: Number of candidates taken from each ranking before fusion in hybrid mode.
+            rrf_k: The reciprocal rank fusion constant.
+            reranker: If given, rerank_candidates results are retrieved and reordered by the cross-encoder,
+                and the best n_results are returned.
+            rerank_candidates: Number of results retrieved for the reranker.
+            context_builder: If given, format_results_for_prompt packs the results into its token budget.
+            merge_adjacent: Join consecutive chunks of the same file into one result and fill the freed
+                slots with further candidates.
+        """
         self.db_path = db_path
         self.db_collection = db_collection
         self.n_results = n_results
-        self.model = SentenceTransformer(self.embedding_model, trust_remote_code=True)
-        self.client = chromadb.PersistentClient(path=self.db_path)
-        self.collection = self.client.get_collection(name=self.db_collection)
+        self.query_cache = query_cache if query_cache is not None else QueryEmbeddingCache()
+        self.collection = get_vector_store(vector_db, self.db_path, self.db_collection)
+        self.lexical_index = BM25Index(self.db_path, self.db_collection) if hybrid_search else None
+        self.hybrid_candidates = hybrid_candidates
+        self.rrf_k = rrf_k
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.context_builder = context_builder
+        self.merge_adjacent = merge_adjacent
+
+    @abstractmethod
+    def embed_queries(self, queries: list[str]) -> list:
+        """Embeds several queries. Cached queries are not embedded again."""
+
+    def embed_query(self, query: str):
+        """Embeds a query, reusing the cached embedding if the same query was embedded recently."""
+        return self.embed_queries([query])[0]
 
-    def retrieve(self, query: str):
-        """Embeds the query and retrieves relevant documents from the collection."""
+    def search(self, queries: list[str], query_embeddings: list, n_results: int) -> list[dict]:
+        """
+        Searches the collection with embedded queries. In hybrid mode, the vector results are fused with the
+        BM25 results, so documents matching rare terms or exact identifiers are found with a small n_results.
+        With a reranker, more candidates are retrieved and the cross-encoder picks the best n_results.
+        With merge_adjacent, consecutive chunks of a file are joined and count as one result.
+
+        Returns:
+            One result per query, in the layout returned by retrieve.
+        """
+        # Merging frees slots, so keep twice as many ranked candidates to fill them from
+        keep = n_results * MERGE_OVERFETCH if self.merge_adjacent else n_results
+        candidates = max(keep, self.rerank_candidates) if self.reranker is not None else keep
+        if self.lexical_index is None:
+            with span("vector_query"):
+                results = self.collection.query(query_embeddings=query_embeddings, n_results=candidates)
+            results = split_results(results, len(queries))
+        else:
+            depth = max(candidates, self.hybrid_candidates)
+            with span("vector_query"):
+                results = split_results(self.collection.query(query_embeddings=query_embeddings, n_results=depth), len(queries))
+            with span("lexical_search"):
+                results = [
+                    fuse_results(result, self.lexical_index.search(query, depth), self.collection, candidates, k=self.rrf_k)
+                    for query, result in zip(queries, results)
+                ]
+
+        if self.reranker is not None:
+            with span("rerank"):
+                results = [self.reranker.rerank(query, result, keep) for query, result in zip(queries, results)]
+        if self.merge_adjacent:
+            with span("merge_adjacent"):
+                results = [merge_adjacent_chunks(result, n_results) for result in results]
+        return results
+
+    def retrieve(self, query: str, n_results: int | None = None):
+        """
+        Embeds the query and retrieves relevant documents from the collection.
+
+        Args:
+            query: The user's query.
+            n_results: Number of results to return. Defaults to the n_results the retriever was created with.
+        """
         try:
-            embedded_query = self.model.encode(query)
-            results = self.collection.query(
-                query_embeddings=[embedded_query],
-                n_results=self.n_results
-            )
-            return results
+            embedded_query = self.embed_query(query)
+            return self.search([query], [embedded_query], n_results or self.n_results)[0]
         except Exception as e:
             print(f"An error occurred during retrieval: {e}")
             return None
-        
+
+    def retrieve_many(self, queries: list[str], n_results: int | None = None) -> list:
+        """
+        Retrieves documents for many queries at once: batched embedding and one multi-vector query.
+
+        Args:
+            queries: The queries.
+            n_results: Number of results per query. Defaults to the n_results the retriever was created with.
+
+        Returns:
+            One result per query, in the layout returned by retrieve (None for every query if retrieval failed).
+        """
+        if not queries:
+            return []
+        try:
+            return self.search(queries, self.embed_queries(queries), n_results or self.n_results)
+        except Exception as e:
+            print(f"An error occurred during retrieval: {e}")
+            return [None] * len(queries)
 
     def format_results_for_prompt(self, results):
         """
@@ -39,86 +149,79 @@ class ChromaRetriever:
         Returns:
             A formatted string containing the retrieved data.
         """
-        if not results:
-            return "No relevant data found."
-
-        formatted_data = ""
-        for idx, (doc, metadata) in enumerate(zip(results['documents'][0], results['metadatas'][0])):
-            chunk_id = metadata.get('chunk_id', 'N/A')
-            file_name = metadata.get('file_name', 'N/A')
-            formatted_data += f"Document {idx + 1}:\n"
-            formatted_data += f"Document ID: {chunk_id}\n"
-            formatted_data += f"File Name: {file_name}\n"
-            formatted_data += f"Content:\n{doc}\n"
-            formatted_data += "-" * 80 + "\n"
-
-        return formatted_data
-
-    
-class OpenAIChromaRetriever:
+        with span("format_prompt"):
+            if self.context_builder is not None:
+                return self.context_builder.build(results)
+            if not results or not results['documents'] or len(results['documents'][0]) == 0:
+                return "No relevant data found."
+
+            return "".join(
+                format_document(idx + 1, doc, metadata)
+                for idx, (doc, metadata) in enumerate(zip(results['documents'][0], results['metadatas'][0]))
+            )
+
+
+class ChromaRetriever(BaseRetriever):
+    """
+    A class for retrieving documents from a vector DB collection based on semantic similarity using embeddings.
+    The collection is ChromaDB by default; any backend supported by vector_store can be selected with vector_db.
+    """
+    def __init__(self, embedding_model: str, db_path: str, db_collection: str, n_results: int, query_cache: QueryEmbeddingCache | None = None, vector_db: str = "chromaDB", hybrid_search: bool = False, hybrid_candidates: int = 20, rrf_k: int = 60, reranker: Reranker | None = None, rerank_candidates: int = 50, context_builder: ContextBuilder | None = None, merge_adjacent: bool = False) -> None:
+        """
+        Args:
+            embedding_model: The name of the SentenceTransformer model.
+            The other arguments are described in BaseRetriever.
+        """
+        self.embedding_model = embedding_model
+        self.model = SentenceTransformer(self.embedding_model, trust_remote_code=True)
+        super().__init__(db_path, db_collection, n_results, query_cache, vector_db, hybrid_search, hybrid_candidates, rrf_k, reranker, rerank_candidates, context_builder, merge_adjacent)
+
+    def embed_queries(self, queries: list[str], batch_size: int = 64) -> list:
+        """Embeds several queries with one batched encode call. Cached queries are not embedded again."""
+        embeddings = [self.query_cache.get(self.embedding_model, query) for query in queries]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            with span("embed_query"):
+                encoded = self.model.encode([queries[i] for i in missing], batch_size=batch_size)
+            for i, embedding in zip(missing, encoded):
+                embeddings[i] = embedding
+                self.query_cache.put(self.embedding_model, queries[i], embedding)
+        return embeddings
+
+
+class OpenAIChromaRetriever(BaseRetriever):
     """
-    A class for retrieving documents from a ChromaDB collection based on semantic similarity using embeddings. Uses OpenAI API for embeddings.
+    A class for retrieving documents from a vector DB collection based on semantic similarity using embeddings. Uses OpenAI API for embeddings.
     """
-    def __init__(self, openai_client: OpenAI, embedding_model: str, db_path: str, db_collection: str, n_results: int) -> None:
+    def __init__(self, openai_client: OpenAI, embedding_model: str, db_path: str, db_collection: str, n_results: int, query_cache: QueryEmbeddingCache | None = None, vector_db: str = "chromaDB", hybrid_search: bool = False, hybrid_candidates: int = 20, rrf_k: int = 60, reranker: Reranker | None = None, rerank_candidates: int = 50, context_builder: ContextBuilder | None = None, merge_adjacent: bool = False) -> None:
         """
         Args:
             openai_client: The initialized OpenAI client object.
             embedding_model: The name of the embedding model to use (e.g., 'text-embedding-3-small').
-            db_path: Path to ChromaDB.
-            db_collection: Name of the collection.
-            n_results: Number of results to return.
+            The other arguments are described in BaseRetriever. The query cache saves a paid API round-trip
+            for repeated queries.
         """
-        self.db_path = db_path
-        self.db_collection = db_collection
-        self.n_results = n_results
-        
         # Dependency Injection
         self.client_openai = openai_client
         self.model_name = embedding_model
-        
-        # Initialize ChromaDB
-        self.client_db = chromadb.PersistentClient(path=self.db_path)
-        self.collection = self.client_db.get_collection(name=self.db_collection)
-
-    def retrieve(self, query: str):
-        """Embeds the query using the injected OpenAI client and retrieves documents."""
-        try:
-            clean_query = query.replace("\n", " ")
-            
-            response = self.client_openai.embeddings.create(
-                model=self.model_name,
-                input=[clean_query]
-            )
-            
-            embedded_query = response.data[0].embedding
-            
-            results = self.collection.query(
-                query_embeddings=[embedded_query],
-                n_results=self.n_results
-            )
-            return results
-        except Exception as e:
-            print(f"An error occurred during OpenAI retrieval: {e}")
-            return None
-
-    def format_results_for_prompt(self, results):
-        if not results or not results['documents']:
-            return "No relevant data found."
-
-        formatted_data = ""
-        if len(results['documents'][0]) == 0:
-             return "No relevant data found."
-
-        for idx, (doc, metadata) in enumerate(zip(results['documents'][0], results['metadatas'][0])):
-            chunk_id = metadata.get('chunk_id', 'N/A')
-            file_name = metadata.get('file_name', 'N/A')
-            formatted_data += f"Document {idx + 1}:\n"
-            formatted_data += f"Document ID: {chunk_id}\n"
-            formatted_data += f"File Name: {file_name}\n"
-            formatted_data += f"Content:\n{doc}\n"
-            formatted_data += "-" * 80 + "\n"
-
-        return formatted_data
-
+        # A query is a single text, so keep retries short to bound request latency
+        self.embedder = OpenAIEmbedder(
+            openai_client=self.client_openai,
+            embedding_model=self.model_name,
+            max_retries=2,
+            max_requeues=0
+        )
+        super().__init__(db_path, db_collection, n_results, query_cache, vector_db, hybrid_search, hybrid_candidates, rrf_k, reranker, rerank_candidates, context_builder, merge_adjacent)
 
-    
\ No newline at end of file
+    def embed_queries(self, queries: list[str]) -> list[list[float]]:
+        """Embeds several queries with batched API requests. Cached queries are not embedded again."""
+        embeddings = [self.query_cache.get(self.model_name, query) for query in queries]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            # Shares batching and retry handling with the ingestion pipeline
+            with span("embed_query"):
+                encoded = self.embedder.embed([queries[i] for i in missing])
+            for i, embedding in zip(missing, encoded):
+                embeddings[i] = embedding
+                self.query_cache.put(self.model_name, queries[i], embedding)
+        return embeddings
@@ -0,0 +1,98 @@
+from retrieval.context import overlap_length
+
+
+def _join(left: str, right: str) -> str:
+    """Joins the texts of two consecutive chunks, keeping their shared sentences once."""
+    rest = right[overlap_length(left, right):].lstrip()
+    return f"{left} {rest}" if rest else left
+
+
+def merge_adjacent_chunks(results: dict, n_results: int) -> dict:
+    """
+    Collapses consecutive chunks of the same file into one passage and keeps the best n_results passages.
+
+    Chunks overlap by overlap_size sentences, so returning chunks i and i + 1 of a file puts those sentences
+    in the prompt twice. Candidates are visited in rank order: a chunk next to a passage of its file is joined
+    to it without the repeated sentences (a chunk between two passages joins both), and any other chunk starts
+    a new passage while fewer than n_results exist. Slots freed by merging are filled by lower ranked candidates,
+    so the caller should retrieve more than n_results.
+
+    Args:
+        results: A single-query result in the layout returned by the retrievers, ordered from the best match.
+            Chunks are identified by the 'file_path' (or 'file_name') and integer 'chunk_id' metadata.
+        n_results: Number of passages to return.
+
+    Returns:
+        dict: The passages in the same layout, ordered by their best chunk. A merged passage has the IDs of its
+        chunks joined with '+', the chunk_id of its first chunk, the lowest distance and the highest scores.
+    """
+    if not results or not results.get('ids') or not results['ids'][0]:
+        return results
+    score_keys = [key for key in ("scores", "rerank_scores") if results.get(key) is not None]
+
+    passages = []
+    # (file, chunk index) -> the passage that chunk belongs to
+    by_chunk = {}
+    for position, (doc_id, doc, metadata) in enumerate(zip(results['ids'][0], results['documents'][0], results['metadatas'][0])):
+        file_key = metadata.get('file_path', metadata.get('file_name'))
+        chunk_id = metadata.get('chunk_id')
+        if isinstance(chunk_id, int) and (file_key, chunk_id) in by_chunk:
+            continue
+        left = by_chunk.get((file_key, chunk_id - 1)) if isinstance(chunk_id, int) else None
+        right = by_chunk.get((file_key, chunk_id + 1)) if isinstance(chunk_id, int) else None
+
+        if left is None and right is None:
+            if len(passages) == n_results:
+                break
+            passage = {
+                "ids": [doc_id],
+                "text": doc,
+                "metadata": metadata,
+                "start": chunk_id,
+                "end": chunk_id,
+                "distance": results['distances'][0][position] if results.get('distances') else None,
+                "scores": {key: results[key][0][position] for key in score_keys},
+            }
+            passages.append(passage)
+        else:
+            passage = left if left is not None else right
+            if left is not None:
+                passage["text"] = _join(passage["text"], doc)
+                passage["ids"].append(doc_id)
+                passage["end"] = chunk_id
+            if right is not None and right is not left:
+                if left is None:
+                    passage["text"] = _join(doc, passage["text"])
+                    passage["ids"].insert(0, doc_id)
+                    passage["start"] = chunk_id
+                else:
+                    # The chunk bridges two passages: fold the right one into the left one,
+                    # which takes the better rank of the two
+                    passage["text"] = _join(passage["text"], right["text"])
+                    passage["ids"].extend(right["ids"])
+                    passage["end"] = right["end"]
+                    if right["distance"] is not None and (passage["distance"] is None or right["distance"] < passage["distance"]):
+                        passage["distance"] = right["distance"]
+                    for key in score_keys:
+                        passage["scores"][key] = max(passage["scores"][key], right["scores"][key])
+                    rank = min(passages.index(passage), passages.index(right))
+                    passages.remove(right)
+                    passages.remove(passage)
+                    passages.insert(rank, passage)
+                    for index in range(right["start"], right["end"] + 1):
+                        by_chunk[(file_key, index)] = passage
+            distance = results['distances'][0][position] if results.get('distances') else None
+            if distance is not None and (passage["distance"] is None or distance < passage["distance"]):
+                passage["distance"] = distance
+        by_chunk[(file_key, chunk_id)] = passage
+
+    merged = {
+        "ids": [["+".join(passage["ids"]) for passage in passages]],
+        "documents": [[passage["text"] for passage in passages]],
+        "metadatas": [[{**passage["metadata"], "chunk_id": passage["start"]} for passage in passages]],
+    }
+    if results.get('distances') is not None:
+        merged["distances"] = [[passage["distance"] for passage in passages]]
+    for key in score_keys:
+        merged[key] = [[passage["scores"][key] for passage in passages]]
+    return merged
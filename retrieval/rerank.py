@@ -0,0 +1,82 @@
+import time
+
+from sentence_transformers import CrossEncoder
+
+
+class Reranker:
+    """
+    Reorders retrieved chunks with a cross-encoder, which reads the query and the chunk together and
+    ranks far better than embedding distance, at the cost of one model pass per candidate.
+
+    Candidates are scored in batches. Scoring stops as soon as the next batch would exceed the time budget,
+    and the retriever's order is kept instead, so reranking adds about the budget at most to a request on a slow
+    CPU host. Keep batch_size small enough that a single batch fits in the budget.
+    """
+    def __init__(self, model_name: str, batch_size: int = 16, time_budget: float | None = 0.5, max_length: int = 512) -> None:
+        """
+        Args:
+            model_name: The sentence-transformers CrossEncoder model.
+            batch_size: Number of query/chunk pairs scored per model call.
+            time_budget: Maximum seconds spent scoring one query's candidates. None for no limit.
+            max_length: Query plus chunk tokens seen by the model. Longer chunks are truncated.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+        self.model = CrossEncoder(model_name, max_length=max_length)
+        # Number of times the budget ran out and the retriever's order was used
+        self.fallbacks = 0
+        # Number of times every candidate was scored, but the last batch took the time past the budget
+        self.overruns = 0
+
+    def score(self, query: str, documents: list[str]) -> list[float] | None:
+        """
+        Scores the documents against the query within the time budget. Once every document is scored the
+        scores are returned even if the last batch overran the budget, which is counted in overruns.
+
+        Returns:
+            list[float] | None: One relevance score per document (higher is better), or None if the budget ran out
+            before every document was scored.
+        """
+        scores = []
+        start = time.perf_counter()
+        for offset in range(0, len(documents), self.batch_size):
+            elapsed = time.perf_counter() - start
+            if self.time_budget is not None and offset:
+                # Stop before a batch that would likely overrun, based on the average batch time so far
+                per_batch = elapsed / (offset // self.batch_size)
+                if elapsed + per_batch > self.time_budget:
+                    return None
+            pairs = [(query, document) for document in documents[offset:offset + self.batch_size]]
+            scores.extend(float(score) for score in self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False))
+        if self.time_budget is not None and time.perf_counter() - start > self.time_budget:
+            self.overruns += 1
+        return scores
+
+    def rerank(self, query: str, results: dict, n_results: int) -> dict:
+        """
+        Reorders a single-query result by cross-encoder score and keeps the best n_results.
+
+        Args:
+            query: The user's query.
+            results: A result in the layout returned by the retrievers.
+            n_results: Number of documents to keep.
+
+        Returns:
+            dict: The result in the same layout, with the cross-encoder scores in 'rerank_scores'.
+            If the time budget ran out, the first n_results in the original order.
+        """
+        if not results or not results['ids'] or not results['ids'][0]:
+            return results
+        keys = [key for key in ("ids", "documents", "metadatas", "distances", "scores") if results.get(key) is not None]
+
+        scores = self.score(query, results['documents'][0])
+        if scores is None:
+            self.fallbacks += 1
+            print(f"Reranking exceeded the {self.time_budget}s budget; using the retrieval order")
+            return {key: [results[key][0][:n_results]] for key in keys}
+
+        order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:n_results]
+        reranked = {key: [[results[key][0][i] for i in order]] for key in keys}
+        reranked["rerank_scores"] = [[scores[i] for i in order]]
+        return reranked
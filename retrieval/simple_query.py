@@ -1,6 +1,5 @@
 import os
 import sys
-import chromadb
 from sentence_transformers import SentenceTransformer
 
 
@@ -9,14 +8,12 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(parent_dir)
 
 
-from config.embedding_config import model_name, db_directory, collection_name
+from config.embedding_config import model_name, db_directory, collection_name, vector_db
+from vector_store import get_vector_store
 
 
-# Initialize the ChromaDB persistent client
-client = chromadb.PersistentClient(path=db_directory)
-
-# Get the collection
-collection = client.get_collection(name=collection_name)
+# Get the collection from the configured vector DB
+collection = get_vector_store(vector_db, db_directory, collection_name)
 
 # Define your query text
 query_text = "I am looking for books about war"
@@ -0,0 +1,104 @@
+import math
+import random
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+
+from vector_store.bm25 import BM25Index, tokenize
+
+
+def brute_force(documents: dict, query: str, k1: float = 1.2, b: float = 0.75) -> dict:
+    """Scores every document against the query with the BM25 formula of BM25Index."""
+    counts = {doc_id: Counter(tokenize(text)) for doc_id, text in documents.items()}
+    average_length = sum(sum(c.values()) for c in counts.values()) / len(counts)
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(1 for c in counts.values() if term in c)
+        if not df:
+            continue
+        idf = math.log(1.0 + (len(counts) - df + 0.5) / (df + 0.5))
+        for doc_id, c in counts.items():
+            if term in c:
+                norm = k1 * (1.0 - b + b * sum(c.values()) / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * c[term] * (k1 + 1.0) / (c[term] + norm)
+    return scores
+
+
+class BM25IndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def open_index(self, **options) -> BM25Index:
+        index = BM25Index(self.directory, "collection", create=True, **options)
+        self.addCleanup(index.close)
+        return index
+
+    def corpus(self, size: int = 300, seed: int = 0) -> dict:
+        rng = random.Random(seed)
+        # A Zipf-like vocabulary: a few very common terms and many rare ones
+        vocabulary = [f"term{i}" for i in range(200)]
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        return {
+            f"doc{i}": " ".join(rng.choices(vocabulary, weights, k=rng.randint(5, 60)))
+            for i in range(size)
+        }
+
+    def test_pruned_search_matches_full_scoring(self):
+        documents = self.corpus()
+        index = self.open_index(max_df=1.0)
+        index.add(list(documents), list(documents.values()), [{}] * len(documents))
+        rng = random.Random(1)
+        for _ in range(50):
+            query = " ".join(f"term{rng.randrange(200)}" for _ in range(rng.randint(1, 5)))
+            scores = brute_force(documents, query)
+            expected = sorted(scores.items(), key=lambda item: -item[1])[:10]
+            found = index.search(query, 10)
+            with self.subTest(query=query):
+                self.assertEqual(len(found), len(expected))
+                for (doc_id, score), (_, expected_score) in zip(found, expected):
+                    self.assertAlmostEqual(score, expected_score)
+                    self.assertAlmostEqual(scores[doc_id], score)
+
+    def test_common_terms_only_rescore_candidates(self):
+        documents = {f"common{i}": "the the report" for i in range(20)}
+        documents["rare"] = "the error E1234 in the report"
+        index = self.open_index()
+        index.add(list(documents), list(documents.values()), [{}] * len(documents))
+        self.assertEqual([doc_id for doc_id, _ in index.search("the E1234", 5)], ["rare"])
+        # Without a rarer term, the most selective common term still finds documents
+        self.assertEqual(len(index.search("the report", 5)), 5)
+
+    def test_identifiers_are_single_terms(self):
+        self.assertEqual(tokenize("Call user_id or user-id, ERR_42!"), ["call", "user_id", "or", "user", "id", "err_42"])
+
+    def test_replace_and_delete(self):
+        index = self.open_index()
+        index.add(["a", "b", "c"], ["alpha beta", "beta gamma", "gamma delta"], [{"file": "x"}, {"file": "y"}, {"file": "x"}])
+        index.add(["a"], ["omega"], [{"file": "x"}])
+        self.assertEqual(index.count(), 3)
+        self.assertEqual(index.search("alpha", 5), [])
+        self.assertEqual([doc_id for doc_id, _ in index.search("omega", 5)], ["a"])
+
+        index.delete(where={"file": "x"})
+        self.assertEqual(index.count(), 1)
+        self.assertEqual([doc_id for doc_id, _ in index.search("gamma delta omega", 5)], ["b"])
+        index.delete(ids=["b"])
+        self.assertEqual(index.search("beta", 5), [])
+
+    def test_reopen(self):
+        index = self.open_index()
+        index.add(["a"], ["persistent text"], [{}])
+        index.close()
+        reopened = BM25Index(self.directory, "collection")
+        self.addCleanup(reopened.close)
+        self.assertEqual([doc_id for doc_id, _ in reopened.search("text", 1)], ["a"])
+
+    def test_missing_index(self):
+        with self.assertRaises(ValueError):
+            BM25Index(self.directory, "missing")
+
+
+if __name__ == '__main__':
+    unittest.main()
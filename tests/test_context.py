@@ -0,0 +1,77 @@
+import unittest
+
+from retrieval.context import ContextBuilder, TokenCounter, format_document, overlap_length
+
+
+SENTENCES = [f"This is sentence number {i} of the report." for i in range(12)]
+
+
+def chunk(index: int, size: int = 3, overlap: int = 1) -> str:
+    start = index * (size - overlap)
+    return " ".join(SENTENCES[start:start + size])
+
+
+def results(documents: list[str], metadatas: list[dict]) -> dict:
+    return {"ids": [[f"id{i}" for i in range(len(documents))]], "documents": [documents], "metadatas": [metadatas]}
+
+
+class OverlapLengthTest(unittest.TestCase):
+    def test_shared_sentences(self):
+        self.assertEqual(overlap_length(chunk(0), chunk(1)), len(SENTENCES[2]))
+
+    def test_no_overlap(self):
+        self.assertEqual(overlap_length(chunk(0), chunk(3)), 0)
+
+    def test_short_or_partial_word_overlap_is_ignored(self):
+        self.assertEqual(overlap_length("ends with the word", "word starts the next one"), 0)
+        self.assertEqual(overlap_length("a long text ending in abcdefghijklmnopqrstuvwxyz", "bcdefghijklmnopqrstuvwxyz and more"), 0)
+
+
+class ContextBuilderTest(unittest.TestCase):
+    def setUp(self):
+        # Budgets below are set for the character estimate, which is the same with or without tiktoken installed
+        self.builder = ContextBuilder(max_tokens=None)
+        self.builder.counter.encoding = None
+
+    def test_without_budget_matches_plain_formatting(self):
+        metadatas = [{"file_name": "a.txt", "chunk_id": 0}, {"file_name": "b.txt", "chunk_id": 4}]
+        built = self.builder.build(results([chunk(0), chunk(4)], metadatas))
+        self.assertEqual(built, format_document(1, chunk(0), metadatas[0]) + format_document(2, chunk(4), metadatas[1]))
+
+    def test_adjacent_chunks_share_their_overlap_once(self):
+        metadatas = [{"file_name": "a.txt", "chunk_id": 1}, {"file_name": "a.txt", "chunk_id": 0}, {"file_name": "a.txt", "chunk_id": 2}]
+        built = self.builder.build(results([chunk(1), chunk(0), chunk(2)], metadatas))
+        for sentence in SENTENCES[:7]:
+            self.assertEqual(built.count(sentence), 1, sentence)
+
+    def test_budget_trims_and_drops_low_ranked_chunks(self):
+        documents = [" ".join(SENTENCES) * 2, chunk(0), chunk(3)]
+        metadatas = [{"file_name": f"{name}.txt", "chunk_id": 0} for name in "abc"]
+        self.builder.max_tokens = 150
+        self.builder.min_chunk_tokens = 20
+        built = self.builder.build(results(documents, metadatas))
+        self.assertLessEqual(self.builder.counter.count(built), 150)
+        self.assertIn("File Name: a.txt", built)
+        self.assertNotIn("File Name: c.txt", built)
+        # The trimmed chunk ends on a sentence
+        content = built.split("Content:\n", 1)[1].split("\n", 1)[0]
+        self.assertTrue(content.endswith("."))
+
+    def test_empty(self):
+        self.assertEqual(self.builder.build({"documents": [[]], "metadatas": [[]]}), "No relevant data found.")
+        self.assertEqual(self.builder.build(None), "No relevant data found.")
+
+
+class TokenCounterTest(unittest.TestCase):
+    def test_truncate_fits(self):
+        counter = TokenCounter()
+        text = " ".join(SENTENCES)
+        for max_tokens in (5, 20, 60):
+            with self.subTest(max_tokens=max_tokens):
+                self.assertLessEqual(counter.count(counter.truncate(text, max_tokens)), max_tokens)
+        self.assertEqual(counter.truncate(text, 0), "")
+        self.assertEqual(counter.truncate(text, 1000), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from vector_store.faiss_store import FaissVectorStore
+
+
+def random_vectors(rows: int, seed: int, dimension: int = 16) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(rows, dimension)).astype(np.float32)
+
+
+class FaissVectorStoreTest(unittest.TestCase):
+    """Every record must be its own nearest neighbour after upserts, replacements and deletes."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def open_store(self, index_type: str, quantization: str | None = None) -> FaissVectorStore:
+        store = FaissVectorStore(
+            self.directory, f"{index_type}_{quantization}", create=True, index_type=index_type,
+            quantization=quantization, nlist=4, nprobe=4
+        )
+        self.addCleanup(store.close)
+        return store
+
+    def upsert(self, store: FaissVectorStore, ids: list[str], vectors: np.ndarray) -> None:
+        store.upsert(ids, vectors, [f"text {record_id}" for record_id in ids], [{"id": record_id} for record_id in ids])
+
+    def assert_self_hits(self, store: FaissVectorStore, ids: list[str], vectors: np.ndarray) -> None:
+        results = store.query(vectors, 1)
+        self.assertEqual([found[0] if found else None for found in results["ids"]], ids)
+        self.assertEqual(results["documents"][0], [f"text {ids[0]}"])
+
+    def check_replace_and_delete(self, index_type: str, quantization: str | None = None) -> None:
+        store = self.open_store(index_type, quantization)
+        ids = [f"id{i}" for i in range(400)]
+        vectors = random_vectors(400, seed=0)
+        for start in range(0, 400, 100):
+            self.upsert(store, ids[start:start + 100], vectors[start:start + 100])
+        store.persist()
+        self.assert_self_hits(store, ids, vectors)
+
+        # Replace a block of records with new vectors, then delete a scattered set
+        vectors[100:300] = random_vectors(200, seed=1)
+        self.upsert(store, ids[100:300], vectors[100:300])
+        store.delete(ids=ids[::7])
+        live = [i for i in range(400) if i % 7]
+        self.assertEqual(store.count(), len(live))
+        self.assert_self_hits(store, [ids[i] for i in live], vectors[live])
+
+        store.persist()
+        reopened = FaissVectorStore(self.directory, f"{index_type}_{quantization}", nprobe=4)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.count(), len(live))
+        self.assert_self_hits(reopened, [ids[i] for i in live], vectors[live])
+
+    def test_flat(self):
+        self.check_replace_and_delete("flat")
+
+    def test_ivf(self):
+        self.check_replace_and_delete("ivf")
+
+    def test_hnsw(self):
+        self.check_replace_and_delete("hnsw")
+
+    def test_ivf_index_holds_no_stale_vectors(self):
+        store = self.open_store("ivf")
+        ids = [f"id{i}" for i in range(400)]
+        self.upsert(store, ids, random_vectors(400, seed=0))
+        self.upsert(store, ids[:200], random_vectors(200, seed=1))
+        store.delete(ids=ids[300:])
+        self.assertEqual(store.index.ntotal, store.count())
+
+    def test_hnsw_persist_drops_stale_vectors(self):
+        store = self.open_store("hnsw")
+        ids = [f"id{i}" for i in range(200)]
+        self.upsert(store, ids, random_vectors(200, seed=0))
+        store.delete(ids=ids[100:])
+        store.persist()
+        self.assertEqual(store.index.ntotal, 100)
+
+    def check_pending_replace_and_delete(self, index_type: str, quantization: str | None) -> None:
+        # Fewer vectors than training needs, so they wait in the pending buffer until persist()
+        store = self.open_store(index_type, quantization)
+        ids = [f"id{i}" for i in range(100)]
+        vectors = random_vectors(100, seed=0)
+        self.upsert(store, ids, vectors)
+        vectors[:50] = random_vectors(50, seed=1)
+        self.upsert(store, ids[:50], vectors[:50])
+        store.delete(ids=ids[80:])
+        store.persist()
+        self.assertEqual(store.count(), 80)
+        self.assertEqual(store.index.ntotal, 80)
+        self.assert_self_hits(store, ids[:80], vectors[:80])
+
+    def test_untrained_int8_replace_and_delete(self):
+        self.check_pending_replace_and_delete("flat", "int8")
+        self.check_pending_replace_and_delete("hnsw", "int8")
+
+    def test_untrained_ivf_replace_and_delete(self):
+        self.check_pending_replace_and_delete("ivf", None)
+
+    def test_everything_pending_deleted(self):
+        store = self.open_store("flat", "int8")
+        self.upsert(store, ["a", "b"], random_vectors(2, seed=0))
+        store.delete(ids=["a", "b"])
+        store.persist()
+        self.assertEqual(store.count(), 0)
+        self.assertEqual(store.query(random_vectors(1, seed=0), 1)["ids"], [[]])
+
+    def test_checkpoint_keeps_stale_hnsw_vectors_for_persist(self):
+        store = self.open_store("hnsw")
+        ids = [f"id{i}" for i in range(200)]
+        vectors = random_vectors(200, seed=0)
+        self.upsert(store, ids, vectors)
+        store.delete(ids=ids[100:])
+        store.checkpoint()
+        self.assertEqual(store.index.ntotal, 200)
+        reopened = FaissVectorStore(self.directory, "hnsw_None")
+        self.addCleanup(reopened.close)
+        self.assert_self_hits(reopened, ids[:100], vectors[:100])
+
+    def test_empty_query(self):
+        results = self.open_store("flat").query(random_vectors(2, seed=0), 3)
+        self.assertEqual(results["ids"], [[], []])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from retrieval.hybrid import fuse_results, reciprocal_rank_fusion
+
+
+class DictStore:
+    """Serves get() from a dict of id -> (document, metadata), like a vector store."""
+    def __init__(self, records: dict) -> None:
+        self.records = records
+        self.requested = []
+
+    def get(self, ids=None, where=None, limit=None, offset=None) -> dict:
+        self.requested.append(list(ids))
+        found = [doc_id for doc_id in ids if doc_id in self.records]
+        return {
+            "ids": found,
+            "documents": [self.records[doc_id][0] for doc_id in found],
+            "metadatas": [self.records[doc_id][1] for doc_id in found],
+        }
+
+
+def dense(ids: list[str]) -> dict:
+    return {
+        "ids": [ids],
+        "documents": [[f"text {doc_id}" for doc_id in ids]],
+        "metadatas": [[{"source": doc_id} for doc_id in ids]],
+        "distances": [[0.1 * (rank + 1) for rank in range(len(ids))]],
+    }
+
+
+class ReciprocalRankFusionTest(unittest.TestCase):
+    def test_scores(self):
+        fused = dict(reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=60))
+        self.assertAlmostEqual(fused["a"], 1 / 61)
+        self.assertAlmostEqual(fused["b"], 1 / 62 + 1 / 61)
+        self.assertAlmostEqual(fused["c"], 1 / 62)
+
+    def test_order(self):
+        self.assertEqual([doc_id for doc_id, _ in reciprocal_rank_fusion([["a", "b", "c"], ["b"]])], ["b", "a", "c"])
+
+
+class FuseResultsTest(unittest.TestCase):
+    def test_documents_found_by_both_rank_first(self):
+        store = DictStore({})
+        fused = fuse_results(dense(["a", "b", "c"]), [("b", 4.0)], store, n_results=3)
+        self.assertEqual(fused["ids"], [["b", "a", "c"]])
+        self.assertEqual(fused["documents"], [["text b", "text a", "text c"]])
+        self.assertEqual(fused["metadatas"], [[{"source": "b"}, {"source": "a"}, {"source": "c"}]])
+        self.assertEqual(fused["distances"], [[0.1 * 2, 0.1 * 1, 0.1 * 3]])
+        scores = fused["scores"][0]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        # Every document came with the dense results
+        self.assertEqual(store.requested, [])
+
+    def test_lexical_only_documents_are_read_from_the_store(self):
+        store = DictStore({"x": ("text x", {"source": "x"})})
+        fused = fuse_results(dense(["a"]), [("x", 3.0)], store, n_results=2, k=60)
+        self.assertEqual(fused["ids"], [["a", "x"]])
+        self.assertEqual(fused["documents"], [["text a", "text x"]])
+        # Not ranked by the embedding search
+        self.assertEqual(fused["distances"], [[0.1, None]])
+        self.assertEqual(store.requested, [["x"]])
+
+    def test_lexical_hits_missing_from_the_store_are_dropped(self):
+        fused = fuse_results(dense(["a"]), [("gone", 3.0)], DictStore({}), n_results=2)
+        self.assertEqual(fused["ids"], [["a"]])
+        self.assertEqual(len(fused["scores"][0]), 1)
+
+    def test_n_results(self):
+        fused = fuse_results(dense(["a", "b", "c", "d"]), [("d", 1.0)], DictStore({}), n_results=2)
+        self.assertEqual(fused["ids"], [["d", "a"]])
+        for key in ("documents", "metadatas", "distances", "scores"):
+            self.assertEqual(len(fused[key][0]), 2)
+
+    def test_empty(self):
+        fused = fuse_results(dense([]), [], DictStore({}), n_results=5)
+        self.assertEqual(fused["ids"], [[]])
+        self.assertEqual(fused["scores"], [[]])
+
+
+if __name__ == '__main__':
+    unittest.main()
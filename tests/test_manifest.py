@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from embedding.manifest import Manifest, manifest_path, relative_path
+
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.root_dir = os.path.join(self.directory, "raw")
+        os.makedirs(os.path.join(self.root_dir, "sub"))
+        self.path = manifest_path(self.directory, "collection")
+        self.files = [self.write("a.txt", "First document."), self.write(os.path.join("sub", "b.txt"), "Second document.")]
+
+    def write(self, name: str, text: str) -> str:
+        file_path = os.path.join(self.root_dir, name)
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return file_path
+
+    def indexed_manifest(self) -> Manifest:
+        """Returns the manifest reloaded after every file was recorded and saved."""
+        manifest = Manifest(self.path)
+        for chunks, file_path in enumerate(self.files, start=1):
+            manifest.record(file_path, self.root_dir, chunks)
+        manifest.save()
+        return Manifest(self.path)
+
+    def test_new_files_are_changed(self):
+        changed, unchanged, removed = Manifest(self.path).plan(self.files, self.root_dir)
+        self.assertEqual((changed, unchanged, removed), (self.files, [], []))
+
+    def test_round_trip(self):
+        manifest = self.indexed_manifest()
+        self.assertEqual(manifest.plan(self.files, self.root_dir), ([], self.files, []))
+        self.assertEqual(manifest.chunk_count(relative_path(self.files[0], self.root_dir)), 1)
+        self.assertEqual(manifest.chunk_count(os.path.join("sub", "b.txt")), 2)
+        self.assertEqual(manifest.chunk_count("missing.txt"), 0)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_modified_file_is_changed(self):
+        manifest = self.indexed_manifest()
+        self.write("a.txt", "First document, edited.")
+        self.assertEqual(manifest.plan(self.files, self.root_dir), ([self.files[0]], [self.files[1]], []))
+
+    def test_touched_file_is_unchanged(self):
+        manifest = self.indexed_manifest()
+        stat = os.stat(self.files[0])
+        os.utime(self.files[0], (stat.st_atime, stat.st_mtime + 10))
+        self.assertEqual(manifest.plan(self.files, self.root_dir), ([], self.files, []))
+        # The new modification time is remembered, so the next plan doesn't hash the file again
+        self.assertEqual(manifest.entries["a.txt"]["mtime"], os.stat(self.files[0]).st_mtime)
+
+    def test_deleted_file_is_removed(self):
+        manifest = self.indexed_manifest()
+        os.remove(self.files[1])
+        rel_path = os.path.join("sub", "b.txt")
+        self.assertEqual(manifest.plan(self.files[:1], self.root_dir), ([], self.files[:1], [rel_path]))
+        manifest.remove(rel_path)
+        manifest.save()
+        self.assertEqual(Manifest(self.path).plan(self.files[:1], self.root_dir), ([], self.files[:1], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
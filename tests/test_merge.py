@@ -0,0 +1,66 @@
+import unittest
+
+from retrieval.merge import merge_adjacent_chunks
+
+
+SENTENCES = [f"This is sentence number {i} of the report." for i in range(12)]
+
+
+def chunk(index: int, size: int = 3, overlap: int = 1) -> str:
+    """Returns chunk index of SENTENCES, chunked like chunk_sentences(SENTENCES, size, overlap)."""
+    start = index * (size - overlap)
+    return " ".join(SENTENCES[start:start + size])
+
+
+def results(chunks: list[tuple[str, int]], scores: bool = False) -> dict:
+    """Builds a single-query result from (file, chunk index) pairs in rank order."""
+    layout = {
+        "ids": [[f"{file}_chunk_{index}" for file, index in chunks]],
+        "documents": [[chunk(index) for _, index in chunks]],
+        "metadatas": [[{"file_path": file, "file_name": file, "chunk_id": index} for file, index in chunks]],
+        "distances": [[0.1 * (rank + 1) for rank in range(len(chunks))]],
+    }
+    if scores:
+        layout["rerank_scores"] = [[10.0 - rank for rank in range(len(chunks))]]
+    return layout
+
+
+class MergeAdjacentChunksTest(unittest.TestCase):
+    def test_adjacent_chunks_are_joined_without_repeated_sentences(self):
+        merged = merge_adjacent_chunks(results([("a.txt", 1), ("a.txt", 2)]), 5)
+        self.assertEqual(merged["ids"], [["a.txt_chunk_1+a.txt_chunk_2"]])
+        self.assertEqual(merged["documents"], [[" ".join(SENTENCES[2:7])]])
+        self.assertEqual(merged["metadatas"][0][0]["chunk_id"], 1)
+        self.assertEqual(merged["distances"], [[0.1]])
+
+    def test_chunk_before_a_passage_is_prepended(self):
+        merged = merge_adjacent_chunks(results([("a.txt", 2), ("a.txt", 1)]), 5)
+        self.assertEqual(merged["ids"], [["a.txt_chunk_1+a.txt_chunk_2"]])
+        self.assertEqual(merged["documents"], [[" ".join(SENTENCES[2:7])]])
+        self.assertEqual(merged["metadatas"][0][0]["chunk_id"], 1)
+
+    def test_bridging_chunk_joins_two_passages(self):
+        merged = merge_adjacent_chunks(results([("a.txt", 3), ("b.txt", 0), ("a.txt", 1), ("a.txt", 2)], scores=True), 5)
+        self.assertEqual(merged["ids"], [["a.txt_chunk_1+a.txt_chunk_2+a.txt_chunk_3", "b.txt_chunk_0"]])
+        self.assertEqual(merged["documents"][0][0], " ".join(SENTENCES[2:9]))
+        # The merged passage keeps the best rank, distance and score of its chunks
+        self.assertEqual(merged["distances"][0][0], 0.1)
+        self.assertEqual(merged["rerank_scores"][0], [10.0, 9.0])
+
+    def test_other_files_and_gaps_are_not_joined(self):
+        merged = merge_adjacent_chunks(results([("a.txt", 1), ("b.txt", 2), ("a.txt", 3)]), 5)
+        self.assertEqual(merged["ids"], [["a.txt_chunk_1", "b.txt_chunk_2", "a.txt_chunk_3"]])
+
+    def test_freed_slots_are_filled_and_capped(self):
+        ranked = [("a.txt", 1), ("a.txt", 2), ("b.txt", 0), ("c.txt", 0), ("d.txt", 0)]
+        merged = merge_adjacent_chunks(results(ranked), 3)
+        self.assertEqual(merged["ids"], [["a.txt_chunk_1+a.txt_chunk_2", "b.txt_chunk_0", "c.txt_chunk_0"]])
+        self.assertEqual(len(merged["documents"][0]), 3)
+
+    def test_empty(self):
+        empty = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        self.assertIs(merge_adjacent_chunks(empty, 3), empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
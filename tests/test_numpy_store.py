@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from vector_store.numpy_store import NumpyVectorStore
+
+
+def random_vectors(rows: int, seed: int, dimension: int = 32) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(rows, dimension)).astype(np.float32)
+
+
+class NumpyStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def open_store(self, name: str = "collection", **options) -> NumpyVectorStore:
+        store = NumpyVectorStore(self.directory, name, create=True, **options)
+        self.addCleanup(store.close)
+        return store
+
+    def upsert(self, store: NumpyVectorStore, ids: list[str], vectors: np.ndarray) -> None:
+        store.upsert(ids, vectors, [f"text {record_id}" for record_id in ids], [{"id": record_id} for record_id in ids])
+
+    def self_hit_recall(self, store: NumpyVectorStore, ids: list[str], vectors: np.ndarray) -> float:
+        results = store.query(vectors, 1)
+        return float(np.mean([bool(found) and found[0] == record_id for found, record_id in zip(results["ids"], ids)]))
+
+
+class NumpyVectorStoreTest(NumpyStoreTestCase):
+    def test_exact_search_matches_brute_force(self):
+        store = self.open_store()
+        vectors = random_vectors(500, seed=0)
+        ids = [f"id{i}" for i in range(500)]
+        self.upsert(store, ids[:250], vectors[:250])
+        store.persist()
+        # Half persisted, half pending: both are searched
+        self.upsert(store, ids[250:], vectors[250:])
+        queries = random_vectors(5, seed=1)
+        results = store.query(queries, 10)
+
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        similarities = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T
+        for row, found in enumerate(results["ids"]):
+            expected = np.argsort(-similarities[row])[:10]
+            self.assertEqual(found, [ids[i] for i in expected])
+            np.testing.assert_allclose(results["distances"][row], 1 - similarities[row][expected], atol=1e-5)
+        self.assertEqual(results["documents"][0][0], f"text {results['ids'][0][0]}")
+
+    def test_replace_and_delete(self):
+        store = self.open_store()
+        ids = [f"id{i}" for i in range(100)]
+        vectors = random_vectors(100, seed=0)
+        self.upsert(store, ids, vectors)
+        store.persist()
+        vectors[:30] = random_vectors(30, seed=1)
+        self.upsert(store, ids[:30], vectors[:30])
+        store.delete(ids=ids[90:])
+        self.assertEqual(store.count(), 90)
+        self.assertEqual(self.self_hit_recall(store, ids[:90], vectors[:90]), 1.0)
+        self.assertNotIn(store.query(vectors[95:96], 1)["ids"][0][0], ids[90:])
+
+        # persist() drops the replaced and deleted rows from the matrix
+        store.persist()
+        self.assertEqual(len(store.vectors), 90)
+        reopened = NumpyVectorStore(self.directory, "collection")
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.count(), 90)
+        self.assertEqual(self.self_hit_recall(reopened, ids[:90], vectors[:90]), 1.0)
+
+    def test_missing_collection(self):
+        with self.assertRaises(ValueError):
+            NumpyVectorStore(self.directory, "missing")
+
+    def test_empty_collection(self):
+        self.assertEqual(self.open_store().query(random_vectors(2, seed=0), 3)["ids"], [[], []])
+
+
+class CheckpointTest(NumpyStoreTestCase):
+    def test_checkpointed_rows_survive_without_persist(self):
+        for dtype in ("float32", "int8"):
+            with self.subTest(dtype=dtype):
+                store = self.open_store(dtype, dtype=dtype)
+                ids = [f"id{i}" for i in range(300)]
+                vectors = random_vectors(300, seed=0)
+                self.upsert(store, ids[:100], vectors[:100])
+                store.persist()
+                generation = store.current["generation"]
+
+                self.upsert(store, ids[100:200], vectors[100:200])
+                store.checkpoint()
+                self.upsert(store, ids[200:], vectors[200:])
+                store.delete(ids=ids[150:160])
+                store.checkpoint()
+                # A checkpoint appends segments and leaves the matrix alone
+                self.assertEqual(store.current["generation"], generation)
+                self.assertEqual(len(store.vectors), 100)
+
+                # Opened again as after a crash, before any persist()
+                reopened = NumpyVectorStore(self.directory, dtype)
+                self.addCleanup(reopened.close)
+                live = [i for i in range(300) if not 150 <= i < 160]
+                self.assertEqual(reopened.count(), len(live))
+                self.assertGreaterEqual(self.self_hit_recall(reopened, [ids[i] for i in live], vectors[live]), 0.99)
+
+                reopened.persist()
+                self.assertEqual(len(reopened.vectors), len(live))
+                self.assertFalse(os.path.exists(reopened.segments_dir))
+                again = NumpyVectorStore(self.directory, dtype)
+                self.addCleanup(again.close)
+                self.assertEqual(again.count(), len(live))
+
+    def test_segments_hold_only_new_rows(self):
+        store = self.open_store()
+        for batch in range(3):
+            self.upsert(store, [f"b{batch}_{i}" for i in range(50)], random_vectors(50, seed=batch))
+            store.checkpoint()
+        store.checkpoint()
+        segments = sorted(os.listdir(store.segments_dir))
+        self.assertEqual(len(segments), 3)
+        for name in segments:
+            with np.load(os.path.join(store.segments_dir, name)) as segment:
+                self.assertEqual(len(segment["labels"]), 50)
+
+
+class QuantizedStorageTest(NumpyStoreTestCase):
+    def test_compact_codes_find_themselves(self):
+        ids = [f"id{i}" for i in range(300)]
+        vectors = random_vectors(300, seed=0)
+        for dtype, rescore in (("float16", False), ("int8", False), ("int8", True), ("binary", True)):
+            with self.subTest(dtype=dtype, rescore=rescore):
+                store = self.open_store(f"{dtype}_{rescore}", dtype=dtype, rescore=rescore)
+                self.upsert(store, ids, vectors)
+                store.persist()
+                self.assertEqual(store.vectors.dtype, np.uint8 if dtype == "binary" else np.dtype(dtype))
+                self.assertEqual(store.full is not None, rescore)
+                self.assertGreaterEqual(self.self_hit_recall(store, ids, vectors), 0.99)
+
+    def test_int8_scale_widens_for_later_vectors(self):
+        for rescore in (False, True):
+            with self.subTest(rescore=rescore):
+                store = self.open_store(f"int8_{rescore}", dtype="int8", rescore=rescore)
+                first = random_vectors(200, seed=0)
+                first[:, 0] *= 0.01
+                self.upsert(store, [f"a{i}" for i in range(200)], first)
+                store.persist()
+                scale = store.scale.copy()
+
+                # Values far beyond the first range in dimension 0 would be clipped with the first scale
+                later = random_vectors(200, seed=1)
+                later[:, 0] *= 50
+                self.upsert(store, [f"b{i}" for i in range(200)], later)
+                store.persist()
+                self.assertGreater(store.scale[0], scale[0] * 10)
+                self.assertTrue((store.scale >= scale).all())
+
+                normalized = later / np.linalg.norm(later, axis=1, keepdims=True)
+                decoded = np.asarray(store.vectors[200:], dtype=np.float32) * store.scale
+                self.assertLess(np.abs(decoded - normalized).max(), store.scale.max())
+                self.assertGreaterEqual(self.self_hit_recall(store, [f"a{i}" for i in range(200)], first), 0.95)
+
+    def test_int8_persist_with_every_pending_row_deleted(self):
+        store = self.open_store(dtype="int8")
+        self.upsert(store, ["a"], random_vectors(1, seed=0))
+        store.delete(ids=["a"])
+        store.persist()
+        reopened = NumpyVectorStore(self.directory, "collection")
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import array
+import base64
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+
+from embedding.openai_embedder import EmbeddingError, OpenAIEmbedder
+
+
+def fake_embedding(text: str) -> list[float]:
+    return [float(len(text)), float(ord(text[0]) if text else 0)]
+
+
+class StubEmbeddingsServer:
+    """
+    A local /v1/embeddings endpoint. respond(texts, attempt) returns (status, headers) for an error,
+    or None to answer with the fake embeddings; attempt counts earlier requests for the same texts.
+    """
+    def __init__(self, respond=None) -> None:
+        self.respond = respond or (lambda texts, attempt: None)
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                texts = body["input"]
+                with stub.lock:
+                    attempt = stub.requests.count(texts)
+                    stub.requests.append(texts)
+                error = stub.respond(texts, attempt)
+                if error is not None:
+                    status, headers = error
+                    self._send(status, {"error": {"message": "stub error", "type": "stub"}}, headers)
+                    return
+                data = []
+                for index, text in enumerate(texts):
+                    embedding = fake_embedding(text)
+                    if body.get("encoding_format") == "base64":
+                        embedding = base64.b64encode(array.array("f", embedding).tobytes()).decode()
+                    data.append({"object": "embedding", "index": index, "embedding": embedding})
+                # The API does not promise the input order
+                data.reverse()
+                self._send(200, {
+                    "object": "list", "data": data, "model": body["model"],
+                    "usage": {"prompt_tokens": 1, "total_tokens": 1},
+                })
+
+            def _send(self, status, payload, headers=None):
+                raw = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class OpenAIEmbedderTest(unittest.TestCase):
+    def make_embedder(self, respond=None, **kwargs) -> tuple[OpenAIEmbedder, StubEmbeddingsServer]:
+        server = StubEmbeddingsServer(respond)
+        self.addCleanup(server.close)
+        client = openai.OpenAI(api_key="test", base_url=server.base_url)
+        kwargs.setdefault("backoff_base", 0.001)
+        kwargs.setdefault("backoff_max", 0.01)
+        return OpenAIEmbedder(client, "test-embedding", **kwargs), server
+
+    def test_batches_keep_input_order(self):
+        embedder, server = self.make_embedder(max_batch_items=4, max_concurrency=2)
+        texts = [f"text {'x' * i}" for i in range(10)]
+
+        self.assertEqual(embedder.embed(texts), [fake_embedding(text) for text in texts])
+        self.assertEqual(sorted(len(request) for request in server.requests), [2, 4, 4])
+
+    def test_token_limit_splits_batches(self):
+        embedder, server = self.make_embedder(max_batch_items=100, max_batch_tokens=10)
+        texts = ["a" * 12, "b" * 12, "c" * 12]
+        embedder.embed(texts)
+        self.assertEqual(len(server.requests), 2)
+
+    def test_newlines_are_replaced(self):
+        embedder, server = self.make_embedder()
+        embedder.embed(["two\nlines"])
+        self.assertEqual(server.requests, [["two lines"]])
+
+    def test_rate_limit_is_retried_after_retry_after(self):
+        embedder, server = self.make_embedder(
+            lambda texts, attempt: (429, {"Retry-After": "0"}) if attempt < 2 else None,
+            backoff_base=60.0, backoff_max=60.0,
+        )
+        # backoff_base would wait a minute, so finishing means the Retry-After header was used
+        self.assertEqual(embedder.embed(["a", "b"]), [fake_embedding("a"), fake_embedding("b")])
+        self.assertEqual(len(server.requests), 3)
+
+    def test_server_errors_are_retried_with_backoff(self):
+        embedder, server = self.make_embedder(lambda texts, attempt: (503, {}) if attempt < 3 else None)
+        self.assertEqual(embedder.embed(["a"]), [fake_embedding("a")])
+        self.assertEqual(len(server.requests), 4)
+
+    def test_client_errors_are_not_retried(self):
+        embedder, server = self.make_embedder(lambda texts, attempt: (400, {}), max_requeues=0)
+        with self.assertRaises(EmbeddingError) as caught:
+            embedder.embed(["a"])
+        self.assertEqual(caught.exception.failed_indices, [0])
+        self.assertEqual(len(server.requests), 1)
+
+    def test_failing_batch_is_split_and_requeued(self):
+        # The text "bad" is rejected, the others only fail while they share a request with it
+        embedder, server = self.make_embedder(
+            lambda texts, attempt: (400, {}) if "bad" in texts else None,
+            max_batch_items=8, max_requeues=3,
+        )
+        texts = ["one", "two", "bad", "four", "five"]
+        with self.assertRaises(EmbeddingError) as caught:
+            embedder.embed(texts)
+
+        error = caught.exception
+        self.assertEqual(error.failed_indices, [2])
+        self.assertIsNone(error.embeddings[2])
+        for i in (0, 1, 3, 4):
+            self.assertEqual(error.embeddings[i], fake_embedding(texts[i]))
+        self.assertIn(["bad"], server.requests)
+
+    def test_batch_recovers_after_requeue(self):
+        # Requests with more than one text fail until the retries run out, so the batch is split until it succeeds
+        embedder, server = self.make_embedder(
+            lambda texts, attempt: (500, {}) if len(texts) > 1 else None,
+            max_retries=1, max_batch_items=4,
+        )
+        texts = ["a", "b", "c", "d"]
+        self.assertEqual(embedder.embed(texts), [fake_embedding(text) for text in texts])
+        self.assertEqual(server.requests[:2], [texts, texts])
+
+    def test_empty_input_sends_nothing(self):
+        embedder, server = self.make_embedder()
+        self.assertEqual(embedder.embed([]), [])
+        self.assertEqual(server.requests, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
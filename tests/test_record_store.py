@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from vector_store.records import RecordStore
+
+
+class RecordStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "records.sqlite3")
+        self.store = RecordStore(self.path)
+        self.addCleanup(self.store.close)
+        self.labels, replaced = self.store.upsert(
+            ["a", "b", "c"], ["doc a", "doc b", "doc c"],
+            [{"source": "x.txt"}, {"source": "y.txt"}, {"source": "x.txt"}]
+        )
+        self.assertEqual(replaced, [])
+
+    def test_upsert_replaces_with_new_labels(self):
+        labels, replaced = self.store.upsert(["b", "d"], ["doc b2", "doc d"], [{}, {}])
+        self.assertEqual(replaced, [self.labels[1]])
+        # Labels are never reused, so stale vectors of the replaced record can't match the new one
+        self.assertEqual(labels, [3, 4])
+        self.assertEqual(self.store.count(), 4)
+        self.assertEqual(self.store.get(ids=["b"])["documents"], ["doc b2"])
+        self.assertNotIn(self.labels[1], self.store.lookup(self.labels))
+
+    def test_labels_survive_reopening(self):
+        self.store.close()
+        self.store = RecordStore(self.path)
+        self.assertEqual(self.store.next_label(), 3)
+        self.assertEqual(self.store.all_labels(), self.labels)
+
+    def test_delete_by_id_and_filter(self):
+        self.assertEqual(self.store.delete(ids=["b", "missing"]), [self.labels[1]])
+        self.assertEqual(sorted(self.store.delete(where={"source": "x.txt"})), [self.labels[0], self.labels[2]])
+        self.assertEqual(self.store.count(), 0)
+
+    def test_lookup(self):
+        found = self.store.lookup([self.labels[2], 99])
+        self.assertEqual(found, {self.labels[2]: ("c", "doc c", {"source": "x.txt"})})
+
+    def test_get_keeps_requested_order(self):
+        result = self.store.get(ids=["c", "missing", "a"])
+        self.assertEqual(result["ids"], ["c", "a"])
+        self.assertEqual(result["metadatas"], [{"source": "x.txt"}, {"source": "x.txt"}])
+
+    def test_get_by_filter_with_paging(self):
+        self.assertEqual(self.store.get(where={"source": "x.txt"})["ids"], ["a", "c"])
+        self.assertEqual(self.store.get(limit=2, offset=1)["ids"], ["b", "c"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from unittest import mock
+
+from retrieval import rerank
+from retrieval.rerank import Reranker
+
+
+class FakeClock:
+    """A perf_counter the fake model advances, so budget decisions don't depend on the machine's speed."""
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the number of query words in the document and takes batch_seconds per call."""
+    clock = None
+    batch_seconds = 0.0
+
+    def __init__(self, model_name, max_length=512) -> None:
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.batches.append(len(pairs))
+        self.clock.now += self.batch_seconds
+        return [len(set(query.split()) & set(document.split())) for query, document in pairs]
+
+
+def make_result(documents: list[str]) -> dict:
+    return {
+        "ids": [[f"doc_{i}" for i in range(len(documents))]],
+        "documents": [documents],
+        "metadatas": [[{"chunk_id": i} for i in range(len(documents))]],
+        "distances": [[0.1 * i for i in range(len(documents))]],
+    }
+
+
+class RerankerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        FakeCrossEncoder.clock = self.clock
+        FakeCrossEncoder.batch_seconds = 0.0
+        patches = [
+            mock.patch.object(rerank, "CrossEncoder", FakeCrossEncoder),
+            mock.patch.object(rerank.time, "perf_counter", self.clock),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_reorders_by_score_and_keeps_all_keys(self):
+        reranker = Reranker("fake", batch_size=2, time_budget=None)
+        result = make_result(["nothing here", "red apple pie", "apple", "red apple"])
+        reranked = reranker.rerank("red apple pie", result, n_results=3)
+
+        self.assertEqual(reranked["ids"], [["doc_1", "doc_3", "doc_2"]])
+        self.assertEqual(reranked["documents"], [["red apple pie", "red apple", "apple"]])
+        self.assertEqual(reranked["metadatas"], [[{"chunk_id": 1}, {"chunk_id": 3}, {"chunk_id": 2}]])
+        self.assertEqual(reranked["distances"], [[result["distances"][0][i] for i in (1, 3, 2)]])
+        self.assertEqual(reranked["rerank_scores"], [[3.0, 2.0, 1.0]])
+        self.assertEqual(reranker.model.batches, [2, 2])
+
+    def test_falls_back_to_retrieval_order_when_budget_runs_out(self):
+        FakeCrossEncoder.batch_seconds = 0.3
+        reranker = Reranker("fake", batch_size=2, time_budget=0.5)
+        result = make_result(["a", "b c", "c", "b", "c b a", "x"])
+        reranked = reranker.rerank("a b c", result, n_results=2)
+
+        # The second batch would end at about 0.6s, so scoring stops after the first one
+        self.assertEqual(reranker.model.batches, [2])
+        self.assertEqual(reranked["ids"], [["doc_0", "doc_1"]])
+        self.assertNotIn("rerank_scores", reranked)
+        self.assertEqual((reranker.fallbacks, reranker.overruns), (1, 0))
+
+    def test_overrun_of_last_batch_keeps_scores(self):
+        FakeCrossEncoder.batch_seconds = 0.2
+        reranker = Reranker("fake", batch_size=2, time_budget=0.5)
+        # The first batch predicts the second fits (0.4s), but the second actually takes longer
+        original_predict = FakeCrossEncoder.predict
+
+        def slower_second_batch(model, pairs, **kwargs):
+            if model.batches:
+                self.clock.now += 0.2
+            return original_predict(model, pairs, **kwargs)
+
+        with mock.patch.object(FakeCrossEncoder, "predict", slower_second_batch):
+            reranked = reranker.rerank("a b", make_result(["a", "x", "a b", "b"]), n_results=4)
+
+        self.assertEqual(reranked["ids"], [["doc_2", "doc_0", "doc_3", "doc_1"]])
+        self.assertEqual(reranked["rerank_scores"], [[2.0, 1.0, 1.0, 0.0]])
+        self.assertEqual((reranker.fallbacks, reranker.overruns), (0, 1))
+
+    def test_single_batch_is_never_cut(self):
+        FakeCrossEncoder.batch_seconds = 2.0
+        reranker = Reranker("fake", batch_size=8, time_budget=0.5)
+        self.assertEqual(reranker.score("a", ["a", "b", "a a"]), [1.0, 0.0, 1.0])
+        self.assertEqual(reranker.overruns, 1)
+
+    def test_no_budget_scores_everything(self):
+        FakeCrossEncoder.batch_seconds = 10.0
+        reranker = Reranker("fake", batch_size=1, time_budget=None)
+        self.assertEqual(len(reranker.score("a", ["a"] * 5)), 5)
+        self.assertEqual((reranker.fallbacks, reranker.overruns), (0, 0))
+
+    def test_empty_result_is_returned_unchanged(self):
+        reranker = Reranker("fake")
+        empty = {"ids": [[]], "documents": [[]], "metadatas": [[]]}
+        self.assertIs(reranker.rerank("a", empty, n_results=3), empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
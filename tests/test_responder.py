@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import unittest
+from types import SimpleNamespace
+
+from llm import main
+from llm.main import Responder, client_host, model_is_checked
+
+
+class FakeAsyncClient:
+    """Stands in for ollama.AsyncClient: lists the given models and counts the calls."""
+    def __init__(self, host: str, models: list[str]) -> None:
+        self._client = SimpleNamespace(base_url=host)
+        self.models = models
+        self.list_calls = 0
+        self.pulled = []
+
+    async def list(self):
+        self.list_calls += 1
+        # Let the other tasks reach the check while this one waits for the server
+        await asyncio.sleep(0.01)
+        return {'models': [{'model': name} for name in self.models]}
+
+    async def pull(self, model):
+        self.pulled.append(model)
+        await asyncio.sleep(0.01)
+
+
+class FakeClient:
+    """Stands in for ollama.Client."""
+    def __init__(self, host: str, models: list[str]) -> None:
+        self._client = SimpleNamespace(base_url=host)
+        self.models = models
+        self.list_calls = 0
+        self.lock = threading.Lock()
+
+    def list(self):
+        with self.lock:
+            self.list_calls += 1
+        return {'models': [{'model': name} for name in self.models]}
+
+
+def make_responder(client=None, async_client=None) -> Responder:
+    return Responder(
+        model="test-model", prompt_template="{data} {query}",
+        client=client or FakeClient("http://sync:11434", ["test-model"]), async_client=async_client
+    )
+
+
+class ModelCheckTest(unittest.TestCase):
+    def setUp(self):
+        main._checked_models.clear()
+
+    def tearDown(self):
+        main._checked_models.clear()
+
+    def test_concurrent_async_checks_list_once(self):
+        client = FakeAsyncClient("http://a:11434", ["test-model"])
+        responder = make_responder(async_client=client)
+
+        async def run():
+            await asyncio.gather(*(responder.aprepare() for _ in range(10)))
+
+        asyncio.run(run())
+        self.assertEqual(client.list_calls, 1)
+        self.assertTrue(model_is_checked("http://a:11434", "test-model"))
+
+    def test_concurrent_async_pull_once(self):
+        client = FakeAsyncClient("http://a:11434", [])
+        responder = make_responder(async_client=client)
+
+        async def run():
+            await asyncio.gather(*(responder.aprepare() for _ in range(5)))
+
+        asyncio.run(run())
+        self.assertEqual(client.pulled, ["test-model"])
+
+    def test_check_is_per_host(self):
+        first = FakeAsyncClient("http://a:11434", ["test-model"])
+        second = FakeAsyncClient("http://b:11434", ["test-model"])
+        responder = make_responder()
+
+        asyncio.run(responder.aprepare(first))
+        asyncio.run(responder.aprepare(first))
+        asyncio.run(responder.aprepare(second))
+        self.assertEqual(first.list_calls, 1)
+        self.assertEqual(second.list_calls, 1)
+        self.assertFalse(model_is_checked("http://c:11434", "test-model"))
+
+    def test_async_check_fails_for_unknown_model(self):
+        class MissingModelClient(FakeAsyncClient):
+            async def pull(self, model):
+                raise main.ollama.ResponseError("model not found")
+
+        responder = make_responder(async_client=MissingModelClient("http://a:11434", []))
+        with self.assertRaises(ValueError):
+            asyncio.run(responder.aprepare())
+        self.assertFalse(model_is_checked("http://a:11434", "test-model"))
+
+    def test_concurrent_sync_checks_list_once(self):
+        client = FakeClient("http://s:11434", ["test-model"])
+        responder = make_responder(client=client)
+        threads = [threading.Thread(target=responder.prepare) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(client.list_calls, 1)
+
+    def test_client_host(self):
+        self.assertEqual(client_host(FakeClient("http://h:1", [])), "http://h:1")
+        self.assertEqual(client_host(object()), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
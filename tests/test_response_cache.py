@@ -0,0 +1,107 @@
+import unittest
+
+from llm.response_cache import SemanticResponseCache
+
+
+CHUNKS = ["a.txt_0", "b.txt_3"]
+
+
+def store(cache, embedding, response, chunk_ids=CHUNKS, model="m", version=1):
+    cache.store(embedding, chunk_ids, model, version, response, [{"id": chunk_id} for chunk_id in chunk_ids])
+
+
+def lookup(cache, embedding, chunk_ids=CHUNKS, model="m", version=1):
+    entry = cache.lookup(embedding, chunk_ids, model, version)
+    return entry["response"] if entry else None
+
+
+class SemanticResponseCacheTest(unittest.TestCase):
+    def test_hit_and_miss_by_similarity(self):
+        cache = SemanticResponseCache(threshold=0.95)
+        store(cache, [1.0, 0.0], "answer")
+
+        # Scale doesn't matter, only the direction
+        self.assertEqual(lookup(cache, [2.0, 0.1]), "answer")
+        self.assertIsNone(lookup(cache, [1.0, 1.0]))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_best_match_wins(self):
+        cache = SemanticResponseCache(threshold=0.9)
+        store(cache, [1.0, 0.2], "close")
+        store(cache, [1.0, 0.0], "exact")
+        self.assertEqual(lookup(cache, [1.0, 0.0]), "exact")
+        self.assertEqual(lookup(cache, [1.0, 0.19]), "close")
+
+    def test_key_includes_chunks_and_model(self):
+        cache = SemanticResponseCache()
+        store(cache, [1.0, 0.0], "answer")
+        self.assertIsNone(lookup(cache, [1.0, 0.0], chunk_ids=CHUNKS[::-1]))
+        self.assertIsNone(lookup(cache, [1.0, 0.0], chunk_ids=CHUNKS[:1]))
+        self.assertIsNone(lookup(cache, [1.0, 0.0], model="other"))
+        self.assertEqual(lookup(cache, [1.0, 0.0]), "answer")
+
+    def test_version_change_invalidates(self):
+        cache = SemanticResponseCache()
+        store(cache, [1.0, 0.0], "old", version=1)
+        self.assertIsNone(lookup(cache, [1.0, 0.0], version=2))
+        # The entries are gone, not just hidden
+        self.assertIsNone(lookup(cache, [1.0, 0.0], version=1))
+
+    def test_entries_per_key_are_capped(self):
+        cache = SemanticResponseCache(threshold=0.999, max_entries_per_key=2)
+        store(cache, [1.0, 0.0, 0.0], "first")
+        store(cache, [0.0, 1.0, 0.0], "second")
+        store(cache, [0.0, 0.0, 1.0], "third")
+
+        self.assertIsNone(lookup(cache, [1.0, 0.0, 0.0]))
+        self.assertEqual(lookup(cache, [0.0, 1.0, 0.0]), "second")
+        self.assertEqual(lookup(cache, [0.0, 0.0, 1.0]), "third")
+        self.assertEqual(cache._size, 2)
+
+    def test_hit_refreshes_entry_within_key(self):
+        cache = SemanticResponseCache(threshold=0.999, max_entries_per_key=2)
+        store(cache, [1.0, 0.0, 0.0], "first")
+        store(cache, [0.0, 1.0, 0.0], "second")
+        lookup(cache, [1.0, 0.0, 0.0])
+        store(cache, [0.0, 0.0, 1.0], "third")
+
+        self.assertEqual(lookup(cache, [1.0, 0.0, 0.0]), "first")
+        self.assertIsNone(lookup(cache, [0.0, 1.0, 0.0]))
+
+    def test_eviction_removes_single_entries_of_oldest_key(self):
+        cache = SemanticResponseCache(threshold=0.999, max_size=3)
+        store(cache, [1.0, 0.0], "old 1", chunk_ids=["x"])
+        store(cache, [0.0, 1.0], "old 2", chunk_ids=["x"])
+        store(cache, [1.0, 0.0], "new", chunk_ids=["y"])
+        store(cache, [0.0, 1.0], "newer", chunk_ids=["z"])
+
+        # Only the oldest entry of the oldest key is evicted, its other entry stays
+        self.assertIsNone(lookup(cache, [1.0, 0.0], chunk_ids=["x"]))
+        self.assertEqual(lookup(cache, [0.0, 1.0], chunk_ids=["x"]), "old 2")
+        self.assertEqual(lookup(cache, [1.0, 0.0], chunk_ids=["y"]), "new")
+        self.assertEqual(lookup(cache, [0.0, 1.0], chunk_ids=["z"]), "newer")
+        self.assertEqual(cache._size, 3)
+
+    def test_lookup_marks_key_recently_used(self):
+        cache = SemanticResponseCache(threshold=0.999, max_size=2)
+        store(cache, [1.0, 0.0], "x", chunk_ids=["x"])
+        store(cache, [1.0, 0.0], "y", chunk_ids=["y"])
+        lookup(cache, [1.0, 0.0], chunk_ids=["x"])
+        store(cache, [1.0, 0.0], "z", chunk_ids=["z"])
+
+        self.assertEqual(lookup(cache, [1.0, 0.0], chunk_ids=["x"]), "x")
+        self.assertIsNone(lookup(cache, [1.0, 0.0], chunk_ids=["y"]))
+
+    def test_disabled_and_clear(self):
+        disabled = SemanticResponseCache(max_size=0)
+        store(disabled, [1.0, 0.0], "answer")
+        self.assertIsNone(lookup(disabled, [1.0, 0.0]))
+
+        cache = SemanticResponseCache()
+        store(cache, [1.0, 0.0], "answer")
+        cache.clear()
+        self.assertIsNone(lookup(cache, [1.0, 0.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
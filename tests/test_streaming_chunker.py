@@ -0,0 +1,76 @@
+import os
+import random
+import tempfile
+import unittest
+
+from embedding.utils import (
+    chunk_sentences,
+    iter_chunks,
+    iter_sentences,
+    iter_text_file,
+    split_text_into_sentences,
+)
+
+
+def make_text(sentences: int, seed: int = 0) -> str:
+    """Returns plain text with sentences of varied length, punctuation and spacing."""
+    rng = random.Random(seed)
+    words = ["retrieval", "vector", "index", "chunk", "model", "query", "answer", "document", "server", "cache"]
+    parts = []
+    for i in range(sentences):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(1, 25)))
+        # Sentences start capitalized and end with a word, so the tokenizer's boundaries are unambiguous
+        parts.append(f"Part{i} {sentence}{rng.choice(['.', '.', '?', '!'])}")
+        parts.append(rng.choice([" ", " ", "  ", "\n", "\n\n"]))
+    return "".join(parts)
+
+
+class StreamingChunkerTest(unittest.TestCase):
+    """The streaming readers must give the same sentences and chunks as splitting the whole text at once."""
+
+    def setUp(self):
+        self.text = make_text(300)
+        file = tempfile.NamedTemporaryFile('w', suffix='.txt', encoding='utf-8', delete=False)
+        with file:
+            file.write(self.text)
+        self.path = file.name
+        self.addCleanup(os.remove, self.path)
+
+    def test_sentences_match_across_block_boundaries(self):
+        expected = split_text_into_sentences(self.text, 'english')
+        # Blocks from a single character to the whole file, so boundaries fall inside words, sentences and whitespace
+        for block_size in (1, 2, 7, 64, 97, 1000, len(self.text) + 1):
+            with self.subTest(block_size=block_size):
+                sentences = list(iter_sentences(iter_text_file(self.path, block_size=block_size), 'english'))
+                self.assertEqual(sentences, expected)
+
+    def test_chunks_match_across_block_boundaries(self):
+        expected = chunk_sentences(split_text_into_sentences(self.text, 'english'), 10, 3)
+        for block_size in (5, 128, 4096):
+            with self.subTest(block_size=block_size):
+                sentences = iter_sentences(iter_text_file(self.path, block_size=block_size), 'english')
+                self.assertEqual(list(iter_chunks(sentences, 10, 3)), expected)
+
+    def test_pages_joined_with_separator(self):
+        pages = [make_text(20, seed=page) for page in range(5)]
+        expected = split_text_into_sentences("\n".join(pages), 'english')
+        self.assertEqual(list(iter_sentences(iter(pages), 'english', separator="\n")), expected)
+
+    def test_iter_chunks_matches_chunk_sentences(self):
+        for count in range(30):
+            sentences = [f"Sentence {i}." for i in range(count)]
+            for chunk_size in range(1, 7):
+                for overlap_size in range(chunk_size):
+                    with self.subTest(count=count, chunk_size=chunk_size, overlap_size=overlap_size):
+                        self.assertEqual(
+                            list(iter_chunks(iter(sentences), chunk_size, overlap_size)),
+                            chunk_sentences(sentences, chunk_size, overlap_size)
+                        )
+
+    def test_iter_chunks_rejects_overlap_not_smaller_than_chunk(self):
+        with self.assertRaises(ValueError):
+            list(iter_chunks(iter(["A."]), 3, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
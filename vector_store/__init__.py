@@ -0,0 +1,66 @@
+from vector_store.base import VectorStore
+
+
+# Accepted values of vector_db in config/embedding_config.py
+VECTOR_DBS = ("chromaDB", "FAISS", "numpy")
+
+
+def get_vector_store(vector_db: str, db_path: str, collection_name: str, create: bool = False) -> VectorStore:
+    """
+    Opens a collection in the configured vector database.
+
+    Backend specific options (FAISS index type, NumPy storage dtype, ...) are read from config/embedding_config.py.
+    Backends are imported lazily, so only the selected one has to be installed.
+
+    Args:
+        vector_db: The vector database, one of VECTOR_DBS.
+        db_path: The directory the vector database is stored in.
+        collection_name: Name of the collection.
+        create: Create the collection if it does not exist. Otherwise a missing collection is an error.
+
+    Returns:
+        VectorStore: The opened collection.
+    """
+    if vector_db == "chromaDB":
+        from vector_store.chroma_store import ChromaVectorStore
+        return ChromaVectorStore(db_path, collection_name, create=create)
+
+    if vector_db == "FAISS":
+        from vector_store.faiss_store import FaissVectorStore
+        from config.embedding_config import (
+            faiss_index_type,
+            faiss_metric,
+            faiss_nlist,
+            faiss_nprobe,
+            faiss_hnsw_m,
+            faiss_ef_construction,
+            faiss_ef_search,
+            faiss_quantization
+        )
+        return FaissVectorStore(
+            db_path,
+            collection_name,
+            create=create,
+            index_type=faiss_index_type,
+            metric=faiss_metric,
+            nlist=faiss_nlist,
+            nprobe=faiss_nprobe,
+            hnsw_m=faiss_hnsw_m,
+            ef_construction=faiss_ef_construction,
+            ef_search=faiss_ef_search,
+            quantization=faiss_quantization
+        )
+
+    if vector_db == "numpy":
+        from vector_store.numpy_store import NumpyVectorStore
+        from config.embedding_config import numpy_dtype, numpy_rescore, numpy_rescore_factor
+        return NumpyVectorStore(
+            db_path,
+            collection_name,
+            create=create,
+            dtype=numpy_dtype,
+            rescore=numpy_rescore,
+            rescore_factor=numpy_rescore_factor
+        )
+
+    raise ValueError(f"vector_db must be one of {VECTOR_DBS}, got {vector_db!r}")
@@ -0,0 +1,52 @@
+from abc import ABC, abstractmethod
+
+
+class VectorStore(ABC):
+    """
+    The interface the ingestion pipeline and the retrievers use to talk to a vector database.
+
+    Results follow ChromaDB's layout, so code that reads them does not depend on the backend:
+    query() returns {'ids': [[...]], 'documents': [[...]], 'metadatas': [[...]], 'distances': [[...]]}
+    with one inner list per query embedding, ordered from the closest match to the farthest.
+    """
+
+    # The largest number of records accepted by a single upsert call
+    max_batch_size: int = 5000
+
+    @abstractmethod
+    def upsert(self, ids: list[str], embeddings: list[list[float]], documents: list[str], metadatas: list[dict]) -> None:
+        """Adds records, replacing existing records with the same ID."""
+
+    @abstractmethod
+    def delete(self, ids: list[str] | None = None, where: dict | None = None) -> None:
+        """
+        Deletes records by ID, or all records whose metadata matches every key/value pair in where.
+        """
+
+    @abstractmethod
+    def query(self, query_embeddings: list[list[float]], n_results: int) -> dict:
+        """Returns the n_results nearest records for each query embedding."""
+
+    @abstractmethod
+    def get(self, ids: list[str] | None = None, where: dict | None = None, limit: int | None = None, offset: int | None = None) -> dict:
+        """
+        Returns records by ID or metadata filter as {'ids': [...], 'documents': [...], 'metadatas': [...]}.
+        Records requested by ID are returned in the requested order; unknown IDs are skipped.
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        """Returns the number of records."""
+
+    def persist(self) -> None:
+        """Makes pending writes durable. Backends that write through on every call don't need to do anything."""
+
+    def checkpoint(self) -> None:
+        """
+        Makes pending writes durable during a long ingestion run. Backends that can save the new writes
+        without rewriting the whole collection override it; the default is persist().
+        """
+        self.persist()
+
+    def close(self) -> None:
+        """Releases the resources held by the store."""
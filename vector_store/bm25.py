@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import math
+import heapq
+import sqlite3
+from collections import Counter
+
+
+# Word characters only, so "user_id" stays one term while "user-id" becomes "user" and "id"
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits text into lowercase terms."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    A lexical inverted index with BM25 scoring, kept next to a vector collection for hybrid search.
+
+    Dense embeddings are weak at exact identifiers, codes and rare terms; BM25 ranks those well.
+    The index is a SQLite file: each term is stored once with its document frequency, and postings are
+    (term id, document label, term frequency) rows in a WITHOUT ROWID table, clustered by term so a
+    query reads one contiguous range per query term. k1 and b are applied at query time, so they can be
+    tuned without rebuilding.
+    """
+    def __init__(self, db_path: str, collection_name: str, create: bool = False, k1: float = 1.2, b: float = 0.75, max_df: float = 0.5) -> None:
+        """
+        Args:
+            db_path: The vector DB directory. The index is stored in db_path/bm25/collection_name.
+            collection_name: Name of the collection.
+            create: Create the index if it does not exist. Otherwise a missing index is an error.
+            k1: Term frequency saturation. Higher values let repeated terms count for more.
+            b: Document length normalization, from 0 (none) to 1 (full).
+            max_df: Terms in more than this fraction of the documents only add to the scores of documents
+                found by rarer query terms, so common words don't make a query scan most of the index.
+        """
+        directory = os.path.join(db_path, "bm25", collection_name)
+        path = os.path.join(directory, "index.sqlite3")
+        if not os.path.exists(path):
+            if not create:
+                raise ValueError(f"Lexical index for {collection_name} does not exist in {directory}")
+            os.makedirs(directory, exist_ok=True)
+
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " label INTEGER PRIMARY KEY,"
+            " id TEXT NOT NULL UNIQUE,"
+            " length INTEGER NOT NULL,"
+            " metadata TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS terms ("
+            " term_id INTEGER PRIMARY KEY,"
+            " term TEXT NOT NULL UNIQUE,"
+            " df INTEGER NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term_id INTEGER NOT NULL,"
+            " label INTEGER NOT NULL,"
+            " tf INTEGER NOT NULL,"
+            " PRIMARY KEY (term_id, label)) WITHOUT ROWID"
+        )
+        # Needed to find the postings of a document when it is deleted
+        self.conn.execute("CREATE INDEX IF NOT EXISTS postings_label ON postings (label)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.commit()
+
+    def _meta(self, key: str) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_meta(self, key: str, value: int) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def add(self, ids: list[str], documents: list[str], metadatas: list[dict]) -> None:
+        """Indexes documents, replacing existing documents with the same ID."""
+        if not ids:
+            return
+        term_counts = [Counter(tokenize(document or "")) for document in documents]
+        new_terms = sorted({term for counts in term_counts for term in counts})
+
+        with self.conn:
+            self._delete_labels(self._labels(ids))
+
+            start = self._meta("next_label")
+            labels = list(range(start, start + len(ids)))
+            self.conn.executemany(
+                "INSERT INTO docs (label, id, length, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (label, doc_id, sum(counts.values()), json.dumps(metadata or {}))
+                    for label, doc_id, counts, metadata in zip(labels, ids, term_counts, metadatas)
+                ]
+            )
+
+            self.conn.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, 0) ON CONFLICT (term) DO NOTHING",
+                [(term,) for term in new_terms]
+            )
+            term_ids = {}
+            for offset in range(0, len(new_terms), 500):
+                part = new_terms[offset:offset + 500]
+                term_ids.update(self.conn.execute(
+                    f"SELECT term, term_id FROM terms WHERE term IN ({','.join('?' * len(part))})", part
+                ))
+
+            self.conn.executemany(
+                "INSERT INTO postings (term_id, label, tf) VALUES (?, ?, ?)",
+                [
+                    (term_ids[term], label, tf)
+                    for label, counts in zip(labels, term_counts)
+                    for term, tf in counts.items()
+                ]
+            )
+            df = Counter(term for counts in term_counts for term in counts)
+            self.conn.executemany(
+                "UPDATE terms SET df = df + ? WHERE term_id = ?",
+                [(count, term_ids[term]) for term, count in df.items()]
+            )
+
+            self._set_meta("next_label", start + len(ids))
+            self._set_meta("doc_count", self._meta("doc_count") + len(ids))
+            self._set_meta("total_length", self._meta("total_length") + sum(sum(counts.values()) for counts in term_counts))
+
+    def delete(self, ids: list[str] | None = None, where: dict | None = None) -> None:
+        """Removes documents by ID, or all documents whose metadata matches every key/value pair in where."""
+        labels = []
+        if ids is not None:
+            labels.extend(self._labels(ids))
+        if where:
+            clause = " AND ".join("json_extract(metadata, ?) = ?" for _ in where)
+            params = [param for key, value in where.items() for param in (f"$.{key}", value)]
+            labels.extend(row[0] for row in self.conn.execute(f"SELECT label FROM docs WHERE {clause}", params))
+        with self.conn:
+            self._delete_labels(labels)
+
+    def _labels(self, ids: list[str]) -> list[int]:
+        labels = []
+        for offset in range(0, len(ids), 500):
+            part = ids[offset:offset + 500]
+            labels.extend(
+                row[0] for row in self.conn.execute(
+                    f"SELECT label FROM docs WHERE id IN ({','.join('?' * len(part))})", part
+                )
+            )
+        return labels
+
+    def _delete_labels(self, labels: list[int]) -> None:
+        """Removes documents and their postings. Runs inside the caller's transaction."""
+        for offset in range(0, len(labels), 500):
+            part = labels[offset:offset + 500]
+            placeholders = ','.join('?' * len(part))
+            df = self.conn.execute(
+                f"SELECT term_id, COUNT(*) FROM postings WHERE label IN ({placeholders}) GROUP BY term_id", part
+            ).fetchall()
+            self.conn.executemany("UPDATE terms SET df = df - ? WHERE term_id = ?", [(count, term_id) for term_id, count in df])
+            self.conn.execute(f"DELETE FROM postings WHERE label IN ({placeholders})", part)
+            removed_docs, removed_length = self.conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE label IN ({placeholders})", part
+            ).fetchone()
+            self.conn.execute(f"DELETE FROM docs WHERE label IN ({placeholders})", part)
+            self._set_meta("doc_count", self._meta("doc_count") - removed_docs)
+            self._set_meta("total_length", self._meta("total_length") - removed_length)
+        self.conn.execute("DELETE FROM terms WHERE df <= 0")
+
+    def search(self, query: str, n_results: int) -> list[tuple[str, float]]:
+        """
+        Ranks the documents containing any of the query terms.
+
+        Terms are read from the rarest to the most common with max-score pruning: once no document outside
+        the current candidates can reach the top n_results with the remaining terms, those terms are only
+        looked up for the candidates instead of scanning their whole posting lists. Terms in more than
+        max_df of the documents never add candidates, unless the query has no rarer term.
+
+        Returns:
+            list[tuple[str, float]]: Up to n_results (id, BM25 score) pairs, best first.
+        """
+        terms = set(tokenize(query))
+        doc_count = self._meta("doc_count")
+        if not terms or doc_count == 0 or n_results <= 0:
+            return []
+        average_length = self._meta("total_length") / doc_count or 1.0
+
+        terms = list(terms)
+        found = self.conn.execute(
+            f"SELECT term_id, df FROM terms WHERE term IN ({','.join('?' * len(terms))})", terms
+        ).fetchall()
+        found.sort(key=lambda row: row[1])
+        idfs = [math.log(1.0 + (doc_count - df + 0.5) / (df + 0.5)) for _, df in found]
+        # tf / (tf + norm) < 1, so a term adds less than idf * (k1 + 1) to any document
+        remaining = [0.0] * (len(found) + 1)
+        for position in range(len(found) - 1, -1, -1):
+            remaining[position] = remaining[position + 1] + idfs[position] * (self.k1 + 1.0)
+
+        scores = Counter()
+        for position, ((term_id, df), idf) in enumerate(zip(found, idfs)):
+            threshold = heapq.nlargest(n_results, scores.values())[-1] if len(scores) >= n_results else 0.0
+            if position == 0 or (threshold < remaining[position] and df <= self.max_df * doc_count):
+                postings = self.conn.execute(
+                    "SELECT p.label, p.tf, d.length FROM postings p JOIN docs d ON d.label = p.label WHERE p.term_id = ?",
+                    (term_id,)
+                ).fetchall()
+            else:
+                # Only candidates that can still reach the top n_results are worth scoring
+                candidates = [label for label, score in scores.items() if score + remaining[position] >= threshold]
+                postings = []
+                for offset in range(0, len(candidates), 500):
+                    part = candidates[offset:offset + 500]
+                    postings.extend(self.conn.execute(
+                        "SELECT p.label, p.tf, d.length FROM postings p JOIN docs d ON d.label = p.label"
+                        f" WHERE p.term_id = ? AND p.label IN ({','.join('?' * len(part))})",
+                        (term_id, *part)
+                    ))
+            for label, tf, length in postings:
+                norm = self.k1 * (1.0 - self.b + self.b * length / average_length)
+                scores[label] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+        best = heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+        if not best:
+            return []
+        labels = [label for label, _ in best]
+        ids = dict(self.conn.execute(
+            f"SELECT label, id FROM docs WHERE label IN ({','.join('?' * len(labels))})", labels
+        ))
+        return [(ids[label], score) for label, score in best]
+
+    def count(self) -> int:
+        return self._meta("doc_count")
+
+    def close(self) -> None:
+        self.conn.close()
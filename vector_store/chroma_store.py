@@ -0,0 +1,51 @@
+import chromadb
+
+from vector_store.base import VectorStore
+
+
+class ChromaVectorStore(VectorStore):
+    """
+    A vector store backed by a ChromaDB persistent collection.
+    """
+    def __init__(self, db_path: str, collection_name: str, create: bool = False) -> None:
+        """
+        Args:
+            db_path: Path to ChromaDB.
+            collection_name: Name of the collection.
+            create: Create the collection if it does not exist. Otherwise a missing collection is an error.
+        """
+        self.client = chromadb.PersistentClient(path=db_path)
+        if create:
+            self.collection = self.client.get_or_create_collection(collection_name)
+        else:
+            self.collection = self.client.get_collection(name=collection_name)
+
+        try:
+            self.max_batch_size = self.client.get_max_batch_size()
+        except Exception:
+            pass
+
+    def upsert(self, ids, embeddings, documents, metadatas) -> None:
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def delete(self, ids=None, where=None) -> None:
+        self.collection.delete(ids=ids, where=where)
+
+    def query(self, query_embeddings, n_results) -> dict:
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results)
+
+    def get(self, ids=None, where=None, limit=None, offset=None) -> dict:
+        results = self.collection.get(ids=ids, where=where, limit=limit, offset=offset, include=["documents", "metadatas"])
+        if ids is not None:
+            # Chroma does not guarantee the requested order
+            position = {record_id: i for i, record_id in enumerate(results["ids"])}
+            order = [position[record_id] for record_id in ids if record_id in position]
+            results = {
+                "ids": [results["ids"][i] for i in order],
+                "documents": [results["documents"][i] for i in order],
+                "metadatas": [results["metadatas"][i] for i in order],
+            }
+        return results
+
+    def count(self) -> int:
+        return self.collection.count()
@@ -0,0 +1,332 @@
+import os
+import json
+
+import numpy as np
+import faiss
+
+from vector_store.base import VectorStore
+from vector_store.records import RecordStore
+
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+METRICS = ("ip", "l2")
+QUANTIZATIONS = (None, "fp16", "int8")
+
+# Vectors collected to train an int8 scalar quantizer on flat and hnsw indexes
+SQ_TRAINING_ROWS = 10000
+
+# persist() rebuilds an hnsw index when more than this fraction of its vectors belong to deleted or replaced records
+STALE_REBUILD_FRACTION = 0.2
+
+# Candidates searched per requested result. Raised for a query only when stale labels leave it short of results
+OVERFETCH_FACTOR = 2
+
+
+class FaissVectorStore(VectorStore):
+    """
+    A vector store backed by a FAISS index, with documents and metadata kept in a SQLite side store.
+
+    Supported index types:
+        flat: exact search. Best recall, latency grows linearly with the collection.
+        ivf:  inverted file index. Trained on the first vectors written; searches nprobe of nlist clusters.
+        hnsw: graph index. Fast and accurate without training, but vectors cannot be removed from the graph,
+              so deleted and replaced records are only dropped from the side store and skipped at query time.
+              persist() rebuilds the graph from the live vectors once more than STALE_REBUILD_FRACTION are stale.
+
+    With quantization 'fp16' or 'int8' the index stores scalar quantized codes (half or a quarter of the
+    float32 size) instead of the vectors. The int8 ranges are trained on the first vectors written.
+
+    With metric 'ip' vectors are L2-normalized, so inner product equals cosine similarity and the
+    returned distance is 1 - cosine similarity. With metric 'l2' the distance is the squared L2 distance.
+    The index lives in memory and is written to disk by persist().
+    """
+    def __init__(
+        self,
+        db_path: str,
+        collection_name: str,
+        create: bool = False,
+        index_type: str = "hnsw",
+        metric: str = "ip",
+        nlist: int = 1024,
+        nprobe: int = 16,
+        hnsw_m: int = 32,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        quantization: str | None = None,
+    ) -> None:
+        """
+        Args:
+            db_path: The vector DB directory. The collection is stored in db_path/faiss/collection_name.
+            collection_name: Name of the collection.
+            create: Create the collection if it does not exist. Otherwise a missing collection is an error.
+            index_type: 'flat', 'ivf' or 'hnsw'. Only used when the collection is created.
+            metric: 'ip' (cosine) or 'l2'. Only used when the collection is created.
+            nlist: The number of IVF clusters. Only used when the collection is created.
+            nprobe: The number of IVF clusters searched per query.
+            hnsw_m: The number of neighbours per HNSW node. Only used when the collection is created.
+            ef_construction: The HNSW build-time search depth. Only used when the collection is created.
+            ef_search: The HNSW query-time search depth.
+            quantization: None, 'fp16' or 'int8' storage of the vectors in the index. Only used when the collection is created.
+        """
+        self.directory = os.path.join(db_path, "faiss", collection_name)
+        self.index_path = os.path.join(self.directory, "index.faiss")
+        self.config_path = os.path.join(self.directory, "config.json")
+
+        if not os.path.exists(self.config_path):
+            if not create:
+                raise ValueError(f"Collection {collection_name} does not exist in {self.directory}")
+            if index_type not in INDEX_TYPES:
+                raise ValueError(f"index_type must be one of {INDEX_TYPES}, got {index_type!r}")
+            if metric not in METRICS:
+                raise ValueError(f"metric must be one of {METRICS}, got {metric!r}")
+            if quantization not in QUANTIZATIONS:
+                raise ValueError(f"quantization must be one of {QUANTIZATIONS}, got {quantization!r}")
+            os.makedirs(self.directory, exist_ok=True)
+            self.config = {
+                "index_type": index_type,
+                "metric": metric,
+                "nlist": nlist,
+                "hnsw_m": hnsw_m,
+                "ef_construction": ef_construction,
+                "quantization": quantization,
+                "dimension": None,
+            }
+            self._write_config()
+        else:
+            with open(self.config_path, 'r', encoding='utf-8') as file:
+                self.config = json.load(file)
+
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.records = RecordStore(os.path.join(self.directory, "records.sqlite3"))
+
+        self.index = None
+        if os.path.exists(self.index_path):
+            self.index = faiss.read_index(self.index_path)
+            self._set_search_params()
+            if self.config["index_type"] == "ivf" and isinstance(self.index, faiss.IndexIDMap):
+                print(f"The IVF index of {collection_name} was written by an older version that loses track of "
+                      "labels when records are deleted or replaced. Re-create the collection to fix it.")
+        self._count = self.records.count()
+
+        # IVF vectors written before the index has enough data to be trained
+        self._pending_labels = []
+        self._pending_vectors = []
+
+    def _write_config(self) -> None:
+        with open(self.config_path, 'w', encoding='utf-8') as file:
+            json.dump(self.config, file, indent=1)
+
+    def _faiss_metric(self) -> int:
+        return faiss.METRIC_INNER_PRODUCT if self.config["metric"] == "ip" else faiss.METRIC_L2
+
+    def _build_index(self, dimension: int, nlist: int | None = None):
+        """
+        Creates an empty index of the configured type. Vectors are added with the record labels as IDs.
+
+        Flat and hnsw indexes number their vectors sequentially and are wrapped in an IndexIDMap2 for the labels.
+        IVF indexes store the IDs in their inverted lists themselves and are not wrapped: removing IDs from an
+        IndexIDMap2 compacts its ID map but not the internal IDs kept in the lists, so the two would go out of step.
+        """
+        index_type = self.config["index_type"]
+        metric = self._faiss_metric()
+        quantization = self.config.get("quantization")
+        qtype = {"fp16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}.get(quantization)
+        if index_type == "flat":
+            if qtype is not None:
+                base = faiss.IndexScalarQuantizer(dimension, qtype, metric)
+            else:
+                base = faiss.IndexFlatIP(dimension) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(dimension)
+        elif index_type == "ivf":
+            quantizer = faiss.IndexFlatIP(dimension) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(dimension)
+            if qtype is not None:
+                base = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist or self.config["nlist"], qtype, metric)
+            else:
+                base = faiss.IndexIVFFlat(quantizer, dimension, nlist or self.config["nlist"], metric)
+            return base
+        else:
+            if qtype is not None:
+                base = faiss.IndexHNSWSQ(dimension, qtype, self.config["hnsw_m"], metric)
+            else:
+                base = faiss.IndexHNSWFlat(dimension, self.config["hnsw_m"], metric)
+            base.hnsw.efConstruction = self.config["ef_construction"]
+        return faiss.IndexIDMap2(base)
+
+    def _base_index(self):
+        """Returns the index without its IndexIDMap2 wrapper, if it has one."""
+        if isinstance(self.index, faiss.IndexIDMap):
+            return faiss.downcast_index(self.index.index)
+        return faiss.downcast_index(self.index)
+
+    def _set_search_params(self) -> None:
+        base = self._base_index()
+        if isinstance(base, faiss.IndexIVF):
+            base.nprobe = self.nprobe
+        elif isinstance(base, faiss.IndexHNSW):
+            base.hnsw.efSearch = self.ef_search
+
+    def _prepare(self, embeddings) -> np.ndarray:
+        vectors = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        if self.config["metric"] == "ip":
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _is_trained(self) -> bool:
+        return self.index is not None and self.index.is_trained
+
+    def upsert(self, ids, embeddings, documents, metadatas) -> None:
+        if not ids:
+            return
+        vectors = self._prepare(embeddings)
+        if self.config["dimension"] is None:
+            self.config["dimension"] = int(vectors.shape[1])
+            self._write_config()
+        if self.index is None:
+            self.index = self._build_index(self.config["dimension"])
+            self._set_search_params()
+
+        labels, replaced = self.records.upsert(ids, documents, metadatas)
+        self._remove_labels(replaced)
+        self._count += len(ids) - len(replaced)
+
+        label_array = np.asarray(labels, dtype=np.int64)
+        if self._is_trained():
+            self.index.add_with_ids(vectors, label_array)
+            return
+
+        # IVF: collect vectors until there are enough to train the clusters (about 40 per cluster),
+        # int8: until there are enough to estimate the value ranges
+        self._pending_labels.append(label_array)
+        self._pending_vectors.append(vectors)
+        training_rows = 40 * self.config["nlist"] if self.config["index_type"] == "ivf" else SQ_TRAINING_ROWS
+        if sum(len(part) for part in self._pending_labels) >= training_rows:
+            self._train_and_flush()
+
+    def _train_and_flush(self) -> None:
+        vectors = np.concatenate(self._pending_vectors)
+        labels = np.concatenate(self._pending_labels)
+        if not len(labels):
+            self._pending_labels, self._pending_vectors = [], []
+            return
+        if self.config["index_type"] == "ivf" and self.index.ntotal == 0 and len(vectors) < self.config["nlist"]:
+            # Not enough data for the configured number of clusters: use fewer
+            self.config["nlist"] = max(1, len(vectors) // 40 or 1)
+            self._write_config()
+            self.index = self._build_index(self.config["dimension"])
+            self._set_search_params()
+        if not self.index.is_trained:
+            self.index.train(vectors)
+        self.index.add_with_ids(vectors, labels)
+        self._pending_labels, self._pending_vectors = [], []
+
+    def _remove_labels(self, labels: list[int]) -> None:
+        if not labels or self.index is None:
+            return
+        if self._pending_labels:
+            # Vectors still waiting for training are dropped before they reach the index
+            removed = np.asarray(labels, dtype=np.int64)
+            keep = [~np.isin(part, removed) for part in self._pending_labels]
+            self._pending_labels = [part[mask] for part, mask in zip(self._pending_labels, keep)]
+            self._pending_vectors = [part[mask] for part, mask in zip(self._pending_vectors, keep)]
+            # Vectors are only pending while the index is untrained and empty
+            return
+        if self.config["index_type"] == "hnsw":
+            # HNSW graphs don't support removal: the labels are gone from the side store and skipped in results
+            return
+        self.index.remove_ids(np.asarray(labels, dtype=np.int64))
+
+    def _compact(self) -> None:
+        """
+        Rebuilds the hnsw graph from the vectors of live records, dropping those of deleted and replaced
+        records. The vectors are read back from the index, so a quantized index keeps its quantized values.
+        """
+        base = self._base_index()
+        vectors = base.reconstruct_n(0, base.ntotal)
+        labels = faiss.vector_to_array(self.index.id_map)
+        keep = np.isin(labels, np.asarray(self.records.all_labels(), dtype=np.int64))
+
+        index = self._build_index(self.config["dimension"])
+        vectors = np.ascontiguousarray(vectors[keep])
+        if not index.is_trained:
+            index.train(vectors)
+        index.add_with_ids(vectors, labels[keep])
+        self.index = index
+        self._set_search_params()
+
+    def delete(self, ids=None, where=None) -> None:
+        labels = self.records.delete(ids=ids, where=where)
+        self._remove_labels(labels)
+        self._count -= len(labels)
+
+    def query(self, query_embeddings, n_results) -> dict:
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if self.index is None or self.index.ntotal == 0:
+            for _ in query_embeddings:
+                for values in results.values():
+                    values.append([])
+            return results
+
+        vectors = self._prepare(query_embeddings)
+        # Fetch extra candidates to make up for labels whose records were deleted but are still in the index.
+        # If a query still comes back short, search again with more candidates, up to the whole index
+        k = min(n_results * OVERFETCH_FACTOR, self.index.ntotal)
+        while True:
+            scores, labels = self.index.search(vectors, k)
+            found = self.records.lookup([int(label) for label in np.unique(labels) if label >= 0])
+            live = min(sum(1 for label in row if int(label) in found) for row in labels)
+            if live >= n_results or k >= self.index.ntotal or self.index.ntotal <= self._count:
+                break
+            k = min(k * 4, self.index.ntotal)
+
+        for row_scores, row_labels in zip(scores, labels):
+            ids, documents, metadatas, distances = [], [], [], []
+            for score, label in zip(row_scores, row_labels):
+                record = found.get(int(label))
+                if record is None:
+                    continue
+                ids.append(record[0])
+                documents.append(record[1])
+                metadatas.append(record[2])
+                distances.append(float(1.0 - score) if self.config["metric"] == "ip" else float(score))
+                if len(ids) == n_results:
+                    break
+            results["ids"].append(ids)
+            results["documents"].append(documents)
+            results["metadatas"].append(metadatas)
+            results["distances"].append(distances)
+        return results
+
+    def get(self, ids=None, where=None, limit=None, offset=None) -> dict:
+        return self.records.get(ids=ids, where=where, limit=limit, offset=offset)
+
+    def count(self) -> int:
+        return self._count
+
+    def persist(self) -> None:
+        if self._pending_labels:
+            self._train_and_flush()
+        if self.index is None:
+            return
+        if self.config["index_type"] == "hnsw" and self.index.ntotal > 0:
+            stale = self.index.ntotal - self._count
+            if stale / self.index.ntotal > STALE_REBUILD_FRACTION:
+                self._compact()
+        self._write_index()
+
+    def checkpoint(self) -> None:
+        """Writes the index like persist(), but leaves rebuilding a stale hnsw graph to the final persist()."""
+        if self._pending_labels:
+            self._train_and_flush()
+        if self.index is not None:
+            self._write_index()
+
+    def _write_index(self) -> None:
+        # Write to a temporary file first, so readers never load a half-written index
+        tmp_path = f"{self.index_path}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+
+    def close(self) -> None:
+        self.records.close()
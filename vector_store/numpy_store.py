@@ -0,0 +1,390 @@
+import os
+import json
+import glob
+import shutil
+
+import numpy as np
+
+from vector_store.base import VectorStore
+from vector_store.records import RecordStore
+
+
+DTYPES = ("float32", "float16", "int8", "binary")
+
+# Rows scored per step, so compact matrices are converted to float32 a block at a time
+BLOCK_ROWS = 65536
+
+# Number of set bits in every byte value, for Hamming distances between binary codes
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    An exact-search vector store: L2-normalized embeddings in a memory-mapped .npy matrix, with
+    documents and metadata in a SQLite side store.
+
+    Queries score every row with one matrix product and select the top results with argpartition,
+    so there is no index to build or tune. The matrix is opened with mmap_mode='r', so several
+    worker processes serving the same collection share the OS page cache instead of each holding a copy.
+    Suited to collections up to a few hundred thousand chunks.
+
+    The embeddings can be stored compactly as codes, which are what queries scan:
+        float32: 4 bytes per dimension, exact.
+        float16: 2 bytes per dimension, practically exact.
+        int8:    1 byte per dimension, scalar quantized with a per-dimension scale set at the first persist and
+                 widened, re-encoding the stored codes, when later vectors exceed it.
+        binary:  1 bit per dimension (the sign), compared by Hamming distance.
+    With rescoring, the full-precision vectors are also written (full.npy) and the best rescore_factor * n_results
+    candidates by code are scored again with them. full.npy is memory-mapped as well and only the candidate rows
+    are read, so the memory the collection needs is that of the codes.
+
+    Data files are written as generations (vectors.npy plus labels.npy, the side store label of each row)
+    and switched atomically, so readers never see a half-written matrix. Distances are 1 - cosine similarity.
+    """
+    def __init__(
+        self,
+        db_path: str,
+        collection_name: str,
+        create: bool = False,
+        dtype: str = "float32",
+        rescore: bool = True,
+        rescore_factor: int = 4,
+    ) -> None:
+        """
+        Args:
+            db_path: The vector DB directory. The collection is stored in db_path/numpy/collection_name.
+            collection_name: Name of the collection.
+            create: Create the collection if it does not exist. Otherwise a missing collection is an error.
+            dtype: 'float32', 'float16', 'int8' or 'binary' storage for the embeddings. Only used when the collection is created.
+            rescore: Keep full-precision vectors to rescore the candidates of compact codes. Only used when the collection is created.
+            rescore_factor: Number of candidates rescored per requested result.
+        """
+        self.directory = os.path.join(db_path, "numpy", collection_name)
+        self.current_path = os.path.join(self.directory, "current.json")
+
+        if not os.path.exists(self.current_path):
+            if not create:
+                raise ValueError(f"Collection {collection_name} does not exist in {self.directory}")
+            if dtype not in DTYPES:
+                raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+            os.makedirs(self.directory, exist_ok=True)
+            self._write_current({"generation": None, "dtype": dtype, "rescore": bool(rescore) and dtype != "float32"})
+
+        with open(self.current_path, 'r', encoding='utf-8') as file:
+            self.current = json.load(file)
+        self.rescore_factor = max(1, rescore_factor)
+        self.segments_dir = os.path.join(self.directory, "segments")
+        self.records = RecordStore(os.path.join(self.directory, "records.sqlite3"))
+        self._load()
+        self._load_segments()
+
+    def _write_current(self, current: dict) -> None:
+        tmp_path = f"{self.current_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(current, file)
+        os.replace(tmp_path, self.current_path)
+
+    def _load(self) -> None:
+        """Memory-maps the current generation and marks which rows still belong to a record."""
+        generation = self.current["generation"]
+        self.full = None
+        self.scale = None
+        if generation is None:
+            self.vectors = None
+            self.labels = np.empty(0, dtype=np.int64)
+        else:
+            data_dir = os.path.join(self.directory, generation)
+            self.vectors = np.load(os.path.join(data_dir, "vectors.npy"), mmap_mode='r')
+            self.labels = np.load(os.path.join(data_dir, "labels.npy"))
+            if self.current.get("rescore"):
+                self.full = np.load(os.path.join(data_dir, "full.npy"), mmap_mode='r')
+            if self.current["dtype"] == "int8":
+                self.scale = np.load(os.path.join(data_dir, "scale.npy"))
+        self.alive = np.isin(self.labels, np.asarray(self.records.all_labels(), dtype=np.int64))
+
+    def _load_segments(self) -> None:
+        """Reads the rows saved by checkpoint() since the last persist() back as pending rows."""
+        # Rows written since the last persist(), and the labels among them that were deleted again
+        self._pending_labels = []
+        self._pending_vectors = []
+        self._pending_dead = set()
+        paths = sorted(glob.glob(os.path.join(self.segments_dir, "*.npz")))
+        if paths:
+            live = np.asarray(self.records.all_labels(), dtype=np.int64)
+            for path in paths:
+                with np.load(path) as segment:
+                    labels, vectors = segment["labels"], segment["vectors"]
+                # Skip rows deleted since, and rows already in the generation if a persist() stopped before removing the segments
+                keep = np.isin(labels, live) & ~np.isin(labels, self.labels)
+                self._pending_labels.append(labels[keep])
+                self._pending_vectors.append(vectors[keep])
+        # Number of pending parts already saved in a segment
+        self._checkpointed = len(self._pending_labels)
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _kill(self, labels: list[int]) -> None:
+        if labels:
+            self.alive[np.isin(self.labels, np.asarray(labels, dtype=np.int64))] = False
+            if self._pending_labels:
+                self._pending_dead.update(labels)
+
+    def upsert(self, ids, embeddings, documents, metadatas) -> None:
+        if not ids:
+            return
+        labels, replaced = self.records.upsert(ids, documents, metadatas)
+        self._kill(replaced)
+        self._pending_labels.append(np.asarray(labels, dtype=np.int64))
+        # Codes are made at persist time: int8 needs its scale and rescoring the full vectors
+        pending_dtype = self.current["dtype"] if self.current["dtype"] in ("float32", "float16") and not self.current.get("rescore") else "float32"
+        self._pending_vectors.append(self._normalize(embeddings).astype(pending_dtype))
+
+    def delete(self, ids=None, where=None) -> None:
+        self._kill(self.records.delete(ids=ids, where=where))
+
+    def _pending(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the rows written since the last persist that still belong to a record."""
+        if not self._pending_labels:
+            return None, None
+        labels = np.concatenate(self._pending_labels)
+        vectors = np.concatenate(self._pending_vectors)
+        if not self._pending_dead:
+            return vectors, labels
+        live = ~np.isin(labels, np.fromiter(self._pending_dead, dtype=np.int64))
+        return vectors[live], labels[live]
+
+    def _scores(self, vectors: np.ndarray, queries: np.ndarray, dtype: str | None = None) -> np.ndarray:
+        """
+        Returns the (rows x queries) cosine similarities, computed block by block in float32.
+        For int8 and binary codes (dtype) they are estimates; binary codes give 1 - 2 * Hamming distance / dimension.
+        """
+        scores = np.empty((len(vectors), len(queries)), dtype=np.float32)
+        if dtype == "int8":
+            # code * scale approximates the vector, so the scale is applied to the queries once
+            queries = queries * self.scale
+        elif dtype == "binary":
+            query_codes = np.packbits(queries > 0, axis=1)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block = vectors[start:start + BLOCK_ROWS]
+            if dtype == "binary":
+                block = np.asarray(block)
+                for column, query_code in enumerate(query_codes):
+                    distance = POPCOUNT[np.bitwise_xor(block, query_code)].sum(axis=1, dtype=np.int32)
+                    scores[start:start + len(block), column] = 1.0 - 2.0 * distance / queries.shape[1]
+            else:
+                scores[start:start + len(block)] = np.asarray(block, dtype=np.float32) @ queries.T
+        return scores
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Turns normalized float vectors into the stored codes."""
+        dtype = self.current["dtype"]
+        if dtype == "int8":
+            return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+        if dtype == "binary":
+            return np.packbits(vectors > 0, axis=1)
+        return vectors.astype(dtype)
+
+    def _code_shape(self, rows: int, dimension: int) -> tuple[tuple[int, int], str]:
+        dtype = self.current["dtype"]
+        if dtype == "binary":
+            return (rows, (dimension + 7) // 8), "uint8"
+        return (rows, dimension), dtype
+
+    def _rescore(self, rows: np.ndarray, column_scores: np.ndarray, query: np.ndarray, persisted_rows: int) -> np.ndarray:
+        """Returns the scores of the candidate rows, with those of persisted rows recomputed from the full vectors."""
+        scores = column_scores[rows].copy()
+        persisted = rows < persisted_rows
+        if persisted.any():
+            candidates = rows[persisted]
+            # Reading the rows in file order keeps the memory-mapped reads sequential
+            order = np.argsort(candidates)
+            exact = np.empty(len(candidates), dtype=np.float32)
+            exact[order] = np.asarray(self.full[candidates[order]], dtype=np.float32) @ query
+            scores[persisted] = exact
+        return scores
+
+    def query(self, query_embeddings, n_results) -> dict:
+        queries = self._normalize(query_embeddings)
+        score_parts, label_parts = [], []
+        persisted_rows = 0
+        if self.vectors is not None and len(self.vectors):
+            scores = self._scores(self.vectors, queries, self.current["dtype"])
+            scores[~self.alive] = -np.inf
+            score_parts.append(scores)
+            label_parts.append(self.labels)
+            persisted_rows = len(scores)
+        pending_vectors, pending_labels = self._pending()
+        if pending_vectors is not None and len(pending_vectors):
+            score_parts.append(self._scores(pending_vectors, queries))
+            label_parts.append(pending_labels)
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if not score_parts:
+            for _ in queries:
+                for values in results.values():
+                    values.append([])
+            return results
+
+        # Pending rows come last and are scored exactly; only the persisted codes need rescoring
+        scores = np.concatenate(score_parts)
+        labels = np.concatenate(label_parts)
+        rescore = self.full is not None and persisted_rows > 0
+        k = min(n_results * self.rescore_factor if rescore else n_results, len(scores))
+
+        top_rows, top_scores = [], []
+        for column in range(scores.shape[1]):
+            column_scores = scores[:, column]
+            # argpartition finds the k best rows in linear time; only those k are sorted
+            rows = np.argpartition(-column_scores, k - 1)[:k] if k < len(column_scores) else np.arange(len(column_scores))
+            rows = rows[np.isfinite(column_scores[rows])]
+            row_scores = self._rescore(rows, column_scores, queries[column], persisted_rows) if rescore else column_scores[rows]
+            order = np.argsort(-row_scores)[:n_results]
+            top_rows.append(rows[order])
+            top_scores.append(row_scores[order])
+
+        found = self.records.lookup(sorted({int(labels[row]) for rows in top_rows for row in rows}))
+        for rows, row_scores in zip(top_rows, top_scores):
+            ids, documents, metadatas, distances = [], [], [], []
+            for row, score in zip(rows, row_scores):
+                record = found.get(int(labels[row]))
+                if record is None:
+                    continue
+                ids.append(record[0])
+                documents.append(record[1])
+                metadatas.append(record[2])
+                distances.append(float(1.0 - score))
+            results["ids"].append(ids)
+            results["documents"].append(documents)
+            results["metadatas"].append(metadatas)
+            results["distances"].append(distances)
+        return results
+
+    def get(self, ids=None, where=None, limit=None, offset=None) -> dict:
+        return self.records.get(ids=ids, where=where, limit=limit, offset=offset)
+
+    def count(self) -> int:
+        _, pending_labels = self._pending()
+        return int(self.alive.sum()) + (len(pending_labels) if pending_labels is not None else 0)
+
+    def checkpoint(self) -> None:
+        """
+        Saves the rows written since the last checkpoint as a segment file, without rewriting the matrix, so
+        the cost of a checkpoint depends on the new rows only. Segments are read back as pending rows when
+        the collection is opened, and folded into the matrix by the next persist().
+        """
+        if self._checkpointed == len(self._pending_labels):
+            return
+        labels = np.concatenate(self._pending_labels[self._checkpointed:])
+        vectors = np.concatenate(self._pending_vectors[self._checkpointed:])
+        os.makedirs(self.segments_dir, exist_ok=True)
+        numbers = [int(os.path.basename(path).split(".")[0]) for path in glob.glob(os.path.join(self.segments_dir, "*.npz"))]
+        path = os.path.join(self.segments_dir, f"{max(numbers, default=-1) + 1:08d}.npz")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, labels=labels, vectors=vectors)
+        os.replace(tmp_path, path)
+        self._checkpointed = len(self._pending_labels)
+
+    def persist(self) -> None:
+        """
+        Writes a new generation with the live rows of the current one plus the pending rows.
+        Dropping deleted rows here keeps the matrix compact.
+        """
+        pending_vectors, pending_labels = self._pending()
+        if pending_vectors is None and (self.vectors is None or self.alive.all()):
+            return
+
+        live_rows = np.flatnonzero(self.alive)
+        rows = len(live_rows) + (len(pending_labels) if pending_labels is not None else 0)
+        dimension = self.current.get("dimension") or (self.vectors.shape[1] if self.vectors is not None else pending_vectors.shape[1])
+        source, recode = self.vectors, None
+        if self.current["dtype"] == "int8":
+            source, recode = self._fit_scale(pending_vectors, live_rows, dimension)
+
+        generation = f"data.{(int(self.current['generation'].split('.')[1]) + 1) if self.current['generation'] else 0}"
+        data_dir = os.path.join(self.directory, generation)
+        os.makedirs(data_dir, exist_ok=True)
+
+        shape, dtype = self._code_shape(rows, dimension)
+        self._write_matrix(os.path.join(data_dir, "vectors.npy"), shape, dtype, source, live_rows, pending_vectors, self._encode, recode)
+        if self.current.get("rescore"):
+            self._write_matrix(os.path.join(data_dir, "full.npy"), (rows, dimension), "float32", self.full, live_rows, pending_vectors, None)
+        if self.scale is not None:
+            np.save(os.path.join(data_dir, "scale.npy"), self.scale)
+
+        labels = self.labels[live_rows]
+        if pending_labels is not None:
+            labels = np.concatenate([labels, pending_labels])
+        np.save(os.path.join(data_dir, "labels.npy"), labels)
+
+        # Switch readers to the new generation, then remove the old ones
+        self.current = {**self.current, "generation": generation, "dimension": int(dimension)}
+        self._write_current(self.current)
+        # The checkpointed rows are in the new generation now
+        shutil.rmtree(self.segments_dir, ignore_errors=True)
+        self._pending_labels, self._pending_vectors, self._pending_dead = [], [], set()
+        self._checkpointed = 0
+        self.vectors = None
+        self.full = None
+        self._load()
+        for old_dir in glob.glob(os.path.join(self.directory, "data.*")):
+            if os.path.basename(old_dir) != generation:
+                # Processes that still map an old generation keep their (unlinked) file on POSIX
+                shutil.rmtree(old_dir, ignore_errors=True)
+
+    def _fit_scale(self, pending_vectors, live_rows: np.ndarray, dimension: int) -> tuple:
+        """
+        Sets the int8 scale for persist(): from the pending vectors on the first persist, and widened for the
+        dimensions where pending values exceed the current range, so no value is clipped.
+
+        Returns:
+            The matrix the live rows are copied from and the function re-encoding them, None if the stored codes are kept.
+        """
+        needed = None
+        if pending_vectors is not None and len(pending_vectors):
+            needed = (np.maximum(np.abs(pending_vectors).max(axis=0), 1e-6) / 127).astype(np.float32)
+        if self.scale is None:
+            # Vectors are normalized, so 1 / 127 covers any value when there is nothing to fit the scale to
+            self.scale = needed if needed is not None else np.full(dimension, 1 / 127, dtype=np.float32)
+            return self.vectors, None
+        if needed is None or not (needed > self.scale).any():
+            return self.vectors, None
+
+        old_scale = self.scale
+        self.scale = np.maximum(old_scale, needed)
+        print(f"int8 range widened in {int((needed > old_scale).sum())} dimensions, re-encoding {len(live_rows)} stored rows")
+        if self.full is not None:
+            # Re-encode from the full-precision vectors rather than from the codes
+            return self.full, self._encode
+        ratio = old_scale / self.scale
+        return self.vectors, lambda codes: np.clip(np.rint(np.asarray(codes, dtype=np.float32) * ratio), -127, 127).astype(np.int8)
+
+    @staticmethod
+    def _write_matrix(path: str, shape: tuple[int, int], dtype: str, current, live_rows: np.ndarray, pending, encode, recode=None) -> None:
+        """
+        Writes the live rows of a current matrix (passed through recode if given) followed by the (encoded)
+        pending vectors, a block at a time.
+        """
+        matrix = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        position = 0
+        for start in range(0, len(live_rows), BLOCK_ROWS):
+            part = live_rows[start:start + BLOCK_ROWS]
+            matrix[position:position + len(part)] = recode(current[part]) if recode is not None else current[part]
+            position += len(part)
+        if pending is not None:
+            for start in range(0, len(pending), BLOCK_ROWS):
+                block = pending[start:start + BLOCK_ROWS]
+                matrix[position:position + len(block)] = encode(block) if encode is not None else block
+                position += len(block)
+        matrix.flush()
+        del matrix
+
+    def close(self) -> None:
+        self.records.close()
@@ -0,0 +1,143 @@
+import json
+import sqlite3
+
+
+class RecordStore:
+    """
+    A SQLite side store for vector indexes that only hold vectors (FAISS, NumPy).
+
+    Each record gets an integer label that is used as its position or ID in the vector index. The store
+    maps labels to the string ID, document text and metadata. A label that is no longer in the store
+    belongs to a deleted or replaced record, and search results carrying it are skipped.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path: The location of the SQLite file. It is created if it does not exist.
+        """
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " label INTEGER PRIMARY KEY,"
+            " id TEXT NOT NULL UNIQUE,"
+            " document TEXT,"
+            " metadata TEXT)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.commit()
+
+    def next_label(self) -> int:
+        """Returns the label the next inserted record will get. Labels are never reused."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'next_label'").fetchone()
+        return row[0] if row else 0
+
+    def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict]) -> tuple[list[int], list[int]]:
+        """
+        Inserts records, replacing existing records with the same ID.
+
+        Returns:
+            tuple[list[int], list[int]]: The labels given to the records, in input order, and the labels
+            of the records they replaced (which should be removed from the vector index).
+        """
+        replaced = self.labels(ids)
+        start = self.next_label()
+        labels = list(range(start, start + len(ids)))
+        with self.conn:
+            self._delete_labels(replaced)
+            self.conn.executemany(
+                "INSERT INTO records (label, id, document, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (label, record_id, document, json.dumps(metadata or {}))
+                    for label, record_id, document, metadata in zip(labels, ids, documents, metadatas)
+                ]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('next_label', ?)", (start + len(ids),)
+            )
+        return labels, replaced
+
+    def delete(self, ids: list[str] | None = None, where: dict | None = None) -> list[int]:
+        """Deletes records by ID or metadata filter and returns their labels."""
+        labels = []
+        if ids is not None:
+            labels.extend(self.labels(ids))
+        if where:
+            clause, params = self._where(where)
+            labels.extend(row[0] for row in self.conn.execute(f"SELECT label FROM records WHERE {clause}", params))
+        with self.conn:
+            self._delete_labels(labels)
+        return labels
+
+    def labels(self, ids: list[str]) -> list[int]:
+        """Returns the labels of the given IDs. Unknown IDs are skipped."""
+        labels = []
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            labels.extend(
+                row[0] for row in self.conn.execute(
+                    f"SELECT label FROM records WHERE id IN ({','.join('?' * len(part))})", part
+                )
+            )
+        return labels
+
+    def lookup(self, labels: list[int]) -> dict[int, tuple[str, str, dict]]:
+        """Returns {label: (id, document, metadata)} for the labels that still exist."""
+        found = {}
+        for start in range(0, len(labels), 500):
+            part = [int(label) for label in labels[start:start + 500]]
+            for label, record_id, document, metadata in self.conn.execute(
+                f"SELECT label, id, document, metadata FROM records WHERE label IN ({','.join('?' * len(part))})", part
+            ):
+                found[label] = (record_id, document, json.loads(metadata))
+        return found
+
+    def get(self, ids: list[str] | None = None, where: dict | None = None, limit: int | None = None, offset: int | None = None) -> dict:
+        """Returns records by ID or metadata filter in the VectorStore.get layout."""
+        if ids is not None:
+            found = self.lookup(self.labels(ids))
+            by_id = {record[0]: record for record in found.values()}
+            rows = [by_id[record_id] for record_id in ids if record_id in by_id]
+            rows = rows[offset or 0:]
+            if limit is not None:
+                rows = rows[:limit]
+        else:
+            clause, params = self._where(where or {})
+            rows = [
+                (record_id, document, json.loads(metadata))
+                for record_id, document, metadata in self.conn.execute(
+                    f"SELECT id, document, metadata FROM records WHERE {clause} ORDER BY label LIMIT ? OFFSET ?",
+                    [*params, -1 if limit is None else limit, offset or 0]
+                )
+            ]
+        return {
+            "ids": [row[0] for row in rows],
+            "documents": [row[1] for row in rows],
+            "metadatas": [row[2] for row in rows],
+        }
+
+    def all_labels(self) -> list[int]:
+        """Returns the labels of all records in insertion order."""
+        return [row[0] for row in self.conn.execute("SELECT label FROM records ORDER BY label")]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _delete_labels(self, labels: list[int]) -> None:
+        for start in range(0, len(labels), 500):
+            part = labels[start:start + 500]
+            self.conn.execute(f"DELETE FROM records WHERE label IN ({','.join('?' * len(part))})", part)
+
+    @staticmethod
+    def _where(where: dict) -> tuple[str, list]:
+        """Turns {'key': value, ...} into an SQL condition on the JSON metadata (all pairs must match)."""
+        if not where:
+            return "1", []
+        clause = " AND ".join("json_extract(metadata, ?) = ?" for _ in where)
+        params = []
+        for key, value in where.items():
+            params.extend([f"$.{key}", value])
+        return clause, params